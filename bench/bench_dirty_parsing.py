@@ -0,0 +1,52 @@
+"""Benchmark of the parsing of dirty ASP files by the solver, through
+the clingo binary (clyngor) or the clingo module, on files made of pools,
+ranges and rules.
+
+usage: python bench/bench_dirty_parsing.py [NB_EDGES ...]
+
+"""
+
+import sys
+import time
+import random
+from phasme.extract_links import links_from_dirty_lines
+
+
+DEFAULT_SIZES = (10**4, 10**5, 10**6)
+
+
+def dirty_lines(nb_edge:int, seed:int=42) -> [str]:
+    """Return ASP lines defining about nb_edge edges, a quarter of them with
+    pools, a quarter with ranges, and the rest with a rule symmetrizing them"""
+    rand = random.Random(seed)
+    nb_node = max(2, int(nb_edge ** .5) * 10)
+    node = lambda: 'n{}'.format(rand.randrange(nb_node))
+    lines = ['edge({};{};{};{},{}).'.format(*(node() for _ in range(5)))
+             for _ in range(nb_edge // 16)]
+    lines += ['edge({},{}..{}).'.format(rand.randrange(nb_node), start, start + 7)
+              for start in (rand.randrange(nb_node) for _ in range(nb_edge // 32))]
+    lines += ['link({},{}).'.format(node(), node()) for _ in range(nb_edge // 4)]
+    lines.append('edge(X,Y) :- link(X,Y).  edge(Y,X) :- link(X,Y).')
+    return lines
+
+
+def timed_parsing(lines:[str], in_process:bool) -> (float, int):
+    start = time.perf_counter()
+    nb_found = sum(1 for _ in links_from_dirty_lines(lines, in_process=in_process))
+    return time.perf_counter() - start, nb_found
+
+
+def bench(nb_edge:int):
+    lines = dirty_lines(nb_edge)
+    binary, nb_binary = timed_parsing(lines, in_process=False)
+    module, nb_module = timed_parsing(lines, in_process=True)
+    assert nb_binary == nb_module, (nb_binary, nb_module)
+    print('{:>8} edges | clingo binary: {:7.2f}s | clingo module: {:7.2f}s | speedup: {:5.2f}'.format(
+        nb_module, binary, module, binary / module
+    ))
+
+
+if __name__ == '__main__':
+    sizes = tuple(map(int, sys.argv[1:])) or DEFAULT_SIZES
+    for size in sizes:
+        bench(size)
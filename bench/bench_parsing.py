@@ -0,0 +1,44 @@
+"""Throughput benchmark of the ASP edge parser on synthetic clean files.
+
+usage: python bench/bench_parsing.py [NB_EDGES ...]
+
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+from phasme.extract_links import links_from_file
+
+
+DEFAULT_SIZES = (10**5, 10**6, 10**7)
+
+
+def write_synthetic_file(fname:str, nb_edge:int, seed:int=42):
+    """Write in given file nb_edge random edges among sqrt(nb_edge)*10 nodes"""
+    rand = random.Random(seed)
+    nb_node = max(2, int(nb_edge ** .5) * 10)
+    with open(fname, 'w') as fd:
+        for _ in range(nb_edge):
+            fd.write('edge(n{},n{}).\n'.format(rand.randrange(nb_node), rand.randrange(nb_node)))
+
+
+def bench(nb_edge:int):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, 'graph.lp')
+        write_synthetic_file(fname, nb_edge)
+        size = os.path.getsize(fname)
+        start = time.perf_counter()
+        nb_found = sum(1 for _ in links_from_file(fname))
+        duration = time.perf_counter() - start
+    assert nb_found == nb_edge, (nb_found, nb_edge)
+    print('{:>10} edges | {:8.2f}s | {:>12.0f} edges/s | {:8.1f} MB/s'.format(
+        nb_edge, duration, nb_edge / duration, size / duration / 2**20
+    ))
+
+
+if __name__ == '__main__':
+    sizes = tuple(map(int, sys.argv[1:])) or DEFAULT_SIZES
+    for size in sizes:
+        bench(size)
@@ -0,0 +1,39 @@
+"""Benchmark of the double edge swap randomization against networkx.
+
+usage: python bench/bench_randomization.py [NB_EDGES ...]
+
+"""
+
+import sys
+import time
+import networkx
+from phasme.stats import edge_array
+from phasme.randomization import double_edge_swap
+
+
+DEFAULT_SIZES = (10**3, 10**4, 10**5)
+ITERATIONS = 10  # swaps per edge
+
+
+def bench(nb_edge:int, seed:int=42):
+    graph = networkx.gnm_random_graph(nb_edge // 5, nb_edge, seed=seed)
+    nb_swap = ITERATIONS * nb_edge
+    _, edges = edge_array(graph)
+
+    start = time.perf_counter()
+    _, report = double_edge_swap(edges, nb_swap, seed=seed)
+    phasme_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    networkx.double_edge_swap(graph, nswap=nb_swap, max_tries=100 * nb_swap, seed=seed)
+    networkx_time = time.perf_counter() - start
+
+    print('{:>8} edges, {:>9} swaps | phasme: {:7.2f}s ({:.2f} accepted) | networkx: {:7.2f}s | speedup: {:5.1f}'.format(
+        nb_edge, nb_swap, phasme_time, report.acceptance_rate, networkx_time, networkx_time / phasme_time
+    ))
+
+
+if __name__ == '__main__':
+    sizes = tuple(map(int, sys.argv[1:])) or DEFAULT_SIZES
+    for size in sizes:
+        bench(size)
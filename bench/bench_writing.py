@@ -0,0 +1,53 @@
+"""Benchmark of the writing of graphs in ASP files, with the per-line writer
+used before and the chunked writer, uncompressed or compressed.
+
+usage: python bench/bench_writing.py [NB_EDGES ...]
+
+"""
+
+import os
+import sys
+import time
+import tempfile
+import networkx
+from phasme.asp import as_asp_value
+from phasme.build_graph import graph_to_file
+
+
+DEFAULT_SIZES = (10**4, 10**5, 10**6)
+EXTENSIONS = ('lp', 'lp.gz', 'lp.zst')
+
+
+def per_line_writer(graph, fname:str):
+    with open(fname, 'w') as fd:
+        for edge in graph.edges:
+            fd.write('{}({},{}).'.format('edge', *map(as_asp_value, edge)) + '\n')
+
+
+def timed(func:callable, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def bench(nb_edge:int, directory:str, seed:int=42):
+    graph = networkx.gnm_random_graph(nb_edge // 5, nb_edge, seed=seed)
+    graph = networkx.relabel_nodes(graph, {node: 'n{}'.format(node) for node in graph})
+    fname = os.path.join(directory, 'out')
+    times = [('per line', timed(per_line_writer, graph, fname + '.lp'))]
+    for ext in EXTENSIONS:
+        try:
+            times.append((ext, timed(graph_to_file, graph, fname + '.' + ext)))
+        except ValueError:  # compression not available
+            continue
+    print('{:>8} edges | '.format(nb_edge) + ' | '.join(
+        '{}: {:7.3f}s ({:9.0f} edges/s)'.format(name, duration, nb_edge / duration)
+        for name, duration in times
+    ))
+
+
+if __name__ == '__main__':
+    sizes = tuple(map(int, sys.argv[1:])) or DEFAULT_SIZES
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            bench(size, directory)
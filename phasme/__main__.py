@@ -1,11 +1,21 @@
 #!/usr/bin/env python
 
+import logging
 from . import cli
-from . import routines, extract_links
+from . import routines, extract_links, cache
 
 
 def run_cli():
-    args = cli.parse_args(__doc__)
+    parser = cli.cli_parser(__doc__)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(levelname)s: %(message)s')
+    cache.configure(enabled=args.cache, directory=args.cache_dir,
+                    max_size=None if args.cache_size is None else args.cache_size * 2**20)
+    if args.clear_cache:
+        cache.clear()
+        if args.command is None:
+            return
 
     if args.command == 'infos':
         infos = routines.info(args.infile, args.motifs, args.no_cc,
@@ -15,7 +25,15 @@ def run_cli():
                               graph_properties=args.graph_properties,
                               round_float=args.round_float,
                               negative_results=args.negative_results,
-                              edge_predicate=args.edge_predicate)
+                              edge_predicate=args.edge_predicate,
+                              backend=args.backend,
+                              incremental=args.incremental,
+                              metrics=args.metrics,
+                              budget=args.budget or None,
+                              max_cost=args.max_cost,
+                              approx=args.approx,
+                              jobs=args.jobs,
+                              motif_sample=args.motif_sample)
         print('\n'.join(infos))
     elif args.command == 'split':
         if args.biggest_first:
@@ -26,28 +44,65 @@ def run_cli():
             order = None
         print(routines.split_by_cc(args.infile, args.targets, order=order,
                                    slice=args.slice,
-                                   edge_predicate=args.edge_predicate))
+                                   edge_predicate=args.edge_predicate,
+                                   backend=args.backend, jobs=args.jobs))
+    elif args.command == 'convert' and args.edge_predicates:
+        print(routines.convert_predicates(args.infile, args.target, args.edge_predicates,
+                                          target_edge_predicate=args.target_edge_predicate,
+                                          backend=args.backend, anonymize=args.anonymize,
+                                          normalize=args.normalize, name_map=args.name_map))
     elif args.command == 'convert':
         routines.convert(args.infile, args.target,
                          anonymize=args.anonymize,
                          normalize=args.normalize,
                          edge_predicate=args.edge_predicate,
-                         target_edge_predicate=args.target_edge_predicate)
+                         target_edge_predicate=args.target_edge_predicate,
+                         backend=args.backend, attributes=args.attributes,
+                         name_map=args.name_map)
     elif args.command == 'generate':
         routines.generate(target=args.outfile, method=args.method,
                           method_parameters=args.args,
                           edge_predicate=args.edge_predicate)
+    elif args.command == 'extract' and args.extraction == 'motif':
+        routines.extract_motif(args.infile, args.target, edge_predicate=args.edge_predicate,
+                               backend=args.backend, timeout=args.timeout, threads=args.threads)
+    elif args.command == 'extract' and args.extraction == 'batch':
+        routines.extract_batch(args.infile, args.manifest, report=args.target,
+                               edge_predicate=args.edge_predicate, jobs=args.jobs)
     elif args.command == 'extract':
         nodes = args.nodes
         if args.nodes_in_file:
             nodes = set(extract_links.read_lines_from_files(nodes))
         routines.extract_by_node(
             args.infile, args.target, nodes=nodes, order=args.neighbors,
-            edge_predicate=args.edge_predicate
+            edge_predicate=args.edge_predicate, backend=args.backend
         )
     elif args.command == 'randomize':
-        routines.randomize(args.infile, args.target, args.iterations,
-                           per_cc=args.per_cc, edge_predicate=args.edge_predicate)
+        if not args.target and not (args.ensemble and args.statistics):
+            parser.error("randomize needs a target file, except with --ensemble and --statistics")
+        result = routines.randomize(args.infile, args.target, args.iterations,
+                                    per_cc=args.per_cc, edge_predicate=args.edge_predicate,
+                                    seed=args.seed, jobs=args.jobs,
+                                    ensemble=args.ensemble, statistics=args.statistics)
+        if args.ensemble and args.statistics:
+            maxkeylen = max(map(len, result), default=0)
+            for field, (mean, std) in result.items():
+                print('{} | {} ± {}'.format(field.rjust(maxkeylen+2), mean, std))
+        elif args.ensemble:
+            print(result)
+    elif args.command == 'motifs':
+        result = routines.motif_significance(args.infile, args.size, null=args.null,
+                                             iterations=args.iterations, per_cc=args.per_cc,
+                                             edge_predicate=args.edge_predicate, seed=args.seed,
+                                             jobs=args.jobs, fraction=args.sample)
+        if args.null:
+            print('motif\tcount\tmean\tstd\tz-score')
+        else:
+            print('motif\tcount')
+        for name, value in result.items():
+            print('\t'.join(map(str, (name,) + (tuple(value) if args.null else (value,)))))
+    elif args.command == 'index':
+        print(routines.build_index(args.infile, edge_predicate=args.edge_predicate))
     else:
         print('WOOT', args)
 
@@ -0,0 +1,144 @@
+"""Persistent adjacency index of a graph file, for random-access
+neighborhood queries.
+
+The index is a directory next to the graph file, holding memory mapped
+arrays: the node dictionary (json-encoded names, and node ids sorted
+by name for binary search) and the CSR adjacency (offsets and neighbors).
+A query only reads the pages of the nodes it reaches, instead of parsing
+the whole graph file.
+The index is valid as long as the size and modification time of the
+graph file are unchanged.
+
+"""
+
+import os
+import json
+import logging
+import numpy
+from phasme import commons
+from phasme.commons import edge_predicate
+from phasme.compact import CompactGraph, ball, induced_edges
+from phasme.build_graph import interned_from_file
+
+
+LOGGER = logging.getLogger(__name__)
+INDEX_VERSION = 1
+INDEX_EXT = '.phasme-index'
+META = 'meta.json'
+ARRAYS = ('names', 'name_offsets', 'sorted_ids', 'offsets', 'neighbors')
+
+
+def index_dir(fname:str) -> str:
+    """Return the directory of the index of given graph file"""
+    return commons.normalize_filename(fname) + INDEX_EXT
+
+
+def encoded(name:object) -> bytes:
+    return json.dumps(name, ensure_ascii=False).encode()
+
+
+def build(fname:str, edge_predicate:str=edge_predicate) -> str:
+    """Write the index of given graph file, and return its directory"""
+    fname = commons.normalize_filename(fname)
+    if fname == commons.STDIO:
+        raise ValueError("Standard input can't be indexed")
+    stat = os.stat(fname)
+    graph = CompactGraph(*interned_from_file(fname, edge_predicate=edge_predicate))
+    names = [encoded(name) for name in graph.names]
+    name_offsets = numpy.zeros(len(names) + 1, dtype=numpy.int64)
+    numpy.cumsum([len(name) for name in names], out=name_offsets[1:])
+    arrays = {
+        'names': numpy.frombuffer(b''.join(names), dtype=numpy.uint8),
+        'name_offsets': name_offsets,
+        'sorted_ids': numpy.array(sorted(range(len(names)), key=names.__getitem__), dtype=numpy.int64),
+        'offsets': graph.offsets,
+        'neighbors': graph.neighbors_array,
+    }
+    directory = index_dir(fname)
+    os.makedirs(directory, exist_ok=True)
+    remove_meta(directory)  # the index is invalid until fully written
+    for name, array in arrays.items():
+        numpy.save(os.path.join(directory, name + '.tmp.npy'), array)
+        os.replace(os.path.join(directory, name + '.tmp.npy'), os.path.join(directory, name + '.npy'))
+    meta = {'version': INDEX_VERSION, 'edge predicate': edge_predicate,
+            'size': stat.st_size, 'mtime': stat.st_mtime_ns,
+            'nb node': graph.number_of_nodes(), 'nb edge': graph.number_of_edges()}
+    with open(os.path.join(directory, META), 'w') as fd:
+        json.dump(meta, fd)
+    LOGGER.info("Index of %s written in %s.", fname, directory)
+    return directory
+
+
+def remove_meta(directory:str):
+    try:
+        os.remove(os.path.join(directory, META))
+    except FileNotFoundError:
+        pass
+
+
+def load(fname:str, edge_predicate:str=edge_predicate) -> 'AdjacencyIndex' or None:
+    """Return the index of given graph file, or None if there is none,
+    or if it is obsolete"""
+    fname = commons.normalize_filename(fname)
+    if fname == commons.STDIO:
+        return None
+    directory = index_dir(fname)
+    try:
+        with open(os.path.join(directory, META)) as fd:
+            meta = json.load(fd)
+        stat = os.stat(fname)
+    except (OSError, ValueError):
+        return None
+    if (meta.get('version') != INDEX_VERSION or meta['edge predicate'] != edge_predicate
+            or meta['size'] != stat.st_size or meta['mtime'] != stat.st_mtime_ns):
+        LOGGER.info("Index %s is obsolete, and is ignored.", directory)
+        return None
+    return AdjacencyIndex(directory)
+
+
+class AdjacencyIndex:
+    """Graph read from the memory mapped arrays of an index directory"""
+
+    def __init__(self, directory:str):
+        self.directory = directory
+        for name in ARRAYS:
+            setattr(self, name, numpy.load(os.path.join(directory, name + '.npy'), mmap_mode='r'))
+
+    def number_of_nodes(self) -> int:
+        return len(self.offsets) - 1
+
+    def encoded_name(self, node_id:int) -> bytes:
+        return self.names[self.name_offsets[node_id]:self.name_offsets[node_id+1]].tobytes()
+
+    def name(self, node_id:int) -> object:
+        return json.loads(self.encoded_name(node_id).decode())
+
+    def node_id(self, name:object) -> int or None:
+        """Return id of given node, or None if not in the graph,
+        found by binary search over the sorted names"""
+        key, low, high = encoded(name), 0, self.number_of_nodes()
+        while low < high:
+            middle = (low + high) // 2
+            if self.encoded_name(self.sorted_ids[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.number_of_nodes() and self.encoded_name(self.sorted_ids[low]) == key:
+            return int(self.sorted_ids[low])
+        return None
+
+    def ball(self, nodes:iter, order:int=1) -> numpy.ndarray:
+        """Return the sorted ids of the nodes at distance at most order
+        of given ones, ignoring unknown nodes"""
+        seeds = [node_id for node_id in map(self.node_id, nodes) if node_id is not None]
+        return ball(self.offsets, self.neighbors, numpy.array(seeds, dtype=numpy.int64), order)
+
+    def subgraph(self, node_ids:numpy.ndarray) -> (list, numpy.ndarray):
+        """Return names of given sorted node ids, and the edges between
+        them as indexes in the returned names"""
+        edges = induced_edges(self.offsets, self.neighbors, node_ids)
+        return [self.name(node_id) for node_id in numpy.asarray(node_ids).tolist()], edges
+
+    def extracted(self, nodes:iter, order:int=1) -> (list, numpy.ndarray):
+        """Same as CompactGraph.extracted"""
+        return self.subgraph(self.ball(nodes, order))
@@ -1,5 +1,6 @@
 
-
+import numpy
+import itertools
 from phasme.commons import edge_predicate
 
 def as_asp_value(smth:object) -> str:
@@ -44,5 +45,49 @@ def quoted(value:str, by='"'):
 
 def asp_from_graph(graph, edge_predicate:str=edge_predicate) -> str:
     """Yield lines describing given graph"""
-    for edge in graph.edges:
-        yield '{}({},{}).'.format(edge_predicate, *map(as_asp_value, edge))
+    rendered = RenderedNames()
+    prefix = edge_predicate + '('
+    for source, target in graph.edges:
+        yield prefix + rendered[source] + ',' + rendered[target] + ').'
+
+
+def asp_from_edges(names:list, edges:iter, edge_predicate:str=edge_predicate,
+                   chunk_size:int=2**16) -> str:
+    """Yield lines describing given edges between node indexes,
+    named by names
+
+    >>> tuple(asp_from_edges(['a', 'B'], numpy.array([[0, 1], [1, 1]]), 'e'))
+    ('e(a,"B").', 'e("B","B").')
+
+    """
+    rendered = RenderedNames()
+    names = [rendered[name] for name in names]
+    prefix = edge_predicate + '('
+    edges = numpy.asarray(edges).reshape(-1, 2)
+    for start in range(0, len(edges), chunk_size):
+        for source, target in edges[start:start+chunk_size].tolist():
+            yield prefix + names[source] + ',' + names[target] + ').'
+
+
+def chunks(lines:iter, chunk_size:int=2**14, eol:str='\n') -> str:
+    """Yield given lines joined by chunks, each line ending with eol
+
+    >>> tuple(chunks('abc', 2))
+    ('a\\nb\\n', 'c\\n')
+
+    """
+    lines = iter(lines)
+    while True:
+        chunk = tuple(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield eol.join(chunk) + eol
+
+
+class RenderedNames(dict):
+    """Map from node name to its ASP-compliant string,
+    computed only once per name"""
+
+    def __missing__(self, name:object) -> str:
+        value = self[name] = as_asp_value(name)
+        return value
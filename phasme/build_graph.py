@@ -1,32 +1,238 @@
 
+import csv
+import array
+import numpy
 import networkx
 import itertools
-from collections import defaultdict
+from collections import OrderedDict
+from phasme import cache
 from phasme import commons
 from phasme import graph_to_tex
-from phasme.asp import asp_from_graph
+from phasme.asp import asp_from_graph, asp_from_edges, chunks
+from phasme.stats import edge_array
+from phasme.readers import READERS, KINDS
+from phasme.writers import WRITERS, writer_for
+from phasme.compact import CompactGraph
 from phasme.commons import edge_predicate, fixed_name
 from phasme.extract_links import links_from_file, links_from_dirty_file
-from phasme.extract_links import links_from_lines, links_from_dirty_lines
+from phasme.extract_links import links_from_lines, links_from_dirty_lines, FileLines
 
 
-def graph_from_file(fname:str, edge_predicate:str=edge_predicate):
+BACKENDS = ('networkx', 'compact')
+
+
+def graph_from_file(fname:str, edge_predicate:str=edge_predicate,
+                    use_cache:bool=None, backend:str='networkx',
+                    attributes:iter=()):
+    """Build a graph from given file.
+
+    use_cache -- load the ASP files from cache, and save them in it once parsed.
+                 If None, use the cache configuration.
+    backend -- 'networkx' to get a networkx.Graph, or 'compact' to get
+               a CompactGraph, much lighter in memory.
+    attributes -- edge attributes to keep when reading standard formats
+                  with the networkx backend (see graph_from_standard_file).
+
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Backend should be one of {}, not {}".format(', '.join(BACKENDS), backend))
+    if backend == 'compact':
+        return CompactGraph(*interned_from_file(fname, edge_predicate, use_cache))
     fname = commons.normalize_filename(fname)
     if commons.format_of_file(fname) not in {'lp', ''}:
-        return graph_from_standard_file(fname, edge_predicate=edge_predicate)
+        return graph_from_standard_file(fname, edge_predicate=edge_predicate,
+                                        attributes=attributes)
+    if use_cache is None:
+        use_cache = cache.CONFIG['enabled']
+    if use_cache and fname != commons.STDIO:
+        return graph_from_interned(*interned_links_from_file(fname, edge_predicate))
     graph = networkx.Graph()
     for edge in links_from_file(fname, edge_predicate=edge_predicate):
         graph.add_edge(*edge)
     return graph
 
-def graph_from_standard_file(fname:str, edge_predicate:str=edge_predicate):
-    """Build a graph from standard files"""
+def interned_from_file(fname:str, edge_predicate:str=edge_predicate,
+                       use_cache:bool=None) -> (list, numpy.ndarray):
+    """Return node names and edges array of given file, without building
+    any graph for ASP files. Edges may be duplicated.
+
+    use_cache -- see graph_from_file
+
+    """
+    fname = commons.normalize_filename(fname)
+    format = commons.format_of_file(fname)
+    if format in READERS:
+        ids = {}
+        declare = lambda node: ids.setdefault(node, len(ids))
+        return interned(READERS[format](fname, on_node=declare), ids)
+    if format not in {'lp', ''}:
+        graph = graph_from_standard_file(fname, edge_predicate=edge_predicate)
+        return list(graph.nodes), edge_array(graph)[1]
+    if use_cache is None:
+        use_cache = cache.CONFIG['enabled']
+    if use_cache and fname != commons.STDIO:
+        return interned_links_from_file(fname, edge_predicate)
+    return interned(links_from_file(fname, edge_predicate=edge_predicate))
+
+def graphs_from_file(fname:str, edge_predicates:iter, use_cache:bool=None,
+                     backend:str='networkx') -> dict:
+    """Return the map from each given edge predicate to the graph it defines
+    in given ASP file, read in a single pass, with at most one solver call.
+
+    use_cache, backend -- see graph_from_file
+
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Backend should be one of {}, not {}".format(', '.join(BACKENDS), backend))
+    build = CompactGraph if backend == 'compact' else graph_from_interned
+    return OrderedDict((predicate, build(names, edges)) for predicate, (names, edges)
+                       in interned_graphs_from_file(fname, edge_predicates, use_cache).items())
+
+def interned_graphs_from_file(fname:str, edge_predicates:iter,
+                              use_cache:bool=None) -> dict:
+    """Return the map from each given edge predicate to the node names
+    and edges array it defines in given ASP file, read in a single pass.
+
+    use_cache -- see graph_from_file. Each predicate is cached as if read alone,
+                 unless it is defined by statements given to the solver.
+
+    """
+    fname = commons.normalize_filename(fname)
+    edge_predicates = tuple(OrderedDict.fromkeys(edge_predicates))
+    if commons.format_of_file(fname) not in {'lp', ''}:
+        raise ValueError("Edge predicates are only defined in ASP files, not in {}".format(fname))
+    if use_cache is None:
+        use_cache = cache.CONFIG['enabled']
+    use_cache = use_cache and fname != commons.STDIO
+    if use_cache:
+        keys = {predicate: cache.key_of(fname, predicate) for predicate in edge_predicates}
+        cached = {predicate: cache.load(key, fname) for predicate, key in keys.items()}
+        if all(entry is not None for entry in cached.values()):
+            return OrderedDict((predicate, cached[predicate]) for predicate in edge_predicates)
+        signature = cache.file_signature(fname, with_hash=True)
+    ids = {predicate: {} for predicate in edge_predicates}
+    flats = {predicate: array.array('l') for predicate in edge_predicates}
+    stats = {}
+    for predicate, source, target in links_from_lines(FileLines(fname), edge_predicates, stats=stats):
+        setdefault, append = ids[predicate].setdefault, flats[predicate].append
+        append(setdefault(source, len(ids[predicate])))
+        append(setdefault(target, len(ids[predicate])))
+    interned_graphs = OrderedDict(
+        (predicate, (list(ids[predicate]), numpy.array(flats[predicate], dtype=numpy.int32).reshape(-1, 2)))
+        for predicate in edge_predicates
+    )
+    if use_cache:
+        # the edges of a solved predicate may come in another order, or depend
+        #  on statements a read of this predicate alone would not give to the solver
+        for predicate, (names, edges) in interned_graphs.items():
+            if predicate not in stats['solved predicates']:
+                cache.store(keys[predicate], names, edges, signature)
+    return interned_graphs
+
+def interned_links_from_file(fname:str, edge_predicate:str=edge_predicate) -> (list, numpy.ndarray):
+    """Return node names and edges array of given ASP file, using the cache"""
+    key = cache.key_of(fname, edge_predicate)
+    cached = cache.load(key, fname)
+    if cached is None:
+        signature = cache.file_signature(fname, with_hash=True)
+        cached = interned(links_from_file(fname, edge_predicate=edge_predicate))
+        cache.store(key, *cached, signature=signature)
+    return cached
+
+def links_from_graph_file(fname:str, edge_predicate:str=edge_predicate,
+                          on_node:callable=None) -> iter:
+    """Yield links of given ASP file, or of given file in a format
+    handled by phasme.readers, without building any graph"""
+    format = commons.format_of_file(fname)
+    if format in READERS:
+        return READERS[format](fname, on_node=on_node)
+    if format in {'lp', ''}:
+        return links_from_file(fname, edge_predicate=edge_predicate)
+    raise ValueError("Links of {} files can't be streamed".format(format))
+
+def is_streamable(fname:str, target:str) -> bool:
+    """True if given file can be converted into target
+    by streaming its links (see streamed_to_file)"""
+    return (commons.format_of_file(fname) in READERS.keys() | {'lp', ''}
+            and commons.format_of_file(target) in WRITERS)
+
+def streamed_to_file(fname:str, target:str, edge_predicate:str=edge_predicate,
+                     target_edge_predicate:str=edge_predicate,
+                     rename:callable=None) -> str:
+    """Write in target the links of given file as soon as they are read,
+    keeping only the table of nodes and the set of written edges in memory.
+
+    The target is directed or a multigraph like the input file. Unless it is
+    a multigraph, duplicated edges (and reversed ones, if not directed) are
+    written once, as when going through a networkx graph.
+
+    rename -- if given, called on each node name to get the written one
+
+    """
+    format = commons.format_of_file(fname)
+    directed, multigraph = KINDS[format](fname) if format in KINDS else (False, False)
+    if multigraph is None:  # GraphML only tells it by parallel edges
+        multigraph = commons.format_of_file(target) == 'graphml'
+    ids, written = {}, set()  # node name -> node id, written (source id, target id)
+    with writer_for(target, edge_predicate=target_edge_predicate,
+                    directed=directed, multigraph=multigraph) as writer:
+        if rename is None:
+            node, edge = writer.node, writer.edge
+        else:
+            node = lambda name: writer.node(rename(name))
+            edge = lambda source, target: writer.edge(rename(source), rename(target))
+        for source, target_node in links_from_graph_file(fname, edge_predicate, on_node=node):
+            if not multigraph:
+                key = ids.setdefault(source, len(ids)), ids.setdefault(target_node, len(ids))
+                if not directed and key[0] > key[1]:
+                    key = key[1], key[0]
+                if key in written:
+                    continue
+                written.add(key)
+            edge(source, target_node)
+    return target
+
+# (directed, multigraph) -> networkx graph type
+GRAPH_TYPES = {
+    (False, False): networkx.Graph,
+    (True, False): networkx.DiGraph,
+    (False, True): networkx.MultiGraph,
+    (True, True): networkx.MultiDiGraph,
+}
+
+def has_parallel_edges(graph:networkx.MultiGraph) -> bool:
+    return any(len(keys) > 1 for neighbors in graph.adj.values() for keys in neighbors.values())
+
+def graph_from_standard_file(fname:str, edge_predicate:str=edge_predicate,
+                             attributes:iter=()):
+    """Build a graph from standard files.
+
+    attributes -- names of the edge attributes to keep, for the formats
+                  handled by phasme.readers. Others keep all attributes.
+
+    The graph is directed or a multigraph as declared by the file,
+    like with the networkx readers.
+
+    """
     fname = commons.normalize_filename(fname)
     ext = commons.format_of_file(fname)
-    try:
-        return getattr(networkx, 'read_' + ext)(fname)
-    except AttributeError:
+    if ext in READERS:
+        directed, multigraph = KINDS[ext](fname) if ext in KINDS else (False, False)
+        graph = GRAPH_TYPES[directed, multigraph is not False]()
+        links = READERS[ext](fname, on_node=graph.add_node, attributes=attributes)
+        if attributes:
+            for source, target, data in links:
+                graph.add_edge(source, target, **data)
+        else:
+            graph.add_edges_from(links)
+        if multigraph is None and not has_parallel_edges(graph):  # as networkx does
+            graph = GRAPH_TYPES[directed, False](graph)
+        return graph
+    reader = getattr(networkx, 'read_' + ext, None)
+    if reader is None:
         raise ValueError("Given file format {} is not handled".format(ext))
+    with commons.open_file(fname, 'rb') as fd:
+        return reader(fd)
 
 def graph_from_dirty_file(fname:str, edge_predicate:str=edge_predicate):
     fname = commons.normalize_filename(fname)
@@ -48,27 +254,132 @@ def graph_from_dirty_lines(lines:iter, edge_predicate:str=edge_predicate):
         graph.add_edge(*edge)
     return graph
 
+def graph_from_interned(names:list, edges:numpy.ndarray, chunk_size:int=2**16):
+    """Build a graph from node names and the array of edges between their index,
+    which may be memory mapped: it is read by chunks of edges"""
+    graph = networkx.Graph()
+    graph.add_nodes_from(names)
+    lookup = numpy.empty(len(names), dtype=object)  # filled one by one, names may be tuples
+    for idx, name in enumerate(names):
+        lookup[idx] = name
+    for start in range(0, len(edges), chunk_size):  # never the whole array in memory
+        chunk = lookup[edges[start:start+chunk_size]]
+        graph.add_edges_from(zip(chunk[:, 0], chunk[:, 1]))
+    return graph
+
+
+def interned(links:iter, ids:dict=None) -> (list, numpy.ndarray):
+    """Return the list of nodes found in given links, by order of appearance,
+    and the (nb link, 2) array of int32 encoding the links with node indexes.
+
+    ids -- map from already known node names to their index, extended
+           with the new nodes.
+
+    >>> names, edges = interned([('a', 'b'), ('b', 'c'), ('a', 'a')])
+    >>> names, edges.tolist()
+    (['a', 'b', 'c'], [[0, 1], [1, 2], [0, 0]])
+    >>> names, edges = interned([('c', 'd')], ids={'a': 0, 'b': 1, 'c': 2})
+    >>> names, edges.tolist()
+    (['a', 'b', 'c', 'd'], [[2, 3]])
+
+    """
+    ids, flat = {} if ids is None else ids, array.array('l')
+    setdefault, append = ids.setdefault, flat.append
+    for source, target in links:
+        append(setdefault(source, len(ids)))
+        append(setdefault(target, len(ids)))
+    return list(ids), numpy.array(flat, dtype=numpy.int32).reshape(-1, 2)
+
 
 def graph_to_file(graph, fname:str, edge_predicate:str=edge_predicate, eol:str='\n'):
     """Write given graph into file, in clean ASP format."""
+    if isinstance(graph, CompactGraph):
+        return edges_to_file(graph.names, graph.edges_array, fname, edge_predicate,
+                             nodes=range(graph.number_of_nodes()), eol=eol)
     format = commons.format_of_file(fname)
     if format not in {'lp', ''}:
         return graph_to_standard_file(graph, fname, format)
-    with open(fname, 'w') as fd:
-        for line in asp_from_graph(graph, edge_predicate=edge_predicate):
-            fd.write(line + eol)
+    return lines_to_file(asp_from_graph(graph, edge_predicate=edge_predicate), fname, eol)
+
+def edges_to_file(names:list, edges:numpy.ndarray, fname:str,
+                  edge_predicate:str=edge_predicate, nodes:iter=None,
+                  eol:str='\n') -> str:
+    """Write into file the graph of given edges between node indexes,
+    without building any graph for clean ASP format.
+
+    nodes -- indexes of nodes to write, needed only for isolated nodes
+
+    """
+    format = commons.format_of_file(fname)
+    if format not in {'lp', ''}:
+        graph = networkx.Graph()
+        if nodes is not None:
+            graph.add_nodes_from(names[node] for node in nodes)
+        graph.add_edges_from((names[source], names[target])
+                             for source, target in numpy.asarray(edges).reshape(-1, 2).tolist())
+        graph_to_standard_file(graph, fname, format)
+        return fname
+    return lines_to_file(asp_from_edges(names, edges, edge_predicate=edge_predicate), fname, eol)
+
+def lines_to_file(lines:iter, fname:str, eol:str='\n') -> str:
+    """Write given lines in file, by large chunks, compressed
+    according to the file extension"""
+    with commons.open_file(fname, 'w') as fd:
+        for chunk in chunks(lines, eol=eol):
+            fd.write(chunk)
     return fname
 
 def graph_to_standard_file(graph, fname:str, format:str):
     """Write given graph into file, in given standard format."""
-    if format == 'dot':
-        try:
-            return networkx.drawing.nx_pydot.write_dot(graph, fname)
-        except ImportError:
-            return networkx.drawing.nx_agraph.write_dot(graph, fname)
+    if isinstance(graph, CompactGraph):
+        graph = graph.to_networkx()
     if format == 'tex':
-        return graph_to_tex.graph_to_file(graph, fname)
-    return getattr(networkx, 'write_' + format)(graph, fname)
+        graph_to_tex.graph_to_file(graph, fname)
+        return fname
+    if format == 'dot':
+        with commons.open_file(fname, 'w') as fd:
+            try:
+                networkx.drawing.nx_pydot.write_dot(graph, fd)
+            except ImportError:
+                networkx.drawing.nx_agraph.write_dot(graph, fd)
+        return fname
+    writer = getattr(networkx, 'write_' + format, None)
+    if writer is None:
+        raise ValueError("Given file format {} is not handled".format(format))
+    with commons.open_file(fname, 'wb') as fd:
+        writer(graph, fd)
+    return fname
+
+
+def as_networkx(graph) -> networkx.Graph:
+    """Return given graph as a networkx graph, building it if necessary"""
+    return graph.to_networkx() if isinstance(graph, CompactGraph) else graph
+
+def connected_components(graph) -> iter:
+    """Yield set of nodes of each connected component of given graph"""
+    if isinstance(graph, CompactGraph):
+        return graph.connected_components()
+    return networkx.connected_components(graph)
+
+
+def neighborhood(graph, nodes:iter, order:int=1) -> iter:
+    """Return the nodes at distance at most order of given ones,
+    ignoring unknown nodes. Only newly reached nodes are expanded.
+
+    >>> sorted(neighborhood(networkx.path_graph(6), [0, 5], 2))
+    [0, 1, 2, 3, 4, 5]
+
+    """
+    if isinstance(graph, CompactGraph):
+        return graph.ball(nodes, order)
+    reached = {node for node in nodes if node in graph}
+    frontier = reached
+    for _ in range(order):
+        frontier = {nei for node in frontier for nei in graph.neighbors(node)} - reached
+        if not frontier:
+            break
+        reached |= frontier
+    return reached
 
 
 def graph_from_networkx_method(method:str, method_parameters=[]):
@@ -85,31 +396,74 @@ def graph_from_networkx_method(method:str, method_parameters=[]):
     return getattr(networkx, method)(**method_parameters)
 
 
-def anonymized(graph):
+class NameMap(dict):
+    """Map from old to new node names, each new name being computed
+    on first access by given function, and checked against collisions.
+
+    >>> names = NameMap(str.lower)
+    >>> names['a'], names['B']
+    ('a', 'b')
+    >>> names['A']
+    Traceback (most recent call last):
+    ...
+    ValueError: Nodes 'a' and 'A' would both be renamed 'a'
+
+    """
+
+    def __init__(self, new_name:callable):
+        self.new_name = new_name
+        self.used = set()  # generated names
+
+    def __missing__(self, name:object) -> object:
+        new = self.new_name(name)
+        if new in self.used:
+            other = next(old for old, used in self.items() if used == new)
+            raise ValueError("Nodes {} and {} would both be renamed {}"
+                             "".format(repr(other), repr(name), repr(new)))
+        self.used.add(new)
+        self[name] = new
+        return new
+
+def anonymizing() -> NameMap:
+    """Return the map renaming nodes into integers from 1,
+    by order of first access"""
+    ids = itertools.count(1)
+    return NameMap(lambda _: next(ids))
+
+def normalizing(**fixed_name_kwargs) -> NameMap:
+    """Return the map renaming nodes to avoid any non alphanumeric character"""
+    return NameMap(lambda name: fixed_name(name, keep_quotes=True, **fixed_name_kwargs))
+
+def renamed(graph, name_map:NameMap):
+    """Return a new graph, equivalent to given one, including its isolated
+    nodes, but with nodes renamed by given NameMap"""
+    if isinstance(graph, CompactGraph):
+        return graph.relabeled(map(name_map.__getitem__, graph.names))
+    return networkx.relabel_nodes(graph, name_map.__getitem__, copy=True)
+
+def anonymized(graph, name_map:NameMap=None):
     """Return a new graph, equivalent to given one but with node names changed
     to integers.
-    """
-    random_names = itertools.count(1)
-    name = defaultdict(lambda: next(random_names))
-    anon = type(graph)()
-    for source, target in graph.edges:
-        anon.add_edge(name[source], name[target])
-    return anon
 
+    name_map -- NameMap to use, as returned by anonymizing()
 
-def normalized(graph, **fixed_name_kwargs):
+    """
+    return renamed(graph, anonymizing() if name_map is None else name_map)
+
+def normalized(graph, name_map:NameMap=None, **fixed_name_kwargs):
     """Return a new graph, equivalent to given one but with node names changed
-    to avoid any non alphanumeric character.
+    to avoid any non alphanumeric character. A ValueError is raised if two
+    nodes would get the same name.
+
+    name_map -- NameMap to use, as returned by normalizing()
+
     """
+    return renamed(graph, normalizing(**fixed_name_kwargs) if name_map is None else name_map)
 
-    name_map = {n: fixed_name(n, keep_quotes=True, **fixed_name_kwargs) for n in graph.nodes}
-    nb_new_names = sum(1 for _ in name_map.values())
-    if len(name_map) != nb_new_names:
-        diff = frozenset(name_map) - frozenset(name_map.values())
-        raise RuntimeError("Normalization routine do not handle given graph. {} "
-                           "nodes are lost because of name collision : "
-                           "".format(len(diff), ', '.join(map(str, diff))))
-    anon = type(graph)()
-    for source, target in graph.edges:
-        anon.add_edge(name_map[source], name_map[target])
-    return anon
+def name_map_to_file(name_map:dict, fname:str) -> str:
+    """Write in given file one line per node, giving its old and new name
+    separated by a tab, so that a renaming can be reversed"""
+    with commons.open_file(fname, 'w') as fd:
+        writer = csv.writer(fd, delimiter='\t', lineterminator='\n')
+        writer.writerows(name_map.items())
+    return fname
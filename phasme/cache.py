@@ -0,0 +1,175 @@
+"""On-disk cache of the edges parsed from ASP files.
+
+Each entry is made of an interned node name table (json) and an array
+of edges (numpy int32, loaded with mmap), so that a cached file
+is never parsed again.
+Entries are keyed by path of the file and edge predicate, and record
+the size, modification time and hash of the file content: the file is hashed
+again only if its size is unchanged but not its modification time, so that
+reading an entry costs no more than a stat of the file.
+Least recently used entries are deleted when the cache exceeds its maximal size.
+
+"""
+
+import os
+import json
+import hashlib
+import logging
+import numpy
+from phasme import commons
+
+
+LOGGER = logging.getLogger(__name__)
+CACHE_VERSION = 2
+NODES_EXT, EDGES_EXT = '.nodes.json', '.edges.npy'
+
+CONFIG = {  # modified through configure()
+    'enabled': False,
+    'directory': os.path.join(os.environ.get('XDG_CACHE_HOME', '~/.cache'), 'phasme'),
+    'max size': 2**30,  # bytes
+}
+
+
+def configure(enabled:bool=None, directory:str=None, max_size:int=None):
+    """Modify the cache configuration for all future calls"""
+    if enabled is not None:
+        CONFIG['enabled'] = bool(enabled)
+    if directory is not None:
+        CONFIG['directory'] = directory
+    if max_size is not None:
+        CONFIG['max size'] = int(max_size)
+
+
+def cache_dir() -> str:
+    return commons.normalize_filename(CONFIG['directory'])
+
+
+def file_hash(fname:str, chunk_size:int=2**20) -> str:
+    """Return hexdigest of the content of given file"""
+    digest = hashlib.blake2b()
+    with open(fname, 'rb') as fd:
+        for chunk in iter(lambda: fd.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def key_of(fname:str, edge_predicate:str) -> str:
+    """Return the cache key of given file read with given edge predicate"""
+    key = [CACHE_VERSION, commons.normalize_filename(fname), edge_predicate]
+    return hashlib.blake2b(json.dumps(key).encode(), digest_size=16).hexdigest()
+
+
+def file_signature(fname:str, with_hash:bool=False) -> dict:
+    """Return size and modification time of given file, and hash of its content"""
+    stat = os.stat(fname)
+    found = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+    if with_hash:
+        found['hash'] = file_hash(fname)
+    return found
+
+
+def load(key:str, fname:str=None) -> (list, numpy.ndarray) or None:
+    """Return the node names and the (memory mapped) edges array
+    of given entry, or None if not in cache, or if given file
+    is not the one of the entry anymore"""
+    base = os.path.join(cache_dir(), key)
+    try:
+        with open(base + NODES_EXT) as fd:
+            entry = json.load(fd)
+        if fname is not None:
+            current = file_signature(fname)
+            if not is_unchanged(fname, current, entry['file']):
+                return None
+        edges = numpy.load(base + EDGES_EXT, mmap_mode='r')
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if fname is not None and current['mtime'] != entry['file']['mtime']:
+        entry['file']['mtime'] = current['mtime']  # touched, but same content
+        write_nodes(base, entry)
+    os.utime(base + EDGES_EXT)  # it's now the most recently used
+    LOGGER.info("Graph loaded from cache entry %s.", key)
+    return entry['names'], edges
+
+
+def is_unchanged(fname:str, current:dict, recorded:dict) -> bool:
+    """True if given file, of given current signature, has the recorded one,
+    its content being hashed only if its size is the same but not
+    its modification time"""
+    if current['size'] != recorded['size']:
+        return False
+    return current['mtime'] == recorded['mtime'] or file_hash(fname) == recorded['hash']
+
+
+def write_nodes(base:str, entry:dict):
+    """Write the node table of given entry, replacing the previous one at once"""
+    with open(base + '.tmp' + NODES_EXT, 'w') as fd:
+        json.dump(entry, fd, ensure_ascii=False)
+    os.replace(base + '.tmp' + NODES_EXT, base + NODES_EXT)
+
+
+def store(key:str, names:list, edges:numpy.ndarray, signature:dict=None) -> bool:
+    """Save given node names and edges array as the cache entry of given key,
+    with given file signature (see file_signature, with hash), checked
+    when loading the entry. It should be computed before reading the file.
+    Return False if it can't be cached, because some names are
+    neither strings nor integers.
+    """
+    if not all(type(name) in {str, int} for name in names):
+        LOGGER.info("Graph not cached: it holds non-atomic node names.")
+        return False
+    os.makedirs(cache_dir(), exist_ok=True)
+    base = os.path.join(cache_dir(), key)
+    entry = {'file': signature, 'names': list(names)}
+    # write in temporary files, then rename, so that readers never see partial entries.
+    #  The node table, holding the file signature, comes last: the edges of a previous
+    #  entry of this key are never read with the new signature.
+    numpy.save(base + '.tmp' + EDGES_EXT, numpy.asarray(edges, dtype=numpy.int32))
+    os.replace(base + '.tmp' + EDGES_EXT, base + EDGES_EXT)
+    write_nodes(base, entry)
+    evict()
+    return True
+
+
+def entries() -> [(str, int, float)]:
+    """Return (base path, size, last use time) of all cache entries,
+    least recently used first"""
+    try:
+        fnames = os.listdir(cache_dir())
+    except FileNotFoundError:
+        return []
+    found = []
+    for fname in fnames:
+        if fname.endswith(EDGES_EXT) and '.tmp' not in fname:
+            base = os.path.join(cache_dir(), fname[:-len(EDGES_EXT)])
+            try:
+                size = sum(os.path.getsize(base + ext) for ext in (NODES_EXT, EDGES_EXT))
+                found.append((base, size, os.path.getmtime(base + EDGES_EXT)))
+            except OSError:  # entry removed meanwhile, or incomplete
+                continue
+    return sorted(found, key=lambda entry: entry[2])
+
+
+def evict(max_size:int=None):
+    """Delete least recently used entries until cache size fits in max_size"""
+    max_size = CONFIG['max size'] if max_size is None else max_size
+    found = entries()
+    total = sum(size for _, size, _ in found)
+    for base, size, _ in found:
+        if total <= max_size:
+            break
+        remove_entry(base)
+        total -= size
+
+
+def remove_entry(base:str):
+    for ext in (NODES_EXT, EDGES_EXT):
+        try:
+            os.remove(base + ext)
+        except FileNotFoundError:
+            pass
+
+
+def clear():
+    """Delete all cache entries"""
+    for base, _, _ in entries():
+        remove_entry(base)
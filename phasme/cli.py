@@ -1,22 +1,26 @@
 
 import os
 import argparse
+from phasme.metrics import COSTS
 
 
 def parse_args(description:str, args:iter=None) -> dict:
     return cli_parser(description).parse_args(args)
 
 def existant_file(filepath:str) -> str:
-    """Argparse type, raising an error if given file does not exists"""
-    if not os.path.exists(filepath):
+    """Argparse type, raising an error if given file does not exists.
+    '-' designates the standard input."""
+    if filepath != '-' and not os.path.exists(filepath):
         raise argparse.ArgumentTypeError("file {} doesn't exists".format(filepath))
     return filepath
 
 def writable_file(filepath:str) -> str:
     """Argparse type, raising an error if given file is not writable.
-    Will delete the file !
+    Will delete the file ! '-' designates the standard output.
 
     """
+    if filepath == '-':
+        return filepath
     try:
         with open(filepath, 'w') as fd:
             pass
@@ -28,6 +32,16 @@ def writable_file(filepath:str) -> str:
 def cli_parser(description:str) -> argparse.ArgumentParser:
     # main parser
     parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help="Log details about the processing, like parsing statistics.")
+    parser.add_argument('--no-cache', action='store_false', dest='cache',
+                        help="Do not use the cache of parsed ASP files.")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="Delete all entries of the cache of parsed ASP files.")
+    parser.add_argument('--cache-dir', type=str, default=None,
+                        help="Directory holding the cache of parsed ASP files.")
+    parser.add_argument('--cache-size', type=int, default=None, metavar='MB',
+                        help="Maximal size of the cache of parsed ASP files, in megabytes.")
     subs = parser.add_subparsers(title='command to run', dest='command')
 
     # subparsers
@@ -37,6 +51,8 @@ def cli_parser(description:str) -> argparse.ArgumentParser:
     parser_genrt = subs.add_parser('generate', description='Generate an ASP graph file.')
     parser_extra = subs.add_parser('extract', description='Extract subgraphs.')
     parser_randm = subs.add_parser('randomize', description='Build a randomization.')
+    parser_index = subs.add_parser('index', description='Build an adjacency index of the graph, used by extract.')
+    parser_motif = subs.add_parser('motifs', description='Count motifs, and compute their z-scores against randomized graphs.')
 
     give_common_args(parser_infos)
     give_common_args(parser_split)
@@ -44,13 +60,23 @@ def cli_parser(description:str) -> argparse.ArgumentParser:
     give_common_args(parser_genrt, infile_is_outfile=True)
     give_common_args(parser_extra)
     give_common_args(parser_randm)
+    give_common_args(parser_index)
+    give_common_args(parser_motif)
+    # only the commands building a graph can choose its implementation
+    give_backend_arg(parser_infos)
+    give_backend_arg(parser_split)
+    give_backend_arg(parser_convr)
 
 
     # infos on graph
     parser_infos.add_argument('--no-cc', '-nc', action='store_false',
                               help="Do not search for connected components info.")
-    parser_infos.add_argument('--motifs', '-m', action='store_true',
-                              help="Search for biggest motifs stats.")
+    parser_infos.add_argument('--motifs', '-m', type=int, nargs='?', const=4, default=0, metavar='SIZE',
+                              help="Count the motifs of 3 up to SIZE nodes (4 by default).")
+    parser_infos.add_argument('--motif-sample', type=float, default=None, metavar='FRACTION',
+                              help="Estimate the motif counts by enumerating only given fraction of them.")
+    parser_infos.add_argument('--jobs', '-j', type=int, default=1,
+                              help='Number of processes counting the motifs (0 for all cores).')
     parser_infos.add_argument('--heavy-computations', '-c', action='store_true',
                               help="Perform costly detection of graph features.")
     parser_infos.add_argument('--special-nodes', '-sn', action='store_true',
@@ -65,6 +91,16 @@ def cli_parser(description:str) -> argparse.ArgumentParser:
                               help="Where to put produced files, if any.")
     parser_infos.add_argument('--round-float', '-r', type=int, default=None,
                               help='Round floats with given number of figures after dot.')
+    parser_infos.add_argument('--incremental', '-i', action='store_true',
+                              help="Save a parsing state next to the file, so that next runs only parse the appended lines.")
+    parser_infos.add_argument('--metrics', type=str, nargs='+', default=(), metavar='METRIC',
+                              help="Compute only given graph properties, like 'tree' or 'transitivity'.")
+    parser_infos.add_argument('--budget', type=float, default=60, metavar='SECONDS',
+                              help="Maximal time given to each graph property, approximated or skipped after that. 0 for no limit.")
+    parser_infos.add_argument('--max-cost', type=str, default=None, choices=COSTS,
+                              help="Skip graph properties of a costlier class.")
+    parser_infos.add_argument('--approx', type=float, default=None, metavar='EPS',
+                              help="Estimate by sampling the costly graph properties, with given precision, and give their 95%% confidence interval.")
 
     # split by cc
     parser_split.add_argument('targets', type=str, default=None,
@@ -75,16 +111,24 @@ def cli_parser(description:str) -> argparse.ArgumentParser:
                               help='Sort cc by increasing size.')
     parser_split.add_argument('--slice', type=int, nargs=2, metavar=('FIRST', 'LAST'),
                               default=None, help='Slice to select connected components to extract.')
+    parser_split.add_argument('--jobs', '-j', type=int, default=1,
+                              help='Number of processes writing the components (0 for all cores).')
 
     # convert, clean or anonymize file
     parser_convr.add_argument('target', type=str, default=None,
-                              help='file to write the graph in.')
+                              help="file to write the graph in, or template containing '{}' with --edge-predicates.")
     parser_convr.add_argument('--target-edge-predicate', type=str, default='edge',
                               help='ASP predicate encoding the graph edges in target.')
     parser_convr.add_argument('--anonymize', action='store_true',
                               help='Rename nodes into integers.')
     parser_convr.add_argument('--normalize', action='store_true',
                               help='Rename nodes with special characters.')
+    parser_convr.add_argument('--edge-predicates', type=str, nargs='+', default=None, metavar='PREDICATE',
+                              help="Read the graph of each given predicate in one pass, and write it in target, '{}' being replaced by the predicate.")
+    parser_convr.add_argument('--name-map', type=str, default=None, metavar='FILE',
+                              help='Write old and new node names in given tsv file, when renaming nodes.')
+    parser_convr.add_argument('--attributes', type=str, nargs='+', default=(), metavar='NAME',
+                              help='Edge attributes to keep when converting between standard formats.')
 
     # generate graph
     parser_genrt.add_argument('method', type=str, help='Generation method.')
@@ -99,33 +143,81 @@ def cli_parser(description:str) -> argparse.ArgumentParser:
     parser_extra_bynode = parser_extra_subs.add_parser(
         'nodes', description="Extract given nodes, and their neighbors."
     )
+    give_backend_arg(parser_extra_bynode)
     parser_extra_bynode.add_argument('nodes', type=str, nargs='+', metavar='NODE',
                                      default=(), help="Nodes to extract.")
     parser_extra_bynode.add_argument('neighbors', type=int, default=1,
                                      help="Extract also neighbors of target of n-th order.")
     parser_extra_bynode.add_argument('--nodes-in-file', '-f', action='store_true',
                                      help="Nodes argument is a file containing the nodes to extract.")
-
-    # parser_extra_motifs = parser_extra_subs.add_parser(
-        # 'motif', description="Extract maximal motifs."
-    # )
+    # extract many subgraphs, target being the report
+    parser_extra_batch = parser_extra_subs.add_parser(
+        'batch', description="Run all extractions listed in a manifest, loading the graph once."
+                             " Target receives the number of nodes, edges and time of each extraction."
+    )
+    parser_extra_batch.add_argument('manifest', type=existant_file,
+                                    help="File of lines 'seed file, order, target', the seed file containing the nodes to extract.")
+    parser_extra_batch.add_argument('--jobs', '-j', type=int, default=1,
+                                    help="Number of processes running the extractions (0 for all cores).")
+
+    # extract the biggest motif
+    parser_extra_motif = parser_extra_subs.add_parser(
+        'motif', description="Extract the maximal biclique covering the most edges, using clingo."
+    )
+    give_backend_arg(parser_extra_motif)
+    parser_extra_motif.add_argument('--timeout', type=float, default=None, metavar='SECONDS',
+                                    help="Write the biggest motif found after given time.")
+    parser_extra_motif.add_argument('--threads', '-t', type=int, default=1,
+                                    help="Number of solver threads.")
 
     # build a randomized graph.
-    parser_randm.add_argument('target', type=str,
-                              help='file to write the generated graph in.')
+    parser_randm.add_argument('target', type=str, nargs='?', default=None,
+                              help="file to write the generated graph in, or template "
+                              "containing '{}' with --ensemble.")
     parser_randm.add_argument('--iterations', '-i', default=100, type=int,
                               help="Number of iterations divided by number of edges (Q in Milo et al.).")
     parser_randm.add_argument('--per-cc', '-c', action='store_true',
                               help="Run the randomization independantly for each connected component.")
+    parser_randm.add_argument('--jobs', '-j', type=int, default=1,
+                              help="Number of processes randomizing the components with --per-cc (0 for all cores).")
+    parser_randm.add_argument('--seed', '-s', type=int, default=None,
+                              help="Seed of the randomization, for reproducible results.")
+    parser_randm.add_argument('--ensemble', '-e', type=int, default=None, metavar='N',
+                              help="Generate N randomized graphs, in parallel with --jobs.")
+    parser_randm.add_argument('--statistics', action='store_true',
+                              help="With --ensemble, print the statistics of the randomized graphs instead of writing them.")
+
+    # count motifs, and their significance
+    parser_motif.add_argument('--size', type=int, default=4,
+                              help="Count the motifs of 3 up to SIZE nodes.")
+    parser_motif.add_argument('--null', type=int, default=0, metavar='N',
+                              help="Compare counts to those of N randomized graphs, giving their z-scores.")
+    parser_motif.add_argument('--iterations', '-i', default=100, type=int,
+                              help="Number of iterations of the randomization divided by number of edges.")
+    parser_motif.add_argument('--per-cc', '-c', action='store_true',
+                              help="Randomize independantly each connected component.")
+    parser_motif.add_argument('--sample', type=float, default=None, metavar='FRACTION',
+                              help="Estimate the counts by enumerating only given fraction of the motifs.")
+    parser_motif.add_argument('--jobs', '-j', type=int, default=1,
+                              help="Number of processes counting the motifs and randomizing the graphs (0 for all cores).")
+    parser_motif.add_argument('--seed', '-s', type=int, default=None,
+                              help="Seed of the randomization and of the sampling, for reproducible results.")
     return parser
 
 
 def give_common_args(parser, *, infile_is_outfile:bool=False):
     if infile_is_outfile:
         parser.add_argument('outfile', type=writable_file,
-                            help='file to write the graph data in.')
+                            help='file to write the graph data in, or - for standard output.')
     else:
         parser.add_argument('infile', type=existant_file,
-                            help='file containing the graph data.')
+                            help='file containing the graph data, or - for standard input. '
+                                 'Files ending with .gz, .bz2, .xz or .zst are decompressed.')
     parser.add_argument('--edge-predicate', type=str, default='edge',
                         help='ASP predicate encoding the graph edges in fname.')
+
+
+def give_backend_arg(parser):
+    parser.add_argument('--backend', type=str, choices=('networkx', 'compact'),
+                        default='networkx',
+                        help="Graph implementation. 'compact' needs much less memory.")
@@ -1,12 +1,19 @@
 
+import io
 import os
+import sys
 
 edge_predicate = 'edge'
+STDIO = '-'  # filename of standard input or output
+BUFFER_SIZE = 2**20  # bytes
+COMPRESSIONS = ('gz', 'bz2', 'xz', 'zst')
 
 
 def normalize_filename(fname:str) -> str:
     """Return filename that hopefully is non ambiguous.
     """
+    if fname == STDIO:
+        return fname
     funcs = (
         os.path.expanduser,
         os.path.expandvars,
@@ -25,12 +32,97 @@ def format_of_file(fname:str) -> str:
     'lp'
     >>> format_of_file('test.gml')
     'gml'
+    >>> format_of_file('test.lp.gz')
+    'lp'
+    >>> format_of_file('-')
+    ''
 
     """
-    ext = os.path.splitext(fname)[1].lstrip('.')
+    ext = os.path.splitext(uncompressed(fname))[1].lstrip('.')
     return ext
 
 
+def compression_of_file(fname:str) -> str or None:
+    """Return the compression used by given file, according to its extension
+
+    >>> compression_of_file('test.lp.gz')
+    'gz'
+    >>> compression_of_file('test.lp') is None
+    True
+
+    """
+    ext = os.path.splitext(fname)[1].lstrip('.')
+    return ext if ext in COMPRESSIONS else None
+
+
+def uncompressed(fname:str) -> str:
+    """Return given filename without its compression extension, if any
+
+    >>> uncompressed('test.lp.zst')
+    'test.lp'
+    >>> uncompressed('test.gml')
+    'test.gml'
+
+    """
+    return os.path.splitext(fname)[0] if compression_of_file(fname) else fname
+
+
+def open_file(fname:str, mode:str='r', buffering:int=BUFFER_SIZE):
+    """Return a file object opened with given mode, compressed or
+    decompressed according to the file extension.
+    Filename '-' designates the standard input or output,
+    which is not closed at the end of the with statement.
+
+    """
+    if fname == STDIO:
+        stream = sys.stdin if 'r' in mode else sys.stdout
+        return UnclosedStream(stream.buffer if 'b' in mode else stream)
+    compression = compression_of_file(fname)
+    if compression is None:
+        return open(fname, mode, buffering=buffering)
+    text = 'b' not in mode
+    if compression == 'gz':
+        import gzip
+        return gzip.open(fname, mode + 't' if text else mode, compresslevel=6)
+    if compression == 'bz2':
+        import bz2
+        return bz2.open(fname, mode + 't' if text else mode)
+    if compression == 'xz':
+        import lzma
+        return lzma.open(fname, mode + 't' if text else mode)
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("Package zstandard is needed to handle file {}".format(fname))
+    raw = open(fname, mode.replace('b', '') + 'b')
+    if 'r' in mode:
+        stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw), buffering)
+    else:
+        stream = io.BufferedWriter(zstandard.ZstdCompressor().stream_writer(raw), buffering)
+    return io.TextIOWrapper(stream, encoding='utf-8') if text else stream
+
+
+class UnclosedStream:
+    """Given stream, that is flushed but not closed at the end
+    of the with statement, for the standard input and output"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.stream.writable():
+            self.stream.flush()
+
+    def __iter__(self):
+        return iter(self.stream)
+
+    def __getattr__(self, name:str):
+        return getattr(self.stream, name)
+
+
 def fixed_name(name:str, prefix:str='_c', suffix:str='_', keep_quotes:bool=False) -> str:
     """
     >>> fixed_name('a!-b')
@@ -40,12 +132,29 @@ def fixed_name(name:str, prefix:str='_c', suffix:str='_', keep_quotes:bool=False
     >>> fixed_name('"a!b"', keep_quotes=True)
     '"a_c33_b"'
     """
+    name = str(name)
     if keep_quotes:
-        if name[0] == '"' and name[-1] == '"':
+        if name[:1] == '"' and name[-1:] == '"' and len(name) > 1:
             name = name[1:-1]
         else:
             keep_quotes = False
-    ret = ''.join(c if c.isalnum() or c in '-_'
-                  else (prefix + str(ord(c)) + suffix)
-                  for c in name)
+    table = FIXED_CHARS.get((prefix, suffix))
+    if table is None:
+        table = FIXED_CHARS[prefix, suffix] = FixedChars(prefix, suffix)
+    ret = name.translate(table)
     return ('"' + ret + '"') if keep_quotes else ret
+
+
+class FixedChars(dict):
+    """Translation table of fixed_name, filled on first sight of each character"""
+
+    def __init__(self, prefix:str, suffix:str):
+        self.prefix, self.suffix = prefix, suffix
+
+    def __missing__(self, code:int) -> str:
+        char = chr(code)
+        fixed = self[code] = (char if char.isalnum() or char in '-_'
+                              else self.prefix + str(code) + self.suffix)
+        return fixed
+
+FIXED_CHARS = {}  # (prefix, suffix) -> FixedChars
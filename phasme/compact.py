@@ -0,0 +1,249 @@
+"""Implementation of a compact, array-backed, undirected graph.
+
+Nodes are interned into integers, and the adjacency is stored
+in CSR format (offsets and neighbors arrays), which uses a few bytes
+per edge instead of the hundreds of bytes of networkx dict-of-dicts.
+The API mimics the subset of networkx.Graph used by phasme, and a networkx
+graph is only built on demand, for features that need it.
+
+"""
+
+import copy
+import numpy
+import networkx
+from phasme.stats import edge_array, graph_stats
+
+
+class CompactGraph:
+    """Undirected graph stored as node names and arrays of integers.
+
+    names -- node names, node of id i being names[i]
+    edges -- (nb edge, 2) array of node ids. Duplicated edges are ignored.
+
+    >>> graph = CompactGraph(['a', 'b', 'c', 'd'], [[0, 1], [1, 2], [2, 1], [3, 3]])
+    >>> graph.number_of_nodes(), graph.number_of_edges(), graph.number_of_selfloops()
+    (4, 3, 1)
+    >>> sorted(graph.neighbors('b')), list(graph.edges)
+    (['a', 'c'], [('a', 'b'), ('b', 'c'), ('d', 'd')])
+
+    """
+
+    def __init__(self, names:list, edges:numpy.ndarray):
+        self.names = list(names)
+        nb_node = len(self.names)
+        self.edges_array = unique_edges(nb_node, edges)
+        # CSR adjacency ; loops appear once in the neighbors of their node
+        sources, targets = self.edges_array[:, 0], self.edges_array[:, 1]
+        not_loop = sources != targets
+        tails = numpy.concatenate((sources, targets[not_loop]))
+        heads = numpy.concatenate((targets, sources[not_loop]))
+        order = numpy.argsort(tails, kind='stable')
+        self.neighbors_array = heads[order].astype(numpy.int32)
+        self.offsets = numpy.zeros(nb_node + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(tails, minlength=nb_node), out=self.offsets[1:])
+        self._index = None
+
+    @staticmethod
+    def from_networkx(graph:networkx.Graph) -> 'CompactGraph':
+        return CompactGraph(list(graph.nodes), edge_array(graph)[1])
+
+    def to_networkx(self) -> networkx.Graph:
+        graph = networkx.Graph()
+        graph.add_nodes_from(self.names)
+        graph.add_edges_from(self.edges)
+        return graph
+
+    def relabeled(self, names:iter) -> 'CompactGraph':
+        """Return the same graph with given new node names, sharing the arrays
+
+        >>> list(CompactGraph(['a', 'b', 'c'], [[0, 1]]).relabeled([1, 2, 3]).edges)
+        [(1, 2)]
+
+        """
+        graph = copy.copy(self)
+        graph.names, graph._index = list(names), None
+        if len(graph.names) != len(self.names):
+            raise ValueError("{} names given for {} nodes".format(len(graph.names), len(self.names)))
+        return graph
+
+    @property
+    def index(self) -> dict:
+        """Map from node name to node id"""
+        if self._index is None:
+            self._index = {name: idx for idx, name in enumerate(self.names)}
+        return self._index
+
+    @property
+    def nodes(self) -> list:
+        return self.names
+
+    @property
+    def edges(self) -> 'EdgeView':
+        return EdgeView(self)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def number_of_nodes(self) -> int:
+        return len(self.names)
+
+    def number_of_edges(self) -> int:
+        return len(self.edges_array)
+
+    def number_of_selfloops(self) -> int:
+        return int(numpy.count_nonzero(self.edges_array[:, 0] == self.edges_array[:, 1]))
+
+    def neighbor_ids(self, node_id:int) -> numpy.ndarray:
+        return self.neighbors_array[self.offsets[node_id]:self.offsets[node_id+1]]
+
+    def neighbors(self, node) -> iter:
+        return (self.names[idx] for idx in self.neighbor_ids(self.index[node]).tolist())
+
+    def degrees(self) -> numpy.ndarray:
+        """Return the degree of each node, loops counting twice as in networkx"""
+        degrees = numpy.diff(self.offsets)
+        loops = self.edges_array[self.edges_array[:, 0] == self.edges_array[:, 1], 0]
+        return degrees + numpy.bincount(loops, minlength=len(self.names))
+
+    def ball(self, nodes:iter, order:int=1) -> list:
+        """Return the nodes at distance at most order of given ones,
+        ignoring unknown nodes
+
+        >>> CompactGraph('abcde', [[0, 1], [1, 2], [2, 3], [3, 4]]).ball('c', 1)
+        ['b', 'c', 'd']
+
+        """
+        index = self.index
+        seeds = numpy.array([index[node] for node in nodes if node in index], dtype=numpy.int64)
+        return [self.names[idx] for idx in ball(self.offsets, self.neighbors_array, seeds, order).tolist()]
+
+    def extracted(self, nodes:iter, order:int=1) -> (list, numpy.ndarray):
+        """Return names of the nodes at distance at most order of given ones,
+        and the edges between them as indexes in the returned names
+
+        >>> names, edges = CompactGraph('abcd', [[0, 1], [1, 2], [2, 3]]).extracted('a', 1)
+        >>> names, edges.tolist()
+        (['a', 'b'], [[0, 1]])
+
+        """
+        index = self.index
+        seeds = numpy.array([index[node] for node in nodes if node in index], dtype=numpy.int64)
+        node_ids = ball(self.offsets, self.neighbors_array, seeds, order)
+        edges = induced_edges(self.offsets, self.neighbors_array, node_ids)
+        return [self.names[idx] for idx in node_ids.tolist()], edges
+
+    def subgraph(self, nodes:iter) -> 'CompactGraph':
+        """Return the subgraph induced by given nodes"""
+        index = self.index
+        kept = numpy.zeros(len(self.names), dtype=bool)
+        kept[[index[node] for node in nodes if node in index]] = True
+        new_ids = numpy.cumsum(kept, dtype=numpy.int64) - 1
+        edges = self.edges_array[kept[self.edges_array[:, 0]] & kept[self.edges_array[:, 1]]]
+        names = [name for name, keep in zip(self.names, kept.tolist()) if keep]
+        return CompactGraph(names, new_ids[edges])
+
+    def connected_components(self) -> iter:
+        """Yield set of node names for each connected component"""
+        labels = graph_stats(*edge_array(self)).labels
+        nodes_per_cc = [set() for _ in range(int(labels.max()) + 1 if len(labels) else 0)]
+        for name, label in zip(self.names, labels.tolist()):
+            nodes_per_cc[label].add(name)
+        yield from nodes_per_cc
+
+
+def unique_edges(nb_node:int, edges:numpy.ndarray) -> numpy.ndarray:
+    """Return given (nb edge, 2) array of undirected edges without duplicates,
+    keeping the first occurrence of each edge and the input order.
+
+    >>> unique_edges(3, [[0, 1], [1, 2], [1, 0], [2, 2], [2, 2]]).tolist()
+    [[0, 1], [1, 2], [2, 2]]
+
+    """
+    edges = numpy.asarray(edges, dtype=numpy.int32).reshape(-1, 2)
+    low = numpy.minimum(edges[:, 0], edges[:, 1]).astype(numpy.int64)
+    high = numpy.maximum(edges[:, 0], edges[:, 1]).astype(numpy.int64)
+    _, first = numpy.unique(low * nb_node + high, return_index=True)
+    first.sort()
+    return numpy.ascontiguousarray(edges[first])
+
+
+def ball(offsets:numpy.ndarray, neighbors:numpy.ndarray, seeds:numpy.ndarray,
+         order:int=1) -> numpy.ndarray:
+    """Return the sorted ids of the nodes at distance at most order of seeds,
+    in the CSR adjacency given by offsets and neighbors arrays.
+
+    Only the frontier, i.e. the nodes reached at the previous step,
+    is expanded at each step. The neighbors array is only read at the
+    offsets of the frontier, so it can be memory mapped.
+
+    >>> offsets, neighbors = numpy.array([0, 1, 3, 5, 6]), numpy.array([1, 0, 2, 1, 3, 2])
+    >>> ball(offsets, neighbors, [0], 2).tolist()
+    [0, 1, 2]
+
+    """
+    reached = numpy.zeros(len(offsets) - 1, dtype=bool)
+    frontier = numpy.unique(numpy.asarray(seeds, dtype=numpy.int64))
+    reached[frontier] = True
+    for _ in range(order):
+        if not len(frontier):
+            break
+        _, found = gathered_neighbors(offsets, neighbors, frontier)
+        frontier = numpy.unique(found[~reached[found]])
+        reached[frontier] = True
+    return numpy.flatnonzero(reached)
+
+
+def gathered_neighbors(offsets:numpy.ndarray, neighbors:numpy.ndarray,
+                       nodes:numpy.ndarray) -> (numpy.ndarray, numpy.ndarray):
+    """Return the arrays of sources and targets of the edges starting
+    from given nodes, in the CSR adjacency given by offsets and neighbors
+
+    >>> offsets, neighbors = numpy.array([0, 1, 3, 5, 6]), numpy.array([1, 0, 2, 1, 3, 2])
+    >>> [array.tolist() for array in gathered_neighbors(offsets, neighbors, numpy.array([1, 3]))]
+    [[1, 1, 3], [0, 2, 2]]
+
+    """
+    nodes = numpy.asarray(nodes, dtype=numpy.int64)
+    starts = numpy.asarray(offsets[nodes], dtype=numpy.int64)
+    lengths = numpy.asarray(offsets[nodes + 1], dtype=numpy.int64) - starts
+    # positions of the neighbors of all nodes in the neighbors array
+    positions = numpy.arange(int(lengths.sum())) + numpy.repeat(starts - (numpy.cumsum(lengths) - lengths), lengths)
+    return numpy.repeat(nodes, lengths), numpy.asarray(neighbors[positions], dtype=numpy.int64)
+
+
+def induced_edges(offsets:numpy.ndarray, neighbors:numpy.ndarray,
+                  node_ids:numpy.ndarray) -> numpy.ndarray:
+    """Return the (nb edge, 2) array of the edges between given sorted node ids,
+    as indexes in node_ids, in the CSR adjacency given by offsets and neighbors
+
+    >>> offsets, neighbors = numpy.array([0, 1, 3, 5, 6]), numpy.array([1, 0, 2, 1, 3, 2])
+    >>> induced_edges(offsets, neighbors, numpy.array([1, 2, 3])).tolist()
+    [[0, 1], [1, 2]]
+
+    """
+    node_ids = numpy.asarray(node_ids, dtype=numpy.int64)
+    sources, targets = gathered_neighbors(offsets, neighbors, node_ids)
+    positions = numpy.minimum(numpy.searchsorted(node_ids, targets), max(len(node_ids) - 1, 0))
+    kept = (sources <= targets) & (node_ids[positions] == targets)  # each edge once
+    return numpy.stack((numpy.searchsorted(node_ids, sources[kept]), positions[kept]), axis=1)
+
+
+class EdgeView:
+    """Sized iterable over the edges of a CompactGraph, as pairs of node names"""
+
+    def __init__(self, graph:CompactGraph):
+        self.graph = graph
+
+    def __len__(self):
+        return self.graph.number_of_edges()
+
+    def __iter__(self):
+        names = self.graph.names
+        return ((names[source], names[target])
+                for source, target in self.graph.edges_array.tolist())
@@ -0,0 +1,161 @@
+"""Formal concepts of a graph, computed by the clingo solver.
+
+The graph is seen as the formal context relating each node to its
+neighbors: a concept is a pair of node sets (objects, attributes) such that
+the attributes are exactly the neighbors common to all objects, and
+the objects all the nodes neighbor of all attributes. Concepts with no empty
+side are the maximal bicliques of the graph, called motifs here.
+The AOC poset is made of the concepts introducing a node, as object
+or as attribute.
+
+The graph facts and the encoding are grounded once in a clingo Control.
+The queries (counting the concepts or the AOC concepts, finding the biggest
+motif) are toggled by external atoms, and solved with the solver threads,
+during at most a given time, after which the partial result is returned.
+The grounding can't be stopped, and is quadratic in the number of nodes
+(conditional literals relate all of them): its time is estimated beforehand,
+so that a computation under a time budget is skipped if it can't fit.
+
+"""
+
+import time
+import logging
+from collections import namedtuple
+from phasme.stats import edge_array
+
+
+LOGGER = logging.getLogger(__name__)
+
+ENCODING = """
+rel(X,Y) :- edge(X,Y) ; X != Y.
+rel(Y,X) :- edge(X,Y) ; X != Y.
+node(X) :- rel(X,_).
+
+% objects, and attributes shared by all of them
+{ obj(X) } :- node(X).
+:- not obj(_).
+att(Y) :- obj(X0) ; rel(X0,Y) ; rel(X,Y): obj(X).
+:- not att(_).
+% closure: all nodes sharing the attributes are objects
+:- node(X) ; not obj(X) ; rel(X,Y): att(Y).
+
+% AOC poset: concepts of an object or of an attribute
+#external aoc.
+intro :- obj(X) ; att(Y): rel(X,Y).
+intro :- att(Y) ; obj(X): rel(X,Y).
+:- aoc ; not intro.
+
+% biggest motif: concept covering the most edges
+#external biggest.
+:~ biggest ; obj(X) ; att(Y) ; rel(X,Y). [-1,X,Y]
+"""
+# seconds per pair of nodes needed to ground the encoding and to prepare
+#  the first solving, which can't be stopped either (as measured)
+SECONDS_PER_PAIR = 1e-5
+
+
+class SolverResult(namedtuple('SolverResult', 'value complete')):
+    """Value found by the solver, complete being False if the search
+    was stopped by the timeout before its end"""
+    __slots__ = ()
+
+
+def clingo_module():
+    try:
+        import clingo
+    except ImportError:
+        raise ValueError("Package clingo is needed to compute concepts and motifs")
+    return clingo
+
+
+class ConceptSolver:
+    """Solver of the concept queries over given graph (networkx or CompactGraph),
+    grounded once.
+
+    threads -- number of solver threads (clingo --parallel-mode)
+
+    """
+
+    def __init__(self, graph, threads:int=1):
+        clingo = clingo_module()
+        self.names = list(graph.nodes)
+        _, edges = edge_array(graph)
+        self.control = clingo.Control(['--parallel-mode={}'.format(threads)] if threads > 1 else [],
+                                      logger=lambda code, message: LOGGER.info(message.strip()))
+        self.control.add('base', [], ''.join('edge({},{}).'.format(*edge) for edge in edges.tolist()))
+        self.control.add('base', [], ENCODING)
+        self.control.ground([('base', [])])
+        self.aoc, self.biggest = clingo.Function('aoc'), clingo.Function('biggest')
+
+    def solve(self, on_model:callable, timeout:float=None, aoc:bool=False,
+              biggest:bool=False) -> bool:
+        """Call on_model on each model of the query, during at most given
+        number of seconds, and return True if the search was complete"""
+        self.control.assign_external(self.aoc, aoc)
+        self.control.assign_external(self.biggest, biggest)
+        self.control.configuration.solve.models = 0
+        self.control.configuration.solve.opt_mode = 'opt' if biggest else 'ignore'
+        with self.control.solve(on_model=on_model, async_=True) as handle:
+            if not handle.wait(timeout):
+                handle.cancel()
+                LOGGER.info("Solving stopped after %s seconds.", timeout)
+                return False
+            return handle.get().exhausted
+
+    def nb_concepts(self, timeout:float=None, aoc:bool=False) -> SolverResult:
+        """Return the number of concepts, or of concepts of the AOC poset"""
+        nb_model = 0
+        def on_model(model):
+            nonlocal nb_model
+            nb_model += 1
+        complete = self.solve(on_model, timeout, aoc=aoc)
+        return SolverResult(nb_model, complete)
+
+    def biggest_motif(self, timeout:float=None) -> SolverResult:
+        """Return the two sets of nodes of the biclique covering the most edges,
+        or the best found before the timeout"""
+        best = frozenset(), frozenset()
+        def on_model(model):
+            nonlocal best
+            sides = {'obj': set(), 'att': set()}
+            for atom in model.symbols(shown=True):
+                if atom.name in sides:
+                    sides[atom.name].add(self.names[atom.arguments[0].number])
+            best = frozenset(sides['obj']), frozenset(sides['att'])
+        complete = self.solve(on_model, timeout, biggest=True)
+        return SolverResult(best, complete)
+
+
+def preparation_time(nb_node:int) -> float:
+    """Estimated number of seconds needed to ground the encoding for a graph
+    of given number of nodes, and to start solving it
+
+    >>> preparation_time(1000)
+    10.0
+
+    """
+    return nb_node * nb_node * SECONDS_PER_PAIR
+
+
+def concept_counts(graph, budget:float=None, threads:int=1) -> (SolverResult, SolverResult):
+    """Return the number of concepts and of AOC concepts of given graph,
+    computed in at most budget seconds overall, grounding included,
+    or None if the grounding is expected to exceed the budget.
+    The time remaining after the grounding is shared by the two queries.
+
+    >>> import networkx
+    >>> concept_counts(networkx.complete_bipartite_graph(2, 3))
+    (SolverResult(value=2, complete=True), SolverResult(value=2, complete=True))
+    >>> concept_counts(networkx.empty_graph(1000), budget=1) is None
+    True
+
+    """
+    start = time.monotonic()
+    if budget is not None and preparation_time(len(graph.nodes)) > budget:
+        LOGGER.info("Concepts not computed: grounding %d nodes would exceed %s seconds.",
+                    len(graph.nodes), budget)
+        return None
+    solver = ConceptSolver(graph, threads)
+    remaining = lambda: None if budget is None else max(0., start + budget - time.monotonic())
+    nb_concept = solver.nb_concepts(timeout=None if budget is None else remaining() / 2)
+    return nb_concept, solver.nb_concepts(timeout=remaining(), aoc=True)
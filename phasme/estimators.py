@@ -0,0 +1,200 @@
+"""Sampling-based estimators of graph properties too costly to compute
+exactly on big graphs.
+
+The number of samples only depends on the wanted precision, so that the
+run time is bounded and predictable: wedges for the clustering and the
+transitivity, source nodes of BFS for the distances, and pairs of nodes
+for the connectivity.
+Each estimator returns an Estimate, holding the 95% confidence interval.
+Distances and connectivities are not in [0, 1]: their precision is relative
+to a bound of their range, and their interval is given by the empirical
+Bernstein bound, which holds whatever their distribution in this range.
+
+"""
+
+import math
+import numpy
+import networkx
+from collections import namedtuple
+from networkx.algorithms.connectivity import local_node_connectivity
+
+
+DEFAULT_EPSILON = 0.05
+CONNECTIVITY_EPSILON = 0.2  # each sample is a max-flow: 47 of them instead of 738
+DELTA = 0.05  # confidence intervals are at 1 - DELTA
+Z_SCORE = 1.96  # of the normal distribution, for 1 - DELTA
+
+
+class Estimate(namedtuple('Estimate', 'value low high')):
+    """Estimated value, and bounds of its confidence interval"""
+    __slots__ = ()
+
+    @staticmethod
+    def from_samples(samples:numpy.ndarray, low:float=-math.inf,
+                     high:float=math.inf) -> 'Estimate':
+        """Estimate of the mean of given samples, with bounds of the interval
+        given by the normal approximation, and clipped into [low, high]
+
+        >>> Estimate.from_samples(numpy.array([1., 1., 0., 0.]), 0, 1)
+        Estimate(value=0.5, low=0.0, high=1.0)
+
+        """
+        samples = numpy.asarray(samples, dtype=float)
+        if not len(samples):
+            return Estimate(0., 0., 0.)
+        mean = float(samples.mean())
+        half_width = Z_SCORE * float(samples.std(ddof=1)) / math.sqrt(len(samples)) if len(samples) > 1 else math.inf
+        return Estimate(mean, float(max(low, mean - half_width)), float(min(high, mean + half_width)))
+
+    @staticmethod
+    def from_bounded_samples(samples:numpy.ndarray, low:float, high:float) -> 'Estimate':
+        """Estimate of the mean of given samples, all in [low, high], with bounds
+        of the interval given by the empirical Bernstein bound (Audibert et al. 2009)
+
+        >>> Estimate.from_samples(numpy.full(100, 2.), 0, 10)
+        Estimate(value=2.0, low=2.0, high=2.0)
+        >>> estimate = Estimate.from_bounded_samples(numpy.full(100, 2.), 0, 10)
+        >>> round(estimate.low, 3), round(estimate.high, 3)
+        (0.772, 3.228)
+
+        """
+        samples = numpy.asarray(samples, dtype=float)
+        if not len(samples):
+            return Estimate(0., 0., 0.)
+        mean, log_term = float(samples.mean()), math.log(3 / DELTA)
+        half_width = (math.sqrt(2 * float(samples.var()) * log_term / len(samples))
+                      + 3 * (high - low) * log_term / len(samples))
+        return Estimate(mean, float(max(low, mean - half_width)), float(min(high, mean + half_width)))
+
+
+def nb_samples(epsilon:float=DEFAULT_EPSILON, delta:float=DELTA) -> int:
+    """Number of samples needed to estimate a mean of values in [0, 1]
+    with an error above epsilon with probability at most delta (Hoeffding),
+    or a mean of values in a range of size R with an error above epsilon * R
+
+    >>> nb_samples(0.05)
+    738
+
+    """
+    return math.ceil(math.log(2 / delta) / (2 * epsilon ** 2))
+
+
+def neighbor_lists(graph:networkx.Graph) -> (list, list):
+    """Return nodes of given graph, and the list of neighbors of each of them
+    as node indexes, loops excluded"""
+    nodes = list(graph.nodes)
+    index = {node: idx for idx, node in enumerate(nodes)}
+    return nodes, [[index[nei] for nei in graph.adj[node] if nei != node] for node in nodes]
+
+
+def closed_wedges(neighbors:list, centers:numpy.ndarray, rand) -> numpy.ndarray:
+    """Return, for each given center, 1 if a random wedge centered on it
+    is closed, else 0. Centers must have at least two neighbors."""
+    adjacency = [None] * len(neighbors)  # neighbor sets, built on demand
+    degrees = numpy.array([len(neighbors[center]) for center in centers.tolist()], dtype=numpy.int64)
+    firsts = (rand.random(len(centers)) * degrees).astype(numpy.int64)
+    seconds = (rand.random(len(centers)) * (degrees - 1)).astype(numpy.int64)
+    seconds += seconds >= firsts  # the two neighbors are distinct
+    closed = numpy.zeros(len(centers), dtype=float)
+    for idx, (center, first, second) in enumerate(zip(centers.tolist(), firsts.tolist(), seconds.tolist())):
+        first, second = neighbors[center][first], neighbors[center][second]
+        if adjacency[first] is None:
+            adjacency[first] = set(neighbors[first])
+        closed[idx] = second in adjacency[first]
+    return closed
+
+
+def transitivity(graph:networkx.Graph, epsilon:float=DEFAULT_EPSILON,
+                 seed:int=None) -> Estimate:
+    """Estimate the ratio of closed wedges, with wedges sampled uniformly
+
+    >>> estimate = transitivity(networkx.complete_graph(5), seed=1)
+    >>> estimate.value, estimate.low, estimate.high
+    (1.0, 1.0, 1.0)
+
+    """
+    rand = numpy.random.default_rng(seed)
+    _, neighbors = neighbor_lists(graph)
+    degrees = numpy.array([len(neis) for neis in neighbors], dtype=float)
+    wedges = degrees * (degrees - 1) / 2
+    if not wedges.sum():
+        return Estimate(0., 0., 0.)
+    centers = rand.choice(len(neighbors), nb_samples(epsilon), p=wedges / wedges.sum())
+    return Estimate.from_samples(closed_wedges(neighbors, centers, rand), 0., 1.)
+
+
+def average_clustering(graph:networkx.Graph, epsilon:float=DEFAULT_EPSILON,
+                       seed:int=None) -> Estimate:
+    """Estimate the average clustering coefficient, with one random wedge
+    for each node sampled uniformly. Nodes of degree below 2 count as 0.
+
+    >>> average_clustering(networkx.star_graph(5), seed=1).value
+    0.0
+
+    """
+    rand = numpy.random.default_rng(seed)
+    _, neighbors = neighbor_lists(graph)
+    if not neighbors:
+        return Estimate(0., 0., 0.)
+    nodes = rand.integers(0, len(neighbors), nb_samples(epsilon))
+    has_wedge = numpy.array([len(neighbors[node]) >= 2 for node in nodes.tolist()], dtype=bool)
+    samples = numpy.zeros(len(nodes), dtype=float)
+    samples[has_wedge] = closed_wedges(neighbors, nodes[has_wedge], rand)
+    return Estimate.from_samples(samples, 0., 1.)
+
+
+def average_shortest_path_length(graph:networkx.Graph, connected:bool=True,
+                                 epsilon:float=DEFAULT_EPSILON, seed:int=None) -> Estimate:
+    """Estimate the average distance between nodes, with BFS from
+    source nodes sampled uniformly. All nodes are used as sources
+    if there are fewer of them than samples, giving the exact value.
+
+    The mean distance from a source is in [1, 2e - 1], e being
+    the eccentricity of the first source, since the diameter is at most 2e.
+
+    >>> average_shortest_path_length(networkx.path_graph(3))
+    Estimate(value=1.3333333333333333, low=1.3333333333333333, high=1.3333333333333333)
+
+    """
+    if not connected:
+        raise networkx.NetworkXError("Graph is not connected.")
+    nodes = list(graph.nodes)
+    if len(nodes) < 2:
+        return Estimate(0., 0., 0.)
+    rand = numpy.random.default_rng(seed)
+    nb_source = nb_samples(epsilon)
+    exact = nb_source >= len(nodes)
+    sources = range(len(nodes)) if exact else rand.choice(len(nodes), nb_source, replace=False).tolist()
+    samples, eccentricity = [], 0
+    for source in sources:
+        lengths = networkx.single_source_shortest_path_length(graph, nodes[source]).values()
+        samples.append(sum(lengths) / (len(nodes) - 1))
+        eccentricity = eccentricity or max(lengths)
+    if exact:
+        value = float(numpy.mean(samples))
+        return Estimate(value, value, value)
+    return Estimate.from_bounded_samples(samples, 1., max(1., 2. * eccentricity - 1))
+
+
+def average_node_connectivity(graph:networkx.Graph, epsilon:float=CONNECTIVITY_EPSILON,
+                              seed:int=None) -> Estimate:
+    """Estimate the average number of node independent paths between
+    two nodes, with pairs of nodes sampled uniformly.
+    The connectivity of two nodes is in [0, d], d being the maximal degree.
+
+    >>> average_node_connectivity(networkx.cycle_graph(6), seed=1).value
+    2.0
+
+    """
+    nodes = list(graph.nodes)
+    if len(nodes) < 2:
+        return Estimate(0., 0., 0.)
+    rand = numpy.random.default_rng(seed)
+    nb_pair = nb_samples(epsilon)
+    sources = rand.integers(0, len(nodes), nb_pair)
+    targets = rand.integers(0, len(nodes) - 1, nb_pair)
+    targets += targets >= sources  # the two nodes are distinct
+    samples = numpy.array([local_node_connectivity(graph, nodes[source], nodes[target])
+                           for source, target in zip(sources.tolist(), targets.tolist())], dtype=float)
+    max_degree = max((degree for _, degree in graph.degree), default=0)
+    return Estimate.from_bounded_samples(samples, 0., float(max_degree))
@@ -1,59 +1,362 @@
 
 import re
+import logging
 import argparse
+import itertools
+import functools
 import clyngor
+from phasme import commons
 from phasme.commons import edge_predicate
 
 
+LOGGER = logging.getLogger(__name__)
+
+# Tokens of ASP code that are relevant to find the end of statements
+STATEMENT_TOKENS = re.compile(r'"(?:\\.|[^"\\\n])*"|%\*.*?\*%|%\*|%[^\n]*|"|\.\.+|[().]|[^"%().]+', re.S)
+# ASP strings and comments, to be ignored when looking for predicates
+COMMENTS_AND_STRINGS = re.compile(r'"(?:\\.|[^"\\\n])*"|%\*.*?\*%|%[^\n]*', re.S)
+# Parenthesis and identifiers of ASP code, to find its predicates
+PREDICATE_TOKENS = re.compile(r"[()]|(?<![#\w'])[a-z_][\w']*")
+# Constants and integrity constraints, that may change the clean lines too
+GLOBAL_STATEMENTS = r'#const|(?:^|\.)[ \t]*:-'
+# Name of the constants defined in cleaned ASP code
+CONSTANT_NAMES = re.compile(r'#const\s+([a-z_][\w\']*)')
+
+
 def links_from_file(fname:str, edge_predicate:str=edge_predicate):
     """Yield lines read from possibly dirty ASP file. If any error is found,
     a ValueError is raised.
     """
-    with open(fname) as fd:
-        yield from links_from_lines(fd, edge_predicate=edge_predicate)
+    yield from links_from_lines(FileLines(fname), edge_predicate=edge_predicate)
 
 def links_from_clean_file(fname:str, edge_predicate:str=edge_predicate):
     """Yield lines read from clean ASP file. If any error is found,
     a ValueError is raised.
     """
-    with open(fname) as fd:
+    with commons.open_file(fname) as fd:
         yield from links_from_clean_lines(fd, edge_predicate=edge_predicate)
 
 def links_from_dirty_file(fname:str, edge_predicate:str=edge_predicate):
     """Yield lines read from dirty ASP file. If any error is found,
     a ValueError is raised.
     """
-    with open(fname) as fd:
+    with commons.open_file(fname) as fd:
         yield from links_from_dirty_lines(fd, edge_predicate=edge_predicate)
 
 
-def links_from_lines(lines:iter, edge_predicate:str=edge_predicate):
-    """Yield lines read from ASP file. If any error is found,
-    the dirty method is used for the remaining lines.
+class FileLines:
+    """Iterable over the lines of given file, decompressed according to its
+    extension. Each iteration reads the file again, except for the
+    standard input, that can be read only once.
     """
-    all_lines = tuple(lines)
-    lines = iter(all_lines)
-    edges = []  # accumulate edges
-    try:
-        for line in lines:
-            edges.extend(links_from_clean_lines((line,)))
-    except ValueError:  # file is not a simple ASP file
-        edges = links_from_dirty_lines(all_lines)
-    yield from edges
+
+    def __init__(self, fname:str):
+        self.fname = fname
+        self.nb_read = 0
+
+    def __iter__(self):
+        if self.fname == commons.STDIO and self.nb_read:
+            raise ValueError("Standard input can't be read a second time, but it is "
+                             "necessary because rules are reading the edge predicate.")
+        self.nb_read += 1
+        with commons.open_file(self.fname) as fd:
+            yield from fd
+
+
+def links_from_lines(lines:iter, edge_predicate:str=edge_predicate,
+                     stats:dict=None):
+    """Yield links read from ASP lines, in a single pass.
+
+    Lines are parsed by the clean method. The statements it can't handle are
+    kept aside, and once all the clean links are yielded, those defining
+    links are given to the solver, with the rules and constants they need.
+    If these rules are reading an edge predicate itself, its clean lines
+    are given to the solver too, which needs to read the lines a second time,
+    and the links it gives back are yielded only if not already found clean.
+    If the lines can be read again and may define constants or integrity
+    constraints, nothing is yielded before the second reading, where the clean
+    lines using the constants or the predicates read are given to the solver.
+
+    edge_predicate -- predicate of the edges, or tuple of predicates, links
+                      being then yielded as (predicate, source, target).
+    stats -- if given, dict populated with the number of lines (or statements)
+             handled by each method, and the edge predicates defined by
+             the solved statements.
+
+    """
+    match = edge_regex(edge_predicate).fullmatch
+    statements, pending = [], ''  # dirty statements, unfinished dirty statement
+    absorbed = set()  # indexes of clean lines that are part of dirty statements
+    constants, late_constants = set(), False  # defined constants, defined after clean lines
+    safe = is_replayable(lines) and has_global_statements(lines)
+    nb_clean, nb_dirty = 0, 0
+    for idx, line in enumerate(lines):
+        if not pending:
+            m = match(line)
+            if m and constants and constants.intersection(m.groups()[-2:]):
+                absorbed.add(idx)  # the solver will replace the constants
+            elif m:
+                nb_clean += 1
+                if not safe:
+                    yield m.groups()
+                continue
+            stripped = line.strip()
+            if not stripped or (stripped.startswith('%') and not stripped.startswith('%*')):
+                continue
+        elif match(line):
+            absorbed.add(idx)
+        nb_dirty += 1
+        new_statements, pending = split_statements(pending + line.rstrip('\n') + '\n')
+        statements.extend(new_statements)
+        new_constants = constant_names(new_statements)
+        late_constants |= bool(new_constants and nb_clean)
+        constants |= new_constants
+        if not COMMENTS_AND_STRINGS.sub('', pending).strip():
+            pending = ''  # nothing but comments
+    if pending:
+        statements.append(pending)  # unfinished statement: let the solver complain
+
+    needed, read, defined = solver_statements(statements, edge_predicate)
+    if stats is not None:
+        stats.update({
+            'clean lines': nb_clean,
+            'dirty lines': nb_dirty,
+            'solved statements': len(needed),
+            'ignored statements': len(statements) - len(needed),
+            'clean lines given to solver': nb_clean if read else 0,
+            'solved predicates': defined,
+        })
+    LOGGER.info("%d lines parsed as clean ASP, %d lines left to the solver "
+                "(%d statements needed over %d)%s.", nb_clean, nb_dirty,
+                len(needed), len(statements),
+                ', with the clean lines of ' + ', '.join(sorted(read)) if read else '')
+    typed = isinstance(edge_predicate, tuple)
+    if safe:  # nothing yielded yet
+        to_solve = []  # clean lines changed by the constants or read by the rules
+        for idx, line in enumerate(replayed(lines)):
+            m = idx not in absorbed and match(line)
+            if not m:
+                continue
+            if (m.group(1) in read if typed else read) or constants.intersection(m.groups()[-2:]):
+                to_solve.append(line)
+            else:
+                yield m.groups()
+        if stats is not None:
+            stats['clean lines given to solver'] = len(to_solve)
+        if needed:
+            yield from links_from_dirty_lines(itertools.chain(to_solve, needed),
+                                              edge_predicate=edge_predicate)
+        return
+    if late_constants:
+        LOGGER.warning("Constants defined after clean lines are not applied to them, "
+                       "because the lines can't be read a second time.")
+    if not needed:
+        return
+    if not read:
+        yield from links_from_dirty_lines(needed, edge_predicate=edge_predicate)
+        return
+    produced = set()  # clean links, already yielded
+    def clean_lines(lines:iter) -> iter:
+        for idx, line in enumerate(lines):
+            m = idx not in absorbed and match(line)
+            if m and (not typed or m.group(1) in read):
+                produced.add(m.groups())
+                yield line
+    needed = itertools.chain(clean_lines(replayed(lines)), needed)
+    # the solver reads all its input before giving the atoms
+    for link in links_from_dirty_lines(needed, edge_predicate=edge_predicate):
+        if link not in produced:
+            yield link
+
+
+def replayed(lines:iter) -> iter:
+    """Return given lines ready to be iterated again from the start,
+    or raise ValueError if not possible"""
+    if getattr(lines, 'seekable', lambda: False)():
+        lines.seek(0)
+        return lines
+    if iter(lines) is not lines:  # not an iterator, but a container
+        return lines
+    raise ValueError("Lines can't be read a second time, but it is necessary "
+                     "because rules are reading the edge predicate.")
+
+
+def is_replayable(lines:iter) -> bool:
+    """True if given lines can be iterated again from the start"""
+    if isinstance(lines, FileLines):
+        return lines.fname != commons.STDIO
+    return getattr(lines, 'seekable', lambda: False)() or iter(lines) is not lines
+
+
+def has_global_statements(lines:iter) -> bool:
+    """True if given replayable lines may define constants or integrity
+    constraints, found by a quick scan of the text, ready to be read again.
+
+    >>> has_global_statements(['edge(a,b).', ':- edge(a,b).'])
+    True
+    >>> has_global_statements(['edge(a,b).', 'edge(X,Y):- edge(Y,X).'])
+    False
+
+    """
+    if isinstance(lines, FileLines):  # scan the raw chunks, faster than the lines
+        regex = re.compile(GLOBAL_STATEMENTS.encode(), re.M)
+        with commons.open_file(lines.fname, 'rb') as fd:
+            rest = b''
+            for chunk in iter(functools.partial(fd.read, commons.BUFFER_SIZE), b''):
+                chunk = rest + chunk
+                end = chunk.rfind(b'\n') + 1
+                if regex.search(chunk[:end]):
+                    return True
+                rest = chunk[end:]
+            return bool(regex.search(rest))
+    regex = re.compile(GLOBAL_STATEMENTS, re.M)
+    found = any(regex.search(str(line)) for line in lines)
+    replayed(lines)
+    return found
+
+
+def constant_names(statements:[str]) -> set:
+    """Return names of the constants defined by given statements
+
+    >>> sorted(constant_names(['#const n=2.', 'a(n).', ' #const m = 3 .']))
+    ['m', 'n']
+
+    """
+    return {name for statement in statements
+            for name in CONSTANT_NAMES.findall(COMMENTS_AND_STRINGS.sub(' ', statement))}
+
+
+def split_statements(asp:str) -> ([str], str):
+    """Return the complete statements found in given ASP code,
+    and the remaining unfinished code.
+
+    >>> split_statements('a(1..2). b :- a(X).%*c.*% c(d')
+    (['a(1..2).', ' b :- a(X).'], '%*c.*% c(d')
+    >>> split_statements('a("."). b(a) :- c. %* d. ')
+    (['a(".").', ' b(a) :- c.'], ' %* d. ')
+
+    """
+    statements, start, depth = [], 0, 0
+    for token in STATEMENT_TOKENS.finditer(asp):
+        value = token.group()
+        if value == '(':
+            depth += 1
+        elif value == ')':
+            depth -= 1
+        elif value == '.' and depth == 0:
+            statements.append(asp[start:token.end()])
+            start = token.end()
+        elif value in {'%*', '"'}:  # unfinished comment or string
+            break
+    return statements, asp[start:]
+
+
+def solver_statements(statements:[str], edge_predicate:str=edge_predicate) -> ([str], set, set):
+    """Return the statements needed to derive the edges, and the sets
+    of edge predicates read and defined by these statements.
+    edge_predicate may be a tuple of predicates.
+
+    >>> solver_statements(['#const n=2.', 'a(1..n).', 'b(1).', 'edge(X,X):- a(X).'])
+    (['#const n=2.', 'a(1..n).', 'edge(X,X):- a(X).'], set(), {'edge'})
+    >>> solver_statements(['#show b/1.', 'edge(X,Y):- edge(Y,X).'])
+    (['edge(X,Y):- edge(Y,X).'], {'edge'}, {'edge'})
+    >>> _, read, defined = solver_statements(['a(1).', 'b(X,Y):- c(Y,X).', 'c(3,4).'], ('a', 'b', 'c'))
+    >>> sorted(read), sorted(defined)
+    (['c'], ['a', 'b', 'c'])
+
+    """
+    predicates, selected = [], set()  # (defined, read) predicates of each statement
+    for idx, statement in enumerate(statements):
+        statement = COMMENTS_AND_STRINGS.sub(' ', statement).strip()
+        if statement.startswith('#'):
+            if not statement.startswith('#show'):  # it would hide the edges
+                selected.add(idx)  # constants and other directives are needed
+            predicates.append((set(), set()))
+            continue
+        head, _, body = statement.partition(':-')
+        if head.startswith(':~'):  # weak constraint
+            head, body = '', head
+        head, _, condition = head.partition(':')
+        predicates.append((predicate_names(head),
+                           predicate_names(body) | predicate_names(condition)))
+    edge_predicates = predicate_tuple(edge_predicate)
+    needed, changed = set(edge_predicates), True
+    while changed:
+        changed = False
+        for idx, (defined, read) in enumerate(predicates):
+            if idx not in selected and (defined & needed if defined else read & needed):
+                selected.add(idx)
+                needed |= defined | read
+                changed = True
+    read, defined = set(), set()
+    for idx in selected:
+        read |= predicates[idx][1].intersection(edge_predicates)
+        defined |= predicates[idx][0].intersection(edge_predicates)
+    return [s for idx, s in enumerate(statements) if idx in selected], read, defined
+
+
+def predicate_names(asp:str) -> set:
+    """Return names of the predicates (and possibly of some constants)
+    found in given cleaned ASP code, outside of any term
+
+    >>> sorted(predicate_names('{edge(a,b); p(f(c))} :- q, not r(X), X=s.'))
+    ['edge', 'p', 'q', 'r', 's']
+
+    """
+    names, depth = set(), 0
+    for token in PREDICATE_TOKENS.findall(asp):
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0 and token != 'not':
+            names.add(token)
+    return names
+
+
+@functools.lru_cache(maxsize=None)
+def edge_regex(edge_predicate:str=edge_predicate, handle_comments:bool=True):
+    """Return the compiled regex matching a whole clean ASP line
+    describing one edge, surrounding spaces included.
+    If edge_predicate is a tuple of predicates, the predicate
+    is the first group.
+
+    >>> edge_regex('e').fullmatch(' e(a,"b c"). % comment').groups()
+    ('a', '"b c"')
+    >>> edge_regex(('e', 'f')).fullmatch('f(a,b).').groups()
+    ('f', 'a', 'b')
+
+    """
+    field = r'([a-zA-Z0-9_]+|"[^"]*")'
+    trailing = r'(?:%(?!\*).*)?' if handle_comments else ''
+    if isinstance(edge_predicate, tuple):
+        predicate = '(' + '|'.join(map(re.escape, map(str, edge_predicate))) + ')'
+    else:
+        predicate = re.escape(str(edge_predicate))
+    return re.compile(r'\s*{p}\({f},{f}\)\.\s*{t}\s*'.format(
+        p=predicate, f=field, t=trailing
+    ))
+
+
+def predicate_tuple(edge_predicate) -> tuple:
+    """
+    >>> predicate_tuple('e'), predicate_tuple(('e', 'f'))
+    (('e',), ('e', 'f'))
+    """
+    return edge_predicate if isinstance(edge_predicate, tuple) else (edge_predicate,)
+
 
 def links_from_clean_lines(lines:str, edge_predicate:str=edge_predicate,
                            handle_comments:bool=True):
     """Yield lines read from clean ASP lines. If any error is found,
     a ValueError is raised.
     """
-    field = r'([a-zA-Z0-9_]+|"[^"]*")'
-    trailing = '(\s*%.*)?' if handle_comments else ''
-    reg = re.compile(str(edge_predicate) + r'\({f},{f}\).{t}'.format(f=field, t=trailing))
+    reg = edge_regex(edge_predicate, handle_comments)
 
     def line_match(line:str) -> tuple or None:
         m = reg.fullmatch(line)
         try:
-            return m.groups()[:2]
+            return m.group(1, 2)
         except AttributeError:
             raise ValueError("Non compliant ASP data: '{}'".format(line.strip()))
 
@@ -63,14 +366,110 @@ def links_from_clean_lines(lines:str, edge_predicate:str=edge_predicate,
     yield from map(line_match, lines)
 
 
-def links_from_dirty_lines(lines:str, edge_predicate:str=edge_predicate):
-    """Use the bulldozer to handle these lines by calling ASP solver"""
-    asp = ''.join(map(str,lines))
+def links_from_dirty_lines(lines:str, edge_predicate:str=edge_predicate,
+                           in_process:bool=None):
+    """Use the bulldozer to handle these lines by calling ASP solver.
+
+    Nodes are given in their ASP text, like the ones of the clean lines,
+    so that 1 and "1" are the same node whatever the method reading them.
+
+    edge_predicate -- predicate of the edges, or tuple of predicates, links
+                      being then yielded as (predicate, source, target).
+    in_process -- if True, use the clingo python module, reading the lines
+                  by chunks of statements and the edges in the model symbols.
+                  If False, call the clingo binary through clyngor.
+                  If None, use the clingo module if available.
+
+    """
+    if in_process is None:
+        in_process = clingo_module() is not None
+    if in_process:
+        yield from links_from_dirty_lines_in_process(lines, edge_predicate)
+        return
+    asp = '\n'.join(str(line).rstrip('\n') for line in lines)
     models = clyngor.solve(inline=asp).careful_parsing
+    typed = isinstance(edge_predicate, tuple)
     for model in models.by_predicate:
-        for args in model.get(edge_predicate, ()):
-            if len(args) == 2:
-                yield args
+        for predicate in predicate_tuple(edge_predicate):
+            for args in model.get(predicate, ()):
+                if len(args) == 2:
+                    args = tuple(map(asp_text, args))
+                    yield (predicate,) + args if typed else args
+
+
+def clingo_module():
+    """Return the clingo module, or None if not installed"""
+    try:
+        import clingo
+    except ImportError:
+        return None
+    return clingo
+
+
+def links_from_dirty_lines_in_process(lines:iter, edge_predicate:str=edge_predicate,
+                                      chunk_size:int=2**20):
+    """Same as links_from_dirty_lines, solving in this process with
+    the clingo module, without any text output to parse"""
+    clingo = clingo_module()
+    messages = []  # of the solver, to report errors
+    control = clingo.Control(['0'], logger=lambda code, message: messages.append(message.strip()))
+    def add(asp:str):
+        try:
+            control.add('base', [], asp)
+        except RuntimeError:
+            raise ValueError("Invalid ASP: {}".format(' '.join(messages)))
+    buffer = []
+    for line in lines:
+        buffer.append(str(line).rstrip('\n') + '\n')
+        if len(buffer) >= chunk_size:  # give the complete statements
+            statements, pending = split_statements(''.join(buffer))
+            add(''.join(statements))
+            buffer = [pending]
+    add(''.join(buffer))
+    try:
+        control.ground([('base', [])])
+    except RuntimeError:
+        raise ValueError("Invalid ASP: {}".format(' '.join(messages)))
+    predicates, typed = frozenset(predicate_tuple(edge_predicate)), isinstance(edge_predicate, tuple)
+    values = {}  # symbol -> text, computed once for each node
+    def value(symbol) -> str:
+        found = values.get(symbol)
+        if found is None:
+            found = values[symbol] = str(symbol)
+        return found
+    with control.solve(yield_=True) as handle:
+        for model in handle:
+            for symbol in model.symbols(shown=True):
+                try:  # fewer calls than symbol.match
+                    name = symbol.name
+                    if name not in predicates:
+                        continue
+                    args = symbol.arguments
+                except RuntimeError:  # not a function, like a shown number
+                    continue
+                if len(args) == 2 and typed:
+                    yield name, value(args[0]), value(args[1])
+                elif len(args) == 2:
+                    yield value(args[0]), value(args[1])
+
+
+def asp_text(value:object) -> str:
+    """Return the ASP text of given term as parsed by clyngor careful parsing,
+    so that nodes found by the solver are named as in the clean lines
+
+    >>> asp_text(1), asp_text('"b c"'), asp_text(('f', ('x', -1))), asp_text(('', (1, 'c')))
+    ('1', '"b c"', 'f(x,-1)', '(1,c)')
+    >>> asp_text(('', ('a',))), asp_text(float('-inf'))
+    ('(a,)', '#inf')
+
+    """
+    if isinstance(value, tuple):
+        name, args = value
+        trailing = ',' if not name and len(args) == 1 else ''
+        return '{}({}{})'.format(name, ','.join(map(asp_text, args)), trailing)
+    if isinstance(value, float):
+        return '#sup' if value > 0 else '#inf'
+    return str(value)
 
 
 def read_lines_from_files(fnames:[str]) -> [str]:
@@ -78,6 +477,6 @@ def read_lines_from_files(fnames:[str]) -> [str]:
     if isinstance(fnames, str):
         fnames = [fnames]
     for fname in fnames:
-        with open(fname) as fd:
+        with commons.open_file(fname) as fd:
             for line in map(str.strip, fd):
                 if line: yield line
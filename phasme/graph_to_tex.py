@@ -4,6 +4,7 @@
 import networkx
 import itertools
 from collections import defaultdict
+from phasme import commons
 
 
 TEX_HEAD = r"""
@@ -32,7 +33,7 @@ TEX_FOOT = """
 def graph_to_file(graph, fname:str, engine:str='neato',
                   width:float=12, height:float=8, bend:bool=True):
     """Write in file of given name the tex representation of given graph."""
-    with open(fname, 'w') as fd:
+    with commons.open_file(fname, 'w') as fd:
         lines = tex_from_graph(graph, engine=engine, width=width,
                                height=height, bend_edges=bend)
         for line in lines:
@@ -0,0 +1,199 @@
+"""Incremental statistics of ASP files growing by appended edges.
+
+A state is saved next to the file: the byte offset up to which the file
+was parsed, the node interning table, the union-find forest, the degree
+of each node, the loop count and the set of edges (needed to ignore
+duplicated edges). When the file has grown, only the appended lines
+are parsed, so that the cost of a refresh scales with the new lines.
+The state is only kept for files made of clean ASP lines, since rules
+may derive edges from any part of the file.
+
+"""
+
+import os
+import json
+import hashlib
+import logging
+import numpy
+from phasme import commons
+from phasme.stats import GraphStats, UnionFind, graph_stats
+from phasme.compact import unique_edges
+from phasme.commons import edge_predicate
+from phasme.build_graph import interned, interned_from_file
+from phasme.extract_links import links_from_clean_lines
+
+
+LOGGER = logging.getLogger(__name__)
+STATE_VERSION = 1
+META_EXT, ARRAYS_EXT = '.phasme-state.json', '.phasme-state.npz'
+CHECK_SIZE = 2**16  # bytes hashed to detect that the parsed part was modified
+
+
+class State:
+    """Statistics of the clean ASP lines of a file, up to a byte offset.
+
+    Edges are stored as sorted keys low * 2**32 + high, low and high
+    being the smallest and biggest node index of the edge.
+
+    >>> state = State()
+    >>> state.update([('a', 'b'), ('b', 'a'), ('c', 'c')])
+    >>> state.update([('b', 'c'), ('d', 'e')])
+    >>> stats = state.stats()
+    >>> stats.nb_node, stats.nb_edge, stats.nb_loop, stats.node_per_cc.tolist()
+    (5, 4, 1, [3, 2])
+    >>> state.degrees.tolist()
+    [1, 2, 3, 1, 1]
+
+    """
+
+    def __init__(self, edge_predicate:str=edge_predicate, offset:int=0,
+                 checksum:str=None, names:list=(), parents:numpy.ndarray=(),
+                 degrees:numpy.ndarray=(), edge_keys:numpy.ndarray=(), nb_loop:int=0):
+        self.edge_predicate = edge_predicate
+        self.offset, self.checksum = offset, checksum
+        self.names = list(names)
+        self.forest = UnionFind(parents=numpy.asarray(parents, dtype=numpy.int64).tolist())
+        self.degrees = numpy.asarray(degrees, dtype=numpy.int64)
+        self.edge_keys = numpy.asarray(edge_keys, dtype=numpy.int64)
+        self.nb_loop = nb_loop
+
+    def update(self, links:iter):
+        """Add given links to the statistics"""
+        ids = {name: idx for idx, name in enumerate(self.names)}
+        names, edges = interned(links, ids)
+        nb_new_node = len(names) - len(self.names)
+        self.names = names
+        self.forest.add_nodes(nb_new_node)
+        self.degrees = numpy.concatenate((self.degrees, numpy.zeros(nb_new_node, dtype=numpy.int64)))
+        edges = edges.astype(numpy.int64)
+        keys = numpy.minimum(edges[:, 0], edges[:, 1]) * 2**32 + numpy.maximum(edges[:, 0], edges[:, 1])
+        keys = numpy.unique(keys)
+        keys = keys[~numpy.isin(keys, self.edge_keys, assume_unique=True)]
+        self.edge_keys = numpy.insert(self.edge_keys, numpy.searchsorted(self.edge_keys, keys), keys)
+        lows, highs = keys >> 32, keys & (2**32 - 1)
+        self.degrees += numpy.bincount(numpy.concatenate((lows, highs)), minlength=len(names))
+        self.nb_loop += int(numpy.count_nonzero(lows == highs))
+        self.forest.union_edges(zip(lows.tolist(), highs.tolist()))
+
+    def stats(self) -> GraphStats:
+        labels = self.forest.labels()
+        nb_cc = int(labels.max()) + 1 if len(labels) else 0
+        return GraphStats(
+            nb_node=len(self.names),
+            nb_edge=len(self.edge_keys),
+            nb_loop=self.nb_loop,
+            labels=labels,
+            node_per_cc=numpy.bincount(labels, minlength=nb_cc),
+            edge_per_cc=numpy.bincount(labels[self.edge_keys >> 32], minlength=nb_cc),
+        )
+
+    def read(self, fname:str):
+        """Add the links of the complete lines appended to given file
+        since the last read. Raise ValueError if they are not clean ASP."""
+        end = last_line_end(fname)
+        self.update(links_from_clean_lines(lines_between(fname, self.offset, end),
+                                           edge_predicate=self.edge_predicate))
+        self.offset, self.checksum = end, checksum_of(fname, end)
+
+    def save(self, fname:str):
+        """Save the state next to given file"""
+        meta = {'version': STATE_VERSION, 'edge predicate': self.edge_predicate,
+                'offset': self.offset, 'checksum': self.checksum,
+                'nb loop': self.nb_loop, 'names': self.names}
+        # write in temporary files, then rename, so that readers never see partial states
+        with open(fname + '.tmp' + META_EXT, 'w') as fd:
+            json.dump(meta, fd, ensure_ascii=False)
+        with open(fname + '.tmp' + ARRAYS_EXT, 'wb') as fd:
+            numpy.savez(fd, parents=numpy.array(self.forest.parents, dtype=numpy.int64),
+                        degrees=self.degrees, edge_keys=self.edge_keys)
+        os.replace(fname + '.tmp' + META_EXT, fname + META_EXT)
+        os.replace(fname + '.tmp' + ARRAYS_EXT, fname + ARRAYS_EXT)
+
+    @staticmethod
+    def load(fname:str, edge_predicate:str=edge_predicate) -> 'State' or None:
+        """Return the state saved next to given file, or None if there is none,
+        or if it doesn't describe the beginning of the file anymore"""
+        try:
+            with open(fname + META_EXT) as fd:
+                meta = json.load(fd)
+            arrays = numpy.load(fname + ARRAYS_EXT)
+        except (OSError, ValueError):
+            return None
+        if (meta.get('version') != STATE_VERSION
+                or meta['edge predicate'] != edge_predicate
+                or os.path.getsize(fname) < meta['offset']
+                or checksum_of(fname, meta['offset']) != meta['checksum']):
+            LOGGER.info("Saved state of %s is obsolete: the file is parsed again.", fname)
+            return None
+        return State(edge_predicate, meta['offset'], meta['checksum'], meta['names'],
+                     arrays['parents'], arrays['degrees'], arrays['edge_keys'], meta['nb loop'])
+
+
+def incremental_stats(fname:str, edge_predicate:str=edge_predicate) -> GraphStats:
+    """Return the statistics of given graph file, parsing only the lines
+    appended since the last call, and saving the new state next to the file.
+
+    Files that are not uncompressed clean ASP files are entirely parsed,
+    and no state is saved.
+
+    """
+    fname = commons.normalize_filename(fname)
+    if (fname != commons.STDIO and not commons.compression_of_file(fname)
+            and commons.format_of_file(fname) in {'lp', ''}):
+        state = State.load(fname, edge_predicate) or State(edge_predicate)
+        offset = state.offset
+        try:
+            state.read(fname)
+        except ValueError as err:
+            LOGGER.info("No incremental statistics: %s", err)
+            remove_state(fname)
+        else:
+            LOGGER.info("%d bytes parsed since last state.", state.offset - offset)
+            state.save(fname)
+            return state.stats()
+    names, edges = interned_from_file(fname, edge_predicate=edge_predicate)
+    return graph_stats(len(names), unique_edges(len(names), edges))
+
+
+def remove_state(fname:str):
+    for ext in (META_EXT, ARRAYS_EXT):
+        try:
+            os.remove(fname + ext)
+        except FileNotFoundError:
+            pass
+
+
+def last_line_end(fname:str, block_size:int=CHECK_SIZE) -> int:
+    """Return the offset following the last newline of given file, or 0"""
+    with open(fname, 'rb') as fd:
+        end = fd.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - block_size)
+            fd.seek(start)
+            found = fd.read(end - start).rfind(b'\n')
+            if found >= 0:
+                return start + found + 1
+            end = start
+    return 0
+
+
+def lines_between(fname:str, start:int, end:int) -> iter:
+    """Yield the lines of given file between given byte offsets"""
+    with open(fname, 'rb') as fd:
+        fd.seek(start)
+        remaining = end - start
+        for line in fd:
+            if remaining <= 0:
+                break
+            remaining -= len(line)
+            yield line.decode()
+
+
+def checksum_of(fname:str, offset:int) -> str:
+    """Return hexdigest of the first and last bytes preceding given offset"""
+    digest = hashlib.blake2b()
+    with open(fname, 'rb') as fd:
+        digest.update(fd.read(min(offset, CHECK_SIZE)))
+        fd.seek(max(0, offset - CHECK_SIZE))
+        digest.update(fd.read(offset - fd.tell()))
+    return digest.hexdigest()
@@ -3,11 +3,17 @@
 """
 
 import networkx
-from inspect import getfullargspec
 from collections import OrderedDict
 from phasme import commons
 from phasme.commons import edge_predicate
-from phasme.build_graph import graph_from_file
+from phasme.stats import graph_stats, edge_array, density
+from phasme.build_graph import graph_from_file, as_networkx
+from phasme.incremental import incremental_stats
+from phasme.metrics import METRICS, computed_metrics, EXACT, APPROXIMATE, NOT_IMPLEMENTED
+from phasme.estimators import Estimate
+from phasme.motifs import motif_census
+from phasme.concepts import concept_counts
+from phasme.parallel import nb_workers
 
 
 def yield_info(fname:str, info_motifs:int=0, info_ccs:bool=True,
@@ -15,23 +21,40 @@ def yield_info(fname:str, info_motifs:int=0, info_ccs:bool=True,
                special_nodes:bool=False,
                heavy_computations:bool=False, graph_properties:bool=False,
                negative_results:bool=True,
-               edge_predicate:str=edge_predicate) -> dict:
+               edge_predicate:str=edge_predicate,
+               backend:str='networkx', incremental:bool=False,
+               metrics:iter=(), budget:float=None, max_cost:str=None,
+               approx:float=None, jobs:int=1, motif_sample:float=None) -> dict:
     """Yield (field, value) infos of targets written
 
-    info_motifs -- print info about the n first motifs in the graph
+    info_motifs -- count the motifs of 3 up to given number of nodes (see phasme.motifs)
     info_ccs -- print info about connected components in the graph
+    backend -- graph implementation to use (see build_graph.graph_from_file)
+    incremental -- save a state next to the file, so that next calls
+                   only parse the lines appended to it (see phasme.incremental)
+    metrics -- names of the metrics to compute (see phasme.metrics).
+               All of them are computed if graph_properties is True.
+    budget -- maximal number of seconds given to each metric, and to the
+              concepts of heavy_computations, grounding included. The concepts
+              are skipped if their grounding is expected to exceed it.
+    max_cost -- cost class (see phasme.metrics.COSTS) above which
+                metrics are skipped
+    approx -- if given, precision of the estimation of the metrics
+              that can be estimated by sampling (see phasme.estimators)
+    jobs -- number of processes counting the motifs, and of solver threads
+            computing the concepts
+    motif_sample -- if given, fraction of the motifs to enumerate,
+                    their counts being estimated
 
     """
     outdir = commons.normalize_filename(outdir)
-    graph = graph_from_file(fname, edge_predicate=edge_predicate)
-    nb_node, nb_edge = len(graph.nodes), len(graph.edges)
-    nb_self_loops = sum(1 for _ in graph.selfloop_edges())
-    def density(nb_node, nb_edge):
-        try:
-            return 2 * nb_edge / (nb_node * (nb_node - 1))
-        except ZeroDivisionError:
-            import math
-            return math.nan
+    if incremental:
+        graph = None  # built only if needed
+        stats = incremental_stats(fname, edge_predicate=edge_predicate)
+    else:
+        graph = graph_from_file(fname, edge_predicate=edge_predicate, backend=backend)
+        stats = graph_stats(*edge_array(graph))
+    nb_node, nb_edge, nb_self_loops = stats.nb_node, stats.nb_edge, stats.nb_loop
 
     yield '#node', nb_node
     yield '#edge', nb_edge
@@ -43,18 +66,22 @@ def yield_info(fname:str, info_motifs:int=0, info_ccs:bool=True,
     yield 'density', density(nb_node, nb_edge)
 
     if info_motifs:
-        for motif in ():
-            clyngor.solve()
+        if graph is None:
+            graph = graph_from_file(fname, edge_predicate=edge_predicate, backend=backend)
+        suffix = '' if motif_sample is None else ' (approx)'
+        for size in range(3, info_motifs + 1):
+            census = motif_census(graph, size, jobs=jobs, fraction=motif_sample)
+            for name, count in census.items():
+                yield '#motif ' + name + suffix, count
     if info_ccs:
-        ccs_nodes = tuple(networkx.connected_components(graph))
-        ccs = tuple(graph.subgraph(cc) for cc in ccs_nodes)
-        yield '#cc', len(ccs_nodes)
-        if len(ccs_nodes) > 1:
-            node_per_cc = tuple(map(len, ccs_nodes))
+        yield '#cc', stats.nb_cc
+        if stats.nb_cc > 1:
+            node_per_cc = tuple(stats.node_per_cc.tolist())
             yield '#node/cc', node_per_cc
             yield '#node/cc (prop)', tuple(nb / nb_node for nb in node_per_cc)
             yield '#node/cc (mean)', sum(node_per_cc) / len(node_per_cc)
-            yield 'density/cc', tuple(density(len(nodes), len(tuple(cc.edges))) for cc, nodes in zip(ccs, ccs_nodes))
+            yield 'density/cc', tuple(density(nb_node, nb_edge) for nb_node, nb_edge
+                                      in zip(node_per_cc, stats.edge_per_cc.tolist()))
 
 
     if graphics:
@@ -63,38 +90,51 @@ def yield_info(fname:str, info_motifs:int=0, info_ccs:bool=True,
         # TODO: degree function to clustering coefficient
         ...
 
-    if heavy_computations:
-        # TODO: concept and AOC poset size and ratio.
-        ...
-
-    if special_nodes:
+    if heavy_computations:  # implemented by clingo
+        if graph is None:
+            graph = graph_from_file(fname, edge_predicate=edge_predicate, backend=backend)
+        counts = concept_counts(graph, budget, threads=nb_workers(jobs))
+        if counts is None:
+            yield 'skipped concepts (budget)', True
+        else:
+            nb_concept, nb_aoc = counts
+            partial = lambda result: '' if result.complete else ' (partial)'
+            yield '#concept' + partial(nb_concept), nb_concept.value
+            yield '#AOC concept' + partial(nb_aoc), nb_aoc.value
+            if nb_concept.complete and nb_aoc.complete and nb_aoc.value:
+                yield 'concept/AOC ratio', nb_concept.value / nb_aoc.value
+
+    if special_nodes:  # implemented by networkx
+        if graph is None:
+            graph = graph_from_file(fname, edge_predicate=edge_predicate, backend=backend)
+        graph = as_networkx(graph)
         # TODO: equivalences
         arti_points = tuple(networkx.articulation_points(graph))
         yield '#articulation points', len(arti_points)
         if arti_points:
             yield 'articulation points', arti_points
 
-    if graph_properties:
-        non_implemented = []
-        for attrname, attr in vars(networkx).items():
-            if attrname.startswith('is_'):
-                attrname = attrname[3:]
-                if getfullargspec(attr).args == ['G']:  # only 1 arg
-                    try:
-                        yield attrname, attr(graph)  # discard the 'is_'
-                    except networkx.exception.NetworkXNotImplemented as err:
-                        non_implemented.append(attrname)
-                    except networkx.exception.NetworkXError as err:
-                        non_implemented.append(attrname)
-
-        properties = ('transitivity', 'average_clustering', 'average_node_connectivity', 'average_shortest_path_length')
-        for attrname in properties:
-            try:
-                yield attrname, getattr(networkx, attrname)(graph)
-            except networkx.exception.NetworkXError as err:
-                non_implemented.append(attrname)
+    if graph_properties or metrics:
+        def networkx_graph():
+            return as_networkx(graph if graph is not None else graph_from_file(
+                fname, edge_predicate=edge_predicate, backend=backend))
+        non_implemented, skipped = [], []
+        results = computed_metrics(metrics or tuple(METRICS),
+                                   resources={'graph': networkx_graph, 'stats': stats},
+                                   budget=budget, max_cost=max_cost, epsilon=approx)
+        for name, value, status in results:
+            if status == EXACT:
+                yield name, value
+            elif status == APPROXIMATE:
+                yield name + ' (approx)', value
+            elif status == NOT_IMPLEMENTED:
+                non_implemented.append(name)
+            else:
+                skipped.append(name)
         if non_implemented and negative_results:
             yield 'non implemented', non_implemented
+        if skipped:
+            yield 'skipped (budget or cost)', skipped
 
 
 def info(fname:str, info_motifs:int=0, info_ccs:bool=True,
@@ -102,19 +142,24 @@ def info(fname:str, info_motifs:int=0, info_ccs:bool=True,
          special_nodes:bool=False, heavy_computations:bool=False,
          graph_properties:bool=False,
          round_float:int=None,
-         negative_results:bool=True, edge_predicate:str=edge_predicate) -> dict:
+         negative_results:bool=True, edge_predicate:str=edge_predicate,
+         backend:str='networkx', incremental:bool=False,
+         metrics:iter=(), budget:float=None, max_cost:str=None,
+         approx:float=None, jobs:int=1, motif_sample:float=None) -> dict:
     """Yield lines of text describing given graph info."""
-    infos = OrderedDict(yield_info(fname, info_motifs, info_ccs, graphics, outdir, special_nodes, heavy_computations, graph_properties, negative_results, edge_predicate))
+    infos = OrderedDict(yield_info(fname, info_motifs, info_ccs, graphics, outdir, special_nodes, heavy_computations, graph_properties, negative_results, edge_predicate, backend, incremental, metrics, budget, max_cost, approx, jobs, motif_sample))
     properties = {True: set(), False: set()}
     maxkeylen = max(map(len, infos))
     iter_handler = lambda v: ', '.join(sorted(map(str, v)))
+    float_handler = str if round_float is None else lambda v, r=round_float: str(round(v, r))
     type_handler = {
+        Estimate: lambda v: '{} [{}, {}]'.format(*map(float_handler, v)),
         str: str,
         tuple: iter_handler,
         list: iter_handler,
         set: iter_handler,
         int: str,
-        float: (str if round_float is None else lambda v, r=round_float: str(round(v, r))),
+        float: float_handler,
     }
     def show(field, value, maxkeylen=maxkeylen):
         return field.rjust(maxkeylen+2) + ' | ' + type_handler[type(value)](value)
@@ -0,0 +1,203 @@
+"""Registry of the graph metrics computed on demand by infos.
+
+Each metric declares its cost class and the values it needs, either
+resources given by the caller (the graph, its statistics), or other metrics.
+Each metric is computed at most once, within a wall-clock budget:
+when the budget runs out, the metric is estimated if it can be,
+or skipped, instead of hanging the process. Estimations can also
+be asked directly, with a given precision.
+
+"""
+
+import signal
+import inspect
+import threading
+import functools
+import contextlib
+import networkx
+from collections import namedtuple, OrderedDict
+from phasme import estimators
+
+
+COSTS = ('linear', 'quadratic', 'cubic', 'prohibitive')  # from cheapest to costliest
+EXACT, APPROXIMATE = 'exact', 'approximate'
+TIMEOUT, TOO_COSTLY, NOT_IMPLEMENTED = 'timeout', 'too costly', 'non implemented'
+
+# cost class of the networkx is_* functions, quadratic if not given
+COST_OF_PROPERTY = {
+    'directed': 'linear', 'frozen': 'linear', 'empty': 'linear',
+    'connected': 'linear', 'strongly_connected': 'linear', 'weakly_connected': 'linear',
+    'attracting_component': 'linear', 'biconnected': 'linear', 'semiconnected': 'linear',
+    'directed_acyclic_graph': 'linear', 'aperiodic': 'linear', 'eulerian': 'linear',
+    'semieulerian': 'linear', 'planar': 'linear', 'regular': 'linear', 'triad': 'linear',
+    'bipartite': 'linear', 'arborescence': 'linear', 'branching': 'linear',
+    'forest': 'linear', 'tree': 'linear', 'chordal': 'linear',
+    'distance_regular': 'cubic', 'strongly_regular': 'cubic', 'at_free': 'cubic',
+    'perfect_graph': 'prohibitive',
+}
+
+
+class Metric(namedtuple('Metric', 'name func cost needs approx')):
+    """Metric computed by func, called with the values of the needed
+    metrics or resources. If given, approx is called the same way,
+    with the epsilon keyword (see phasme.estimators), when func exceeds
+    its budget or when an estimation is asked."""
+    __slots__ = ()
+
+
+METRICS = OrderedDict()  # name -> Metric
+
+
+def metric(cost:str, needs:tuple=('graph',), name:str=None, approx:callable=None):
+    """Decorator registering given function as a metric"""
+    if cost not in COSTS:
+        raise ValueError("Cost should be one of {}, not {}".format(', '.join(COSTS), cost))
+    def register(func:callable) -> callable:
+        metric_name = name or func.__name__
+        METRICS[metric_name] = Metric(metric_name, func, cost, tuple(needs), approx)
+        return func
+    return register
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def time_budget(seconds:float=None):
+    """Raise BudgetExceeded in the with block if it lasts more than given seconds.
+
+    There is no limit if seconds is None, or when the platform doesn't
+    provide SIGALRM, or outside of the main thread.
+
+    """
+    if (not seconds or not hasattr(signal, 'setitimer')
+            or threading.current_thread() is not threading.main_thread()):
+        yield
+        return
+    def on_alarm(signum, frame):
+        raise BudgetExceeded()
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def computed_metrics(names:iter, resources:dict, budget:float=None,
+                     max_cost:str=None, epsilon:float=None) -> iter:
+    """Yield (name, value, status) for each given metric name.
+
+    resources -- map from resource name to its value, or to a function
+                 without arguments returning it, called only if needed.
+    budget -- maximal number of seconds given to each metric.
+    max_cost -- metrics of costlier class are not computed.
+    epsilon -- if given, metrics that can be estimated are estimated
+               with this precision instead of computed exactly.
+
+    Status is EXACT or APPROXIMATE, or TIMEOUT, TOO_COSTLY or NOT_IMPLEMENTED
+    with a None value, the metric (or one it needs) not being computed.
+
+    >>> resources = {'graph': lambda: networkx.path_graph(4)}
+    >>> tuple(computed_metrics(['tree', 'average_shortest_path_length'], resources, max_cost='quadratic'))
+    (('tree', True, 'exact'), ('average_shortest_path_length', None, 'too costly'))
+
+    """
+    unknown = [name for name in names if name not in METRICS]
+    if unknown:
+        raise ValueError("Unknown metrics {}. Available metrics: {}"
+                         "".format(', '.join(unknown), ', '.join(METRICS)))
+    results = {}
+    for name in names:
+        yield (name,) + computed(name, resources, results, budget, max_cost, epsilon)
+
+
+def computed(name:str, resources:dict, results:dict, budget:float=None,
+             max_cost:str=None, epsilon:float=None) -> (object, str):
+    """Return (value, status) of given metric or resource, computing it if
+    not already in results"""
+    if name in results:
+        return results[name]
+    if name not in METRICS:  # a resource
+        value = resources[name]
+        results[name] = (value() if callable(value) else value), EXACT
+        return results[name]
+    metric = METRICS[name]
+    if max_cost and COSTS.index(metric.cost) > COSTS.index(max_cost) and not (epsilon and metric.approx):
+        results[name] = None, TOO_COSTLY
+        return results[name]
+    needed = [computed(need, resources, results, budget, max_cost, epsilon) for need in metric.needs]
+    failed = [status for _, status in needed if status not in {EXACT, APPROXIMATE}]
+    if failed:
+        result = None, failed[0]
+    else:
+        args = [value for value, _ in needed]
+        estimate = functools.partial(metric.approx, epsilon=epsilon or default_epsilon(metric.approx)) if metric.approx else None
+        if epsilon and estimate:
+            result = within_budget(estimate, args, budget, APPROXIMATE)
+        else:
+            result = within_budget(metric.func, args, budget, EXACT)
+            if result[1] == TIMEOUT and estimate:
+                result = within_budget(estimate, args, budget, APPROXIMATE)
+    results[name] = result
+    return result
+
+
+def within_budget(func:callable, args:list, budget:float, status:str) -> (object, str):
+    """Return (func(*args), status), or (None, TIMEOUT) if it exceeds
+    given budget, or (None, NOT_IMPLEMENTED) if networkx can't compute it"""
+    try:
+        with time_budget(budget):
+            return func(*args), status
+    except BudgetExceeded:
+        return None, TIMEOUT
+    except networkx.NetworkXException:
+        return None, NOT_IMPLEMENTED
+
+
+def default_epsilon(approx:callable) -> float:
+    """Default precision of given estimator, or estimators.DEFAULT_EPSILON"""
+    parameter = inspect.signature(approx).parameters.get('epsilon')
+    if parameter is None or parameter.default is parameter.empty:
+        return estimators.DEFAULT_EPSILON
+    return parameter.default
+
+
+def graph_only(func:callable) -> bool:
+    """True if given function needs only a graph, named G"""
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return [param.name for param in parameters
+            if param.kind not in {param.VAR_POSITIONAL, param.VAR_KEYWORD}
+            and param.name != 'backend'] == ['G']
+
+
+# all networkx properties of a graph, named without the 'is_'
+for attrname, attr in vars(networkx).items():
+    if attrname.startswith('is_') and callable(attr) and graph_only(attr):
+        metric(COST_OF_PROPERTY.get(attrname[3:], 'quadratic'), name=attrname[3:])(attr)
+
+
+@metric('linear', needs=('stats',))
+def connected(stats) -> bool:
+    """Reuse the connected components found by the basic statistics"""
+    return stats.nb_cc == 1
+
+
+metric('quadratic', name='transitivity',
+       approx=estimators.transitivity)(networkx.transitivity)
+metric('quadratic', name='average_clustering',
+       approx=estimators.average_clustering)(networkx.average_clustering)
+metric('prohibitive', name='average_node_connectivity',
+       approx=estimators.average_node_connectivity)(networkx.average_node_connectivity)
+
+
+@metric('cubic', needs=('graph', 'connected'), approx=estimators.average_shortest_path_length)
+def average_shortest_path_length(graph, connected:bool) -> float:
+    if not connected:  # no need to try
+        raise networkx.NetworkXError("Graph is not connected.")
+    return networkx.average_shortest_path_length(graph)
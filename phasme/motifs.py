@@ -0,0 +1,244 @@
+"""Census of motifs, the connected induced subgraphs of a few nodes.
+
+Subgraphs are enumerated once each by the ESU algorithm (Wernicke 2006,
+as in FANMOD), over integer adjacency sets. Each subgraph is encoded as
+the bitmask of its edges, and its class is given by the canonical form
+of this bitmask, the smallest one over all node permutations, computed
+once per bitmask.
+
+With a sampling fraction, the RAND-ESU variant explores each branch
+of the enumeration with a fixed probability, giving unbiased estimates
+of the counts in a fraction of the time.
+
+"""
+
+import math
+import numpy
+import random
+import itertools
+from collections import Counter, OrderedDict, namedtuple
+from phasme.stats import edge_array
+from phasme.parallel import ordered_map, nb_workers, derived_seeds, SHARED
+
+
+# edges of the motifs having a name, by size
+MOTIFS = {
+    3: OrderedDict((
+        ('wedge', ((0, 1), (1, 2))),
+        ('triangle', ((0, 1), (1, 2), (2, 0))),
+    )),
+    4: OrderedDict((
+        ('4-path', ((0, 1), (1, 2), (2, 3))),
+        ('4-star', ((0, 1), (0, 2), (0, 3))),
+        ('4-cycle', ((0, 1), (1, 2), (2, 3), (3, 0))),
+        ('paw', ((0, 1), (1, 2), (2, 0), (2, 3))),
+        ('diamond', ((0, 1), (1, 2), (2, 0), (2, 3), (3, 0))),
+        ('4-clique', ((0, 1), (1, 2), (2, 0), (2, 3), (3, 0), (3, 1))),
+    )),
+}
+NB_CHUNK = 64  # number of sets of root nodes, whatever the number of processes
+
+
+def pair_bits(size:int) -> dict:
+    """Return the bit of each pair of node indexes (i, j), i < j
+
+    >>> pair_bits(3)
+    {(0, 1): 0, (0, 2): 1, (1, 2): 2}
+
+    """
+    return {pair: bit for bit, pair in enumerate(itertools.combinations(range(size), 2))}
+
+
+def edge_mask(edges:iter, size:int) -> int:
+    """
+    >>> edge_mask([(0, 1), (2, 1)], 3)
+    5
+    """
+    bits = pair_bits(size)
+    return sum(1 << bits[min(edge), max(edge)] for edge in edges)
+
+
+class CanonicalForms(dict):
+    """Map from edge bitmask of a subgraph of given size to the bitmask of
+    its canonical form, computed on first access.
+
+    >>> forms = CanonicalForms(3)
+    >>> forms[0b011] == forms[0b101] == forms[0b110], forms[0b111]
+    (True, 7)
+
+    """
+
+    def __init__(self, size:int):
+        self.size = size
+        bits = pair_bits(size)
+        pairs = list(bits)
+        # for each permutation, new bit of each bit
+        self.permuted_bits = tuple(
+            tuple(bits[min(perm[i], perm[j]), max(perm[i], perm[j])] for i, j in pairs)
+            for perm in itertools.permutations(range(size))
+        )
+
+    def __missing__(self, mask:int) -> int:
+        set_bits = [bit for bit in range(len(self.permuted_bits[0])) if mask >> bit & 1]
+        canonical = self[mask] = min(sum(1 << permuted[bit] for bit in set_bits)
+                                     for permuted in self.permuted_bits)
+        return canonical
+
+
+def motif_names(size:int) -> OrderedDict:
+    """Return the map from canonical bitmask to name of the named motifs of given size"""
+    forms = CanonicalForms(size)
+    return OrderedDict((forms[edge_mask(edges, size)], name)
+                       for name, edges in MOTIFS.get(size, {}).items())
+
+
+def motif_name(mask:int, size:int, names:dict) -> str:
+    """Name of the motif of given canonical bitmask, or its size and bitmask
+    if it has no name"""
+    return names.get(mask) or '{}-motif {}'.format(size, mask)
+
+
+def adjacency_sets(nb_node:int, edges) -> [frozenset]:
+    """Return the set of neighbors of each node, loops excluded"""
+    neighbors = [set() for _ in range(nb_node)]
+    for source, target in edges.tolist():
+        if source != target:
+            neighbors[source].add(target)
+            neighbors[target].add(source)
+    return [frozenset(nodes) for nodes in neighbors]
+
+
+def esu_census(adjacency:list, size:int, roots:iter, probability:float=1.,
+               seed:int=None) -> Counter:
+    """Return the number of connected induced subgraphs of given size
+    for each edge bitmask, counting those whose smallest node is in roots.
+
+    probability -- if below 1, probability to explore each branch at each
+                   level of the enumeration (RAND-ESU), so that each subgraph
+                   is counted with probability probability ** size
+
+    """
+    counts = Counter()
+    rand = random.Random(seed)
+    sampled = probability < 1.
+    bits = pair_bits(size)
+    # for each new node index, bits of the edges with the previous nodes
+    new_bits = [[bits[previous, index] for previous in range(index)] for index in range(size)]
+
+    def extend(sub:list, mask:int, neighborhood:frozenset, extension:list, root:int):
+        index = len(sub)
+        last_bits = new_bits[index]
+        while extension:
+            node = extension.pop()
+            if sampled and rand.random() >= probability:
+                continue
+            neighbors = adjacency[node]
+            node_mask = mask
+            for previous, bit in zip(sub, last_bits):
+                if previous in neighbors:
+                    node_mask |= 1 << bit
+            if index + 1 == size:
+                counts[node_mask] += 1
+            else:
+                extend(sub + [node], node_mask, neighborhood | neighbors,
+                       extension + [other for other in neighbors
+                                    if other > root and other not in neighborhood],
+                       root)
+
+    for root in roots:
+        if sampled and rand.random() >= probability:
+            continue
+        if size == 1:
+            counts[0] += 1
+            continue
+        neighbors = adjacency[root]
+        extend([root], 0, neighbors | {root}, [other for other in neighbors if other > root], root)
+    return counts
+
+
+def census_job(args:tuple) -> Counter:
+    """Census of the subgraphs rooted in given roots, over the shared graph"""
+    roots, size, probability, seed = args
+    if 'adjacency' not in SHARED:  # built once per worker
+        SHARED['adjacency'] = adjacency_sets(SHARED['nb_node'], SHARED['edges'])
+    return esu_census(SHARED['adjacency'], size, roots, probability, seed)
+
+
+class MotifScore(namedtuple('MotifScore', 'count mean std zscore')):
+    """Count of a motif in a graph, mean and standard deviation of its
+    count in the randomized graphs, and the resulting z-score"""
+    __slots__ = ()
+
+    @staticmethod
+    def from_counts(count:float, null_counts:iter) -> 'MotifScore':
+        """Score of given count, the standard deviation of the null counts
+        being the sample one (ddof=1), since there are usually few of them
+
+        >>> MotifScore.from_counts(7, [3, 5, 4])
+        MotifScore(count=7, mean=4.0, std=1.0, zscore=3.0)
+        >>> MotifScore.from_counts(7, [3, 3]).zscore
+        inf
+        """
+        null_counts = numpy.asarray(null_counts, dtype=float)
+        mean = float(null_counts.mean())
+        std = float(null_counts.std(ddof=1 if len(null_counts) > 1 else 0))
+        if std:
+            zscore = (count - mean) / std
+        else:  # only defined if no deviation from the null model
+            zscore = math.copysign(math.inf, count - mean) if count != mean else math.nan
+        return MotifScore(count, mean, std, zscore)
+
+
+def motif_census(graph, size:int=3, jobs:int=1, fraction:float=None,
+                 seed:int=None) -> OrderedDict:
+    """Return the number of connected induced subgraphs of given size in given
+    graph (networkx or CompactGraph), for each motif, by name.
+
+    jobs -- number of processes sharing the root nodes (0 for all cores)
+    fraction -- if given, expected fraction of the subgraphs to enumerate,
+                counts being then estimated
+    seed -- seed of the sampling. Results do not depend on jobs.
+
+    The named motifs are always given, even if not found.
+
+    >>> import networkx
+    >>> dict(motif_census(networkx.complete_graph(4), 3))
+    {'wedge': 0, 'triangle': 4}
+    >>> dict(motif_census(networkx.path_graph(5), 4))['4-path']
+    2
+
+    """
+    return edges_census(*edge_array(graph), size=size, jobs=jobs, fraction=fraction, seed=seed)
+
+
+def edges_census(nb_node:int, edges, size:int=3, jobs:int=1, fraction:float=None,
+                 seed:int=None) -> OrderedDict:
+    """Same as motif_census, for the graph of given number of nodes and
+    (nb edge, 2) array of node ids. With one job, no process is created."""
+    if size < 1:
+        raise ValueError("Motifs must have at least one node, not {}".format(size))
+    if fraction is not None and not 0 < fraction <= 1:
+        raise ValueError("Sampling fraction must be in ]0, 1], not {}".format(fraction))
+    probability = 1. if fraction is None else fraction ** (1 / size)
+    # roots are interleaved, since the first nodes lead to more subgraphs
+    seeds = derived_seeds(seed, NB_CHUNK)
+    chunks = [(range(idx, nb_node, NB_CHUNK), size, probability, seeds[idx])
+              for idx in range(NB_CHUNK)]
+    if nb_workers(jobs) == 1:
+        adjacency = adjacency_sets(nb_node, edges)
+        results = (esu_census(adjacency, size, roots, probability, seed)
+                   for roots, size, probability, seed in chunks)
+    else:
+        results = ordered_map(census_job, chunks, jobs=jobs, chunksize=1,
+                              shared={'nb_node': nb_node, 'edges': edges})
+    masks = Counter()
+    for counts in results:
+        masks.update(counts)
+    forms, names = CanonicalForms(size), motif_names(size)
+    census = OrderedDict((name, 0) for name in names.values())
+    for mask, count in sorted(masks.items()):
+        name = motif_name(forms[mask], size, names)
+        census[name] = census.get(name, 0) + count
+    if fraction is not None:
+        census = OrderedDict((name, count / fraction) for name, count in census.items())
+    return census
@@ -0,0 +1,78 @@
+"""Helpers to run independent jobs in a pool of processes.
+
+Results are always given in the order of the inputs, and random seeds
+are derived from the input index, so that the results are the same
+whatever the number of workers.
+
+"""
+
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+
+def nb_workers(jobs:int) -> int:
+    """Return the number of workers to use for given number of jobs,
+    0 or negative meaning all available cores
+
+    >>> nb_workers(3)
+    3
+    >>> nb_workers(0) == os.cpu_count()
+    True
+
+    """
+    if jobs is None or jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+# data shared by all jobs, sent once to each worker
+SHARED = {}
+
+
+def ordered_map(func:callable, iterable:iter, jobs:int=1, chunksize:int=None,
+                shared:dict=None) -> iter:
+    """Yield func(item) for each item of iterable, in order,
+    computed by given number of worker processes.
+
+    func must be picklable (defined at module level) if jobs is not 1.
+    chunksize -- number of items sent at once to a worker. If None,
+                 the items are sent in four chunks per worker.
+    shared -- data available in SHARED during the jobs, sent only once
+              to each worker.
+
+    """
+    workers = nb_workers(jobs)
+    if workers == 1:
+        set_shared(shared or {})
+        try:
+            yield from map(func, iterable)
+        finally:
+            SHARED.clear()
+        return
+    if chunksize is None:
+        iterable = tuple(iterable)
+        chunksize = max(1, len(iterable) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers, initializer=set_shared,
+                             initargs=(shared or {},)) as pool:
+        yield from pool.map(func, iterable, chunksize=chunksize)
+
+
+def set_shared(shared:dict):
+    SHARED.clear()
+    SHARED.update(shared)
+
+
+def derived_seeds(seed:int, nb:int) -> [int]:
+    """Return nb seeds derived from given one, or None values if seed is None
+
+    >>> derived_seeds(42, 3) == derived_seeds(42, 3)
+    True
+    >>> derived_seeds(None, 2)
+    [None, None]
+
+    """
+    if seed is None:
+        return [None] * nb
+    rand = random.Random(seed)
+    return [rand.getrandbits(63) for _ in range(nb)]
@@ -0,0 +1,86 @@
+"""Degree-preserving randomization of graphs stored as arrays of edges.
+
+The double edge swap replaces two edges (a, b) and (c, d) by (a, c) and (b, d),
+keeping the degree of all nodes. Swaps creating a loop or an already existing
+edge are rejected, existing edges being detected with a hash set.
+
+"""
+
+import numpy
+from collections import namedtuple
+
+
+class SwapReport(namedtuple('SwapReport', 'nb_swap nb_try')):
+    """Number of swaps performed, and number of swaps tried to do so"""
+    __slots__ = ()
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.nb_swap / self.nb_try if self.nb_try else 0.
+
+    def __add__(self, other:'SwapReport') -> 'SwapReport':
+        return SwapReport(self.nb_swap + other.nb_swap, self.nb_try + other.nb_try)
+
+
+def double_edge_swap(edges:numpy.ndarray, nb_swap:int, max_tries:int=None,
+                     seed:int=None, progress:callable=None,
+                     batch_size:int=2**16) -> (numpy.ndarray, SwapReport):
+    """Return a copy of given (nb edge, 2) array of unique undirected edges
+    where nb_swap double edge swaps were performed, and the SwapReport.
+
+    max_tries -- maximal number of tried swaps. Default to 100 * nb_swap.
+    seed -- seed of the random number generator.
+    progress -- if given, called with the SwapReport after each batch of tries.
+    batch_size -- number of random swaps drawn at once.
+
+    >>> edges = [[0, 1], [2, 3], [4, 5], [6, 7]]
+    >>> swapped, report = double_edge_swap(edges, 10, seed=1)
+    >>> swapped.tolist() == double_edge_swap(edges, 10, seed=1)[0].tolist()
+    True
+    >>> report.nb_swap, sorted(numpy.bincount(swapped.ravel()).tolist()) == [1] * 8
+    (10, True)
+
+    """
+    edges = numpy.array(edges, dtype=numpy.int64).reshape(-1, 2)
+    nb_edge = len(edges)
+    if max_tries is None:
+        max_tries = 100 * nb_swap
+    if nb_edge < 2 or nb_swap <= 0:
+        return edges, SwapReport(0, 0)
+    rand = numpy.random.default_rng(seed)
+    nb_node = int(edges.max()) + 1
+    sources, targets = edges[:, 0].tolist(), edges[:, 1].tolist()
+    key = lambda a, b: a * nb_node + b if a < b else b * nb_node + a
+    existing = set(map(key, sources, targets))
+    done, tries = 0, 0
+    while done < nb_swap and tries < max_tries:
+        size = min(batch_size, max_tries - tries)
+        firsts = rand.integers(0, nb_edge, size)
+        seconds = rand.integers(0, nb_edge - 1, size)
+        seconds += seconds >= firsts  # the two edges are distinct
+        flips = rand.integers(0, 2, size)
+        for first, second, flip in zip(firsts.tolist(), seconds.tolist(), flips.tolist()):
+            tries += 1
+            a, b = sources[first], targets[first]
+            if flip:
+                d, c = sources[second], targets[second]
+            else:
+                c, d = sources[second], targets[second]
+            if a == c or b == d:  # would create a loop
+                continue
+            new_first, new_second = key(a, c), key(b, d)
+            if new_first == new_second or new_first in existing or new_second in existing:
+                continue
+            existing.remove(key(a, b))
+            existing.remove(key(c, d))
+            existing.add(new_first)
+            existing.add(new_second)
+            sources[first], targets[first] = a, c
+            sources[second], targets[second] = b, d
+            done += 1
+            if done == nb_swap:
+                break
+        if progress:
+            progress(SwapReport(done, tries))
+    edges[:, 0], edges[:, 1] = sources, targets
+    return edges, SwapReport(done, tries)
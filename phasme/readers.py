@@ -0,0 +1,224 @@
+"""Streaming readers of standard graph formats.
+
+Unlike the networkx readers, these yield the edges as soon as they are
+read, without building any graph nor attribute dict, so that they feed
+the same construction path as the ASP reader.
+
+The kind of graph (directed, multigraph) declared in the header of a file
+is given separately, by the functions of KINDS.
+
+Each reader takes a filename, and the following optional arguments:
+
+on_node -- called with each declared node, in order, so that isolated
+           nodes are not lost.
+attributes -- names of the edge attributes to keep. If given, links are
+              yielded as (source, target, {attribute: value}), with only
+              the given attributes found for the edge.
+
+"""
+
+import re
+import csv
+import html
+from xml.etree import ElementTree
+from phasme import commons
+
+
+def links_from_graphml(fname:str, on_node:callable=None, attributes:iter=()) -> iter:
+    """Yield links found in given GraphML file, parsed incrementally,
+    each element being freed once handled"""
+    attributes = frozenset(attributes)
+    keys = {}  # key id -> (attribute name, converter)
+    graph = None  # element of the graph, whose handled children are deleted
+    with commons.open_file(fname, 'rb') as fd:
+        for event, elem in ElementTree.iterparse(fd, events=('start', 'end')):
+            tag = elem.tag.rpartition('}')[2]
+            if event == 'start':
+                if tag == 'graph' and graph is None:
+                    graph = elem
+                continue
+            if tag == 'key':
+                if elem.get('for', 'all') in {'edge', 'all'} and elem.get('attr.name') in attributes:
+                    keys[elem.get('id')] = elem.get('attr.name'), GRAPHML_TYPES.get(elem.get('attr.type'), str)
+            elif tag == 'node':
+                if on_node:
+                    on_node(elem.get('id'))
+            elif tag == 'edge':
+                if attributes:
+                    found = {}
+                    for data in elem:
+                        if data.get('key') in keys:
+                            name, converter = keys[data.get('key')]
+                            found[name] = converter(data.text or '')
+                    yield elem.get('source'), elem.get('target'), found
+                else:
+                    yield elem.get('source'), elem.get('target')
+            else:
+                continue
+            if graph is not None:
+                del graph[:]  # free handled nodes and edges
+
+def graphml_kind(fname:str) -> (bool, None):
+    """Return (directed, multigraph) of the graph of given GraphML file,
+    read in its header. Multigraph is None, GraphML telling it only
+    by the presence of parallel edges."""
+    with commons.open_file(fname, 'rb') as fd:
+        for _, elem in ElementTree.iterparse(fd, events=('start',)):
+            if elem.tag.rpartition('}')[2] == 'graph':
+                return elem.get('edgedefault') == 'directed', None
+    return False, None
+
+GRAPHML_TYPES = {
+    'int': int, 'long': int, 'float': float, 'double': float, 'string': str,
+    'boolean': lambda value: value.strip().lower() in {'true', '1'},
+}
+
+
+# Tokens of GML: opening and closing brackets, strings, and other words
+GML_TOKENS = re.compile(r'(\[)|(\])|"([^"]*)"|([^\s\[\]"]+)')
+
+
+def gml_tokens(fname:str) -> iter:
+    """Yield (kind, value) for each token of given GML file, kind being
+    one of '[', ']', 'string' or 'word'"""
+    with commons.open_file(fname) as fd:
+        pending = ''  # beginning of a string spanning multiple lines
+        for line in fd:
+            line = pending + line
+            if line.count('"') % 2:
+                pending = line
+                continue
+            pending = ''
+            for opening, closing, string, word in GML_TOKENS.findall(line):
+                if opening:
+                    yield '[', opening
+                elif closing:
+                    yield ']', closing
+                elif word:
+                    if word.startswith('#'):  # comment until end of line
+                        break
+                    yield 'word', word
+                else:
+                    yield 'string', html.unescape(string)
+    if pending:
+        raise ValueError("Unfinished string in GML file {}".format(fname))
+
+
+def gml_value(kind:str, value:str) -> object:
+    """
+    >>> gml_value('word', '2'), gml_value('word', '-1.5'), gml_value('string', '2')
+    (2, -1.5, '2')
+    """
+    if kind == 'string':
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def links_from_gml(fname:str, on_node:callable=None, attributes:iter=()) -> iter:
+    """Yield links found in given GML file, nodes being named by their label,
+    or by their id if they have none. Edges are yielded as soon as
+    their nodes are known."""
+    attributes = frozenset(attributes)
+    names = {}  # node id -> node name
+    waiting = []  # edges whose nodes are not yet known
+    path = []  # keys of the opened lists
+    key, fields = None, {}  # last read key, fields of the current node or edge
+    for kind, value in gml_tokens(fname):
+        if kind == '[':
+            path.append(key)
+            if len(path) == 2 and path[0] == 'graph':
+                fields = {}
+            key = None
+        elif kind == ']':
+            closed = path.pop()
+            if len(path) == 1 and closed == 'node':
+                names[fields['id']] = name = fields.get('label', str(fields['id']))
+                if on_node:
+                    on_node(name)
+            elif len(path) == 1 and closed == 'edge':
+                link = fields['source'], fields['target']
+                if attributes:
+                    link += ({attr: val for attr, val in fields.items() if attr in attributes},)
+                if link[0] in names and link[1] in names:
+                    yield (names[link[0]], names[link[1]]) + link[2:]
+                else:
+                    waiting.append(link)
+        elif key is None:
+            key = value
+        else:  # value of key
+            if len(path) == 2 and path[0] == 'graph':
+                fields[key] = gml_value(kind, value)
+            key = None
+    for link in waiting:
+        try:
+            yield (names[link[0]], names[link[1]]) + link[2:]
+        except KeyError as err:
+            raise ValueError("Edge {}-{} refers to unknown node {} in GML file {}"
+                             "".format(link[0], link[1], err, fname))
+
+
+def gml_kind(fname:str) -> (bool, bool):
+    """Return (directed, multigraph) of the graph of given GML file,
+    as declared before its first node or edge"""
+    found = {'directed': False, 'multigraph': False}
+    path, key = [], None
+    for kind, value in gml_tokens(fname):
+        if kind == '[':
+            if path == ['graph'] and key in {'node', 'edge'}:
+                break
+            path.append(key)
+            key = None
+        elif kind == ']':
+            path.pop()
+        elif key is None:
+            key = value
+        else:
+            if path == ['graph'] and key in found:
+                found[key] = bool(gml_value(kind, value))
+            key = None
+    return found['directed'], found['multigraph']
+
+
+def links_from_edgelist(fname:str, on_node:callable=None, attributes:iter=(),
+                        delimiter:str=None) -> iter:
+    """Yield links found in the first two fields of each line of given file.
+    Empty lines and lines starting with # are ignored. Other fields are ignored,
+    and so are the attributes."""
+    with commons.open_file(fname) as fd:
+        if delimiter == ',':
+            lines = csv.reader(line for line in fd if line.strip() and not line.startswith('#'))
+        else:
+            lines = (line.split(delimiter) for line in fd if line.strip() and not line.startswith('#'))
+        for idx, fields in enumerate(lines, start=1):
+            if len(fields) < 2:
+                raise ValueError("Line {} of {} should give an edge, not: {}"
+                                 "".format(idx, fname, ' '.join(fields).strip()))
+            link = fields[0].strip(), fields[1].strip()
+            yield link + ({},) if attributes else link
+
+
+def links_from_tsv(fname:str, on_node:callable=None, attributes:iter=()) -> iter:
+    return links_from_edgelist(fname, on_node, attributes, delimiter='\t')
+
+def links_from_csv(fname:str, on_node:callable=None, attributes:iter=()) -> iter:
+    return links_from_edgelist(fname, on_node, attributes, delimiter=',')
+
+
+# format -> function returning (directed, multigraph) of a file,
+#  multigraph being None if it depends on the presence of parallel edges
+KINDS = {
+    'graphml': graphml_kind,
+    'gml': gml_kind,
+}
+
+# format -> reader
+READERS = {
+    'graphml': links_from_graphml,
+    'gml': links_from_gml,
+    'edgelist': links_from_edgelist,
+    'tsv': links_from_tsv,
+    'csv': links_from_csv,
+}
@@ -3,35 +3,65 @@
 """
 
 import os
+import time
 import random
+import logging
+import numpy
 import networkx
 import itertools
+from collections import OrderedDict, namedtuple
 from phasme import commons
+from phasme import adjacency
 from phasme.asp import asp_from_graph
 from phasme.info import info
 from phasme.commons import edge_predicate
-from phasme.build_graph import graph_from_file, graph_to_file, graph_from_networkx_method, anonymized, normalized
+from phasme.build_graph import graph_from_file, graph_to_file, graph_from_networkx_method
+from phasme.build_graph import anonymizing, normalizing, renamed, name_map_to_file
+from phasme.build_graph import interned_from_file, edges_to_file, neighborhood
+from phasme.build_graph import is_streamable, streamed_to_file, graphs_from_file
+from phasme.stats import graph_stats, nb_triangle
+from phasme.compact import CompactGraph, unique_edges
+from phasme.extract_links import read_lines_from_files
+from phasme.parallel import ordered_map, derived_seeds, SHARED
+from phasme.randomization import double_edge_swap, SwapReport
+from phasme.motifs import edges_census, MotifScore
+from phasme.concepts import ConceptSolver
 
 
+LOGGER = logging.getLogger(__name__)
+
 def split_by_cc(fname:str, targets:str=None, order:str=None, slice=None,
-                edge_predicate:str=edge_predicate) -> tuple:
-    """Return names of targets written"""
+                edge_predicate:str=edge_predicate, backend:str='networkx',
+                jobs:int=1) -> tuple:
+    """Return names of targets written.
+
+    Components are found with one pass over the edges, and edges are then
+    grouped by component, so that each target is written in one go,
+    without building any graph (except for non-ASP targets).
+
+    backend -- ignored, since no graph is built. Kept for compatibility.
+    jobs -- number of processes writing the components.
+
+    """
     if not targets:
-        name, ext = os.path.splitext(fname)
-        targets = name + '_{}' + ext
+        if fname == commons.STDIO:
+            raise ValueError("Targets should be given when reading the standard input")
+        name = os.path.splitext(commons.uncompressed(fname))[0]
+        targets = name + '_{}' + fname[len(name):]
     elif not isinstance(targets, str):
         raise ValueError("Target should be a filename to write")
     elif '{}' not in targets:
         raise ValueError("Target should be a filename to write containing '{}'")
-    graph = graph_from_file(fname, edge_predicate=edge_predicate)
-    writtens = []
-    ccs = networkx.connected_components(graph)
+    names, edges = interned_from_file(fname, edge_predicate=edge_predicate)
+    edges = unique_edges(len(names), edges)
+    stats = graph_stats(len(names), edges)
+    node_per_cc = stats.node_per_cc.tolist()
+    ccs = list(range(stats.nb_cc))
     if order in {'biggest first', 'smaller last'}:
-        ccs = sorted(tuple(ccs), key=len, reverse=True)
+        ccs.sort(key=node_per_cc.__getitem__, reverse=True)
     elif order in {'biggest last', 'smaller first'}:
-        ccs = sorted(tuple(ccs), key=len)
+        ccs.sort(key=node_per_cc.__getitem__)
     elif order == 'random':
-        ccs = list(ccs)
         random.shuffle(ccs)
     if slice:
         try:
@@ -40,18 +70,36 @@ def split_by_cc(fname:str, targets:str=None, order:str=None, slice=None,
         except TypeError:  # slice is not iterable
             raise ValueError("Slice must be an iterable of two integers")
         start, end = slice
-        ccs = tuple(ccs)[start:end]
-    for idx, cc_nodes in enumerate(ccs, start=1):
-        cc = graph.subgraph(cc_nodes)
-        target = targets.format(idx)
-        graph_to_file(cc, target)
-        writtens.append(target)
-    return tuple(writtens)
+        ccs = ccs[start:end]
+    # nodes and edges sorted by component, and where each component starts
+    nodes_by_cc = numpy.argsort(stats.labels, kind='stable')
+    node_starts = numpy.concatenate(([0], numpy.cumsum(stats.node_per_cc)))
+    edge_starts = numpy.concatenate(([0], numpy.cumsum(stats.edge_per_cc))).tolist()
+    # edges between indexes of nodes in their component
+    local_ids = numpy.empty(len(names), dtype=numpy.int64)
+    local_ids[nodes_by_cc] = numpy.arange(len(names)) - numpy.repeat(node_starts[:-1], stats.node_per_cc)
+    edges_by_cc = local_ids[edges[numpy.argsort(stats.labels[edges[:, 0]], kind='stable')]]
+    node_starts = node_starts.tolist()
+    tasks = (
+        ([names[node] for node in nodes_by_cc[node_starts[cc]:node_starts[cc+1]].tolist()],
+         edges_by_cc[edge_starts[cc]:edge_starts[cc+1]],
+         targets.format(idx), edge_predicate)
+        for idx, cc in enumerate(ccs, start=1)
+    )
+    return tuple(ordered_map(component_to_file, tasks, jobs=jobs))
+
+
+def component_to_file(args:(list, numpy.ndarray, str, str)) -> str:
+    """Write given nodes and edges of a component into given target"""
+    names, edges, target, edge_predicate = args
+    return edges_to_file(names, edges, target, edge_predicate=edge_predicate,
+                         nodes=range(len(names)))
 
 
 def convert(fname:str, target:str=None, anonymize:bool=False,
             normalize:bool=False, edge_predicate:str=edge_predicate,
-            target_edge_predicate:str=edge_predicate) -> dict:
+            target_edge_predicate:str=edge_predicate,
+            backend:str='networkx', attributes:iter=(), name_map:str=None) -> dict:
     """Write in target the very same graph as input, but in
     an clean ASP expanded format.
 
@@ -59,15 +107,69 @@ def convert(fname:str, target:str=None, anonymize:bool=False,
     anonymize -- rename nodes into integers.
     target -- file to write. If None or equal to fname, overwrite.
     target_edge_predicate -- edge predicate to use in rewritten file.
+    backend -- graph implementation to use (see build_graph.graph_from_file)
+    attributes -- edge attributes to keep, when converting between standard formats
+    name_map -- file to write the old and new names in, when renaming nodes
+
+    Unless attributes are asked, or the file is overwritten,
+    edges are streamed from input to target without building any graph
+    (see build_graph.streamed_to_file).
 
     """
     fname = commons.normalize_filename(fname)
     if target: target = commons.normalize_filename(target)
     if not target:  target = fname
-    graph = graph_from_file(fname, edge_predicate=edge_predicate)
-    if anonymize:  graph = anonymized(graph)
-    if normalize:  graph = normalized(graph)
-    graph_to_file(graph, target, edge_predicate=target_edge_predicate)
+    names = renaming(anonymize, normalize)
+    if not attributes and target != fname and is_streamable(fname, target):
+        streamed_to_file(fname, target, edge_predicate=edge_predicate,
+                         target_edge_predicate=target_edge_predicate,
+                         rename=None if names is None else names.__getitem__)
+    else:
+        graph = graph_from_file(fname, edge_predicate=edge_predicate, backend=backend,
+                                attributes=attributes)
+        if names is not None:  graph = renamed(graph, names)
+        graph_to_file(graph, target, edge_predicate=target_edge_predicate)
+    if name_map and names is not None:
+        name_map_to_file(names, name_map)
+    return target
+
+
+def renaming(anonymize:bool=False, normalize:bool=False):
+    """Return the NameMap renaming the nodes as asked, or None"""
+    if anonymize:  # normalization of integers has no effect
+        return anonymizing()
+    if normalize:
+        return normalizing()
+    return None
+
+
+def convert_predicates(fname:str, targets:str, edge_predicates:iter,
+                       target_edge_predicate:str=edge_predicate,
+                       backend:str='networkx', anonymize:bool=False,
+                       normalize:bool=False, name_map:str=None) -> tuple:
+    """Write the graph of each given edge predicate of input ASP file,
+    read in a single pass, and return the written files.
+
+    targets -- filename template containing '{}', replaced by the predicate.
+    target_edge_predicate -- edge predicate to use in rewritten files.
+    anonymize, normalize, name_map -- same as for convert, a node
+                                      getting the same name in all graphs.
+
+    """
+    fname = commons.normalize_filename(fname)
+    if not isinstance(targets, str) or '{}' not in targets:
+        raise ValueError("Targets should be a filename to write containing '{}'")
+    targets = commons.normalize_filename(targets)
+    graphs = graphs_from_file(fname, edge_predicates, backend=backend)
+    names = renaming(anonymize, normalize)
+    written = []
+    for predicate, graph in graphs.items():
+        if names is not None:  graph = renamed(graph, names)
+        written.append(graph_to_file(graph, targets.format(predicate),
+                                     edge_predicate=target_edge_predicate))
+    if name_map and names is not None:
+        name_map_to_file(names, name_map)
+    return tuple(written)
 
 
 def generate(target:str, method:str, method_parameters=[],
@@ -80,53 +182,287 @@ def generate(target:str, method:str, method_parameters=[],
 
 
 def extract_by_node(fname:str, target:str=None, nodes:iter=(), order:int=1,
-                    edge_predicate:str=edge_predicate):
-    """Write in file of given name a subgraph of input one.
+                    edge_predicate:str=edge_predicate, backend:str='networkx'):
+    """Write in file of given name a subgraph of input one, made of given nodes
+    and their neighbors up to given order.
+
+    If the input file has an up-to-date index (see phasme.adjacency),
+    it is used instead of reading the whole file.
 
     """
     fname = commons.normalize_filename(fname)
     if target: target = commons.normalize_filename(target)
     if not target:  target = fname
-    graph = graph_from_file(fname, edge_predicate=edge_predicate)
     nodes = set(nodes)
-    all_neighbors = networkx.classes.function.all_neighbors
-    for _ in range(order):
-        nodes |= set(itertools.chain.from_iterable(
-            all_neighbors(graph, node) for node in nodes
-        ))
-    return graph_to_file(graph.subgraph(nodes), target, edge_predicate=edge_predicate)
+    index = adjacency.load(fname, edge_predicate=edge_predicate)
+    if index is not None:
+        LOGGER.info("Nodes extracted using index %s.", index.directory)
+        names, edges = index.extracted(nodes, order)
+        return edges_to_file(names, edges, target, edge_predicate=edge_predicate,
+                             nodes=range(len(names)))
+    graph = graph_from_file(fname, edge_predicate=edge_predicate, backend=backend)
+    unknown = [node for node in nodes if node not in graph]
+    if unknown:
+        LOGGER.warning("%d nodes are not in the graph, and are ignored: %s",
+                       len(unknown), ', '.join(map(str, unknown[:10])))
+    return graph_to_file(graph.subgraph(neighborhood(graph, nodes, order)), target,
+                         edge_predicate=edge_predicate)
 
 
-def randomize(fname:str, target:str, iterations:int, per_cc:bool=False,
-              edge_predicate:str=edge_predicate):
-    """Write in file of given name a randomized version of input graph.
+def extract_motif(fname:str, target:str=None, edge_predicate:str=edge_predicate,
+                  backend:str='networkx', timeout:float=None, threads:int=1) -> str:
+    """Write in file of given name the biggest motif of input graph, i.e. the
+    maximal biclique covering the most edges, found by clingo
+    (see phasme.concepts).
+
+    timeout -- maximal number of seconds of solving, after which
+               the best motif found is written
+    threads -- number of solver threads
 
     """
     fname = commons.normalize_filename(fname)
-    target = commons.normalize_filename(target)
-    graph = graph_from_file(fname, edge_predicate=edge_predicate)
-    if per_cc:
-        graphs = (
-            graph.subgraph(nodes).copy()
-            for nodes in networkx.connected_components(graph)
-        )
-    else:
-        graphs = [graph]
-    def run():
-        for graph in graphs:
-            print(tuple(graph.edges))
-            nb_edge = graph.number_of_edges()
-            total_iterations = iterations * graph.number_of_edges()
+    if target: target = commons.normalize_filename(target)
+    if not target:  target = fname
+    graph = graph_from_file(fname, edge_predicate=edge_predicate, backend=backend)
+    (objects, attributes), complete = ConceptSolver(graph, threads=threads).biggest_motif(timeout)
+    if not complete:
+        LOGGER.warning("Timeout reached: the motif written may not be the biggest.")
+    motif = networkx.Graph()
+    motif.add_edges_from(itertools.product(objects, attributes))
+    return graph_to_file(motif, target, edge_predicate=edge_predicate)
+
+
+class ExtractionReport(namedtuple('ExtractionReport', 'target nb_node nb_edge seconds')):
+    """Size of a subgraph extracted in batch, and time spent to do it"""
+    __slots__ = ()
+
+
+def extract_batch(fname:str, manifest:str, report:str=None,
+                  edge_predicate:str=edge_predicate, jobs:int=1) -> tuple:
+    """Run all extractions listed in given manifest on the graph of given file,
+    loaded only once, and return the ExtractionReport of each of them.
+
+    manifest -- file of lines 'seed file, order, target', separated by
+                tabulations or spaces. Empty lines and lines starting
+                with # are ignored. Relative paths are relative
+                to the manifest directory.
+    report -- if given, file where the reports are written as tsv.
+    jobs -- number of processes running the extractions. They share the
+            graph read-only, inherited through fork where available.
+
+    """
+    fname = commons.normalize_filename(fname)
+    jobs_args = tuple(read_manifest(manifest))
+    start = time.perf_counter()
+    graph = adjacency.load(fname, edge_predicate=edge_predicate)
+    if graph is None:
+        graph = CompactGraph(*interned_from_file(fname, edge_predicate=edge_predicate))
+    LOGGER.info("Graph loaded in %.3fs.", time.perf_counter() - start)
+    reports = tuple(ordered_map(extraction_job, jobs_args, jobs=jobs, chunksize=1,
+                                shared={'graph': graph, 'edge_predicate': edge_predicate}))
+    LOGGER.info("%d extractions done in %.3fs.", len(reports), time.perf_counter() - start)
+    if report:
+        with commons.open_file(report, 'w') as fd:
+            fd.write('\t'.join(ExtractionReport._fields) + '\n')
+            for line in reports:
+                fd.write('\t'.join(map(str, line)) + '\n')
+    return reports
+
+
+def read_manifest(manifest:str) -> iter:
+    """Yield (seed file, order, target) found in given manifest file"""
+    directory = os.path.dirname(commons.normalize_filename(manifest))
+    with commons.open_file(manifest) as fd:
+        for idx, line in enumerate(fd, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
             try:
-                yield networkx.algorithms.double_edge_swap(graph, nswap=total_iterations, max_tries=100*total_iterations)
-            except networkx.exception.NetworkXError as err:
-                print(err.args[0])
-                yield graph
-            except networkx.exception.NetworkXAlgorithmError:
-                print("Maximum number of swap attempts reached, or graph can't be swapped. Ignored.")
-                yield graph
-    if per_cc:
-        graph = networkx.compose_all(run())
+                seed_file, order, target = line.split()
+                order = int(order)
+            except ValueError:
+                raise ValueError("Line {} of manifest {} should be 'seed file, order, "
+                                 "target', not: {}".format(idx, manifest, line))
+            yield os.path.join(directory, seed_file), order, os.path.join(directory, target)
+
+
+def extraction_job(args:(str, int, str)) -> ExtractionReport:
+    """Write the subgraph around the nodes of seed file in target"""
+    seed_file, order, target = args
+    start = time.perf_counter()
+    names, edges = SHARED['graph'].extracted(set(read_lines_from_files(seed_file)), order)
+    edges_to_file(names, edges, target, edge_predicate=SHARED['edge_predicate'],
+                  nodes=range(len(names)))
+    return ExtractionReport(target, len(names), len(edges), round(time.perf_counter() - start, 6))
+
+
+def build_index(fname:str, edge_predicate:str=edge_predicate) -> str:
+    """Write the adjacency index of given graph file, used by extract_by_node,
+    and return its directory"""
+    return adjacency.build(fname, edge_predicate=edge_predicate)
+
+
+def randomize(fname:str, target:str, iterations:int, per_cc:bool=False,
+              edge_predicate:str=edge_predicate, seed:int=None, jobs:int=1,
+              ensemble:int=None, statistics:bool=False):
+    """Write in file of given name a randomized version of input graph,
+    using iterations * #edge double edge swaps (Q in Milo et al.).
+
+    seed -- seed of the randomization. Results do not depend on jobs.
+    jobs -- number of processes randomizing the components if per_cc,
+            or the graphs of the ensemble.
+    ensemble -- if given, number of randomized graphs to generate from the
+                input graph, read only once. Target must then be a filename
+                template containing '{}', like in split_by_cc.
+    statistics -- with ensemble, return the (mean, standard deviation)
+                  of the statistics of the randomized graphs, instead of
+                  writing them.
+
+    """
+    fname = commons.normalize_filename(fname)
+    names, edges = interned_from_file(fname, edge_predicate=edge_predicate)
+    edges = unique_edges(len(names), edges)
+    components = swapped_components(len(names), edges, per_cc)
+
+    if ensemble is None:
+        if not target:
+            raise ValueError("Target should be a filename to write")
+        target = commons.normalize_filename(target)
+        tasks = zip(components, itertools.repeat(iterations), derived_seeds(seed, len(components)))
+        randomized, report = [], SwapReport(0, 0)
+        for cc_edges, cc_report in ordered_map(randomized_edges, tasks, jobs=jobs if per_cc else 1):
+            randomized.append(cc_edges)
+            report += cc_report
+        LOGGER.info("%d swaps done over %d tries (acceptance rate: %.3f).",
+                    report.nb_swap, report.nb_try, report.acceptance_rate)
+        edges = numpy.concatenate(randomized) if randomized else edges
+        return edges_to_file(names, edges, target, edge_predicate=edge_predicate,
+                             nodes=range(len(names)))
+
+    if statistics:
+        targets = [None] * ensemble
+    elif not isinstance(target, str) or '{}' not in target:
+        raise ValueError("Target should be a filename to write containing '{}'")
     else:
-        graph = next(run())
-    return graph_to_file(graph, target, edge_predicate=edge_predicate)
+        target = commons.normalize_filename(target)
+        targets = [target.format(idx) for idx in range(1, ensemble + 1)]
+    shared = {'names': names, 'components': components, 'iterations': iterations,
+              'edge_predicate': edge_predicate}
+    results = ordered_map(ensemble_member, zip(derived_seeds(seed, ensemble), targets),
+                          jobs=jobs, shared=shared)
+    if not statistics:
+        return tuple(results)
+    values = OrderedDict()
+    for graph_stats_ in results:
+        for field, value in graph_stats_.items():
+            values.setdefault(field, []).append(value)
+    return OrderedDict((field, (float(numpy.mean(vals)), float(numpy.std(vals))))
+                       for field, vals in values.items())
+
+
+def swapped_components(nb_node:int, edges:numpy.ndarray, per_cc:bool) -> [numpy.ndarray]:
+    """Return the arrays of given unique edges to randomize independently:
+    one per connected component if per_cc, else all of them"""
+    if not per_cc:
+        return [edges]
+    stats = graph_stats(nb_node, edges)
+    edge_labels = stats.labels[edges[:, 0]]
+    edges = edges[numpy.argsort(edge_labels, kind='stable')]
+    edge_starts = numpy.concatenate(([0], numpy.cumsum(stats.edge_per_cc))).tolist()
+    return [edges[start:stop] for start, stop in zip(edge_starts, edge_starts[1:])]
+
+
+def randomized_member(seed:int) -> numpy.ndarray:
+    """Return the edges of the shared graph components randomized with given seed"""
+    tasks = zip(SHARED['components'], itertools.repeat(SHARED['iterations']),
+                derived_seeds(seed, len(SHARED['components'])))
+    randomized = [randomized_edges(task)[0] for task in tasks]
+    return numpy.concatenate(randomized) if randomized else numpy.empty((0, 2), dtype=numpy.int64)
+
+
+def ensemble_member(args:(int, str)) -> str or dict:
+    """Randomize the shared graph components with given seed, and write it
+    in given target, or return its statistics if target is None"""
+    seed, target = args
+    names, edges = SHARED['names'], randomized_member(seed)
+    if target is None:
+        return randomized_statistics(len(names), edges)
+    return edges_to_file(names, edges, target, edge_predicate=SHARED['edge_predicate'],
+                         nodes=range(len(names)))
+
+
+def motif_significance(fname:str, size:int=4, null:int=0, iterations:int=100,
+                       per_cc:bool=False, edge_predicate:str=edge_predicate,
+                       seed:int=None, jobs:int=1, fraction:float=None) -> OrderedDict:
+    """Return the count of each motif of 3 up to given number of nodes
+    in input graph (see phasme.motifs) or, if null is given, its MotifScore
+    against null randomized graphs, generated from the graph read once,
+    and counted in memory.
+
+    iterations, per_cc -- randomization of the null graphs (see randomize)
+    seed -- seed of the randomizations and of the sampling
+    jobs -- number of processes counting the motifs in the input graph,
+            then randomizing and counting the null graphs
+    fraction -- if given, fraction of the motifs to enumerate, their counts
+                being estimated (see motifs.motif_census)
+
+    """
+    fname = commons.normalize_filename(fname)
+    names, edges = interned_from_file(fname, edge_predicate=edge_predicate)
+    edges = unique_edges(len(names), edges)
+    sizes = tuple(range(3, size + 1))
+    counts = OrderedDict()
+    for motif_size in sizes:
+        counts.update(edges_census(len(names), edges, motif_size, jobs=jobs,
+                                   fraction=fraction, seed=seed))
+    if not null:
+        return counts
+    shared = {'components': swapped_components(len(names), edges, per_cc),
+              'iterations': iterations, 'nb_node': len(names),
+              'sizes': sizes, 'fraction': fraction}
+    null_censuses = tuple(ordered_map(null_census, derived_seeds(seed, null),
+                                      jobs=jobs, shared=shared))
+    for census in null_censuses:  # motifs found only in null graphs
+        for name in census:
+            counts.setdefault(name, 0)
+    return OrderedDict((name, MotifScore.from_counts(count, [census.get(name, 0) for census in null_censuses]))
+                       for name, count in counts.items())
+
+
+def null_census(seed:int) -> OrderedDict:
+    """Return the motif counts of the shared graph randomized with given seed"""
+    edges = randomized_member(seed)
+    census = OrderedDict()
+    for size in SHARED['sizes']:
+        census.update(edges_census(SHARED['nb_node'], edges, size,
+                                   fraction=SHARED['fraction'], seed=seed))
+    return census
+
+
+def randomized_statistics(nb_node:int, edges:numpy.ndarray) -> dict:
+    """Return the statistics of interest of a randomized graph,
+    i.e. those not kept by the double edge swap"""
+    stats = graph_stats(nb_node, edges)
+    return OrderedDict((
+        ('#cc', stats.nb_cc),
+        ('#node/biggest cc', int(stats.node_per_cc.max()) if nb_node else 0),
+        ('#triangle', nb_triangle(nb_node, edges)),
+    ))
+
+
+def randomized_edges(args:(numpy.ndarray, int, int)) -> (numpy.ndarray, SwapReport):
+    """Return given edges randomized with given number of iterations per edge
+    and given seed, and the SwapReport"""
+    edges, iterations, seed = args
+    nb_swap = iterations * len(edges)
+    if len(numpy.unique(edges)) < 4:
+        LOGGER.info("Graph with edges %s has fewer than four nodes: ignored.", edges.tolist())
+        return edges, SwapReport(0, 0)
+    def progress(report:SwapReport):
+        LOGGER.info("%d/%d swaps done, acceptance rate: %.3f.",
+                    report.nb_swap, nb_swap, report.acceptance_rate)
+    edges, report = double_edge_swap(edges, nb_swap, seed=seed, progress=progress)
+    if report.nb_swap < nb_swap:
+        LOGGER.warning("Maximum number of swap attempts reached, or graph can't "
+                       "be swapped: %d swaps done over %d.", report.nb_swap, nb_swap)
+    return edges, report
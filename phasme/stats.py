@@ -0,0 +1,146 @@
+"""Batched computation of graph statistics over arrays of edges.
+
+All the basic statistics (number of nodes, edges and loops, and the number
+of nodes and edges of each connected component) are computed together,
+with one union-find pass over the edges.
+
+"""
+
+import numpy
+import networkx
+from collections import namedtuple
+
+
+class GraphStats(namedtuple('GraphStats', 'nb_node nb_edge nb_loop labels node_per_cc edge_per_cc')):
+    """Basic statistics of a graph. Labels give the connected component
+    of each node, node_per_cc and edge_per_cc the size of each of them."""
+    __slots__ = ()
+
+    @property
+    def nb_cc(self) -> int:
+        return len(self.node_per_cc)
+
+
+class UnionFind:
+    """Forest of nodes identified by integers, merged by edges.
+
+    >>> forest = UnionFind(5)
+    >>> forest.union_edges([(0, 1), (3, 1)])
+    >>> forest.labels().tolist()
+    [0, 0, 1, 0, 2]
+
+    """
+
+    def __init__(self, nb_node:int=0, parents:list=None):
+        self.parents = list(range(nb_node)) if parents is None else list(parents)
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add_nodes(self, nb_node:int):
+        """Add given number of new nodes, each in its own tree"""
+        self.parents.extend(range(len(self.parents), len(self.parents) + nb_node))
+
+    def union_edges(self, edges:iter):
+        parents = self.parents
+        for source, target in edges:
+            # find roots, with path halving
+            while parents[source] != source:
+                parents[source] = source = parents[parents[source]]
+            while parents[target] != target:
+                parents[target] = target = parents[parents[target]]
+            if source != target:  # smaller id becomes the root
+                if source < target:
+                    parents[target] = source
+                else:
+                    parents[source] = target
+
+    def roots(self) -> numpy.ndarray:
+        """Return the root of each node"""
+        parents = numpy.array(self.parents, dtype=numpy.int64)
+        while True:  # roots are reached by pointer jumping
+            grandparents = parents[parents]
+            if numpy.array_equal(grandparents, parents):
+                return parents
+            parents = grandparents
+
+    def labels(self) -> numpy.ndarray:
+        """Return the component label of each node, components being
+        numbered by order of their first node"""
+        roots = self.roots()
+        # roots are the smallest node of their tree, thus sorted by first node
+        _, labels = numpy.unique(roots, return_inverse=True)
+        return labels.reshape(-1)
+
+
+def edge_array(graph) -> (int, numpy.ndarray):
+    """Return the number of nodes of given graph, and its (nb edge, 2) array
+    of edges between node indexes"""
+    if isinstance(graph, networkx.Graph):
+        index = {node: idx for idx, node in enumerate(graph.nodes)}
+        edges = numpy.fromiter((index[node] for edge in graph.edges for node in edge[:2]),
+                               dtype=numpy.int64, count=2 * graph.number_of_edges())
+        return len(index), edges.reshape(-1, 2)
+    return graph.number_of_nodes(), graph.edges_array
+
+
+def graph_stats(nb_node:int, edges:numpy.ndarray) -> GraphStats:
+    """Return the statistics of the graph of given number of nodes and edges,
+    edges being unique.
+
+    >>> stats = graph_stats(6, numpy.array([[0, 1], [1, 2], [3, 4], [4, 4]]))
+    >>> stats.nb_node, stats.nb_edge, stats.nb_loop, stats.nb_cc
+    (6, 4, 1, 3)
+    >>> stats.node_per_cc.tolist(), stats.edge_per_cc.tolist()
+    ([3, 2, 1], [2, 2, 0])
+
+    """
+    edges = numpy.asarray(edges, dtype=numpy.int64).reshape(-1, 2)
+    forest = UnionFind(nb_node)
+    forest.union_edges(edges.tolist())
+    labels = forest.labels()
+    nb_cc = int(labels.max()) + 1 if nb_node else 0
+    return GraphStats(
+        nb_node=nb_node,
+        nb_edge=len(edges),
+        nb_loop=int(numpy.count_nonzero(edges[:, 0] == edges[:, 1])),
+        labels=labels,
+        node_per_cc=numpy.bincount(labels, minlength=nb_cc),
+        edge_per_cc=numpy.bincount(labels[edges[:, 0]], minlength=nb_cc),
+    )
+
+
+def nb_triangle(nb_node:int, edges:numpy.ndarray) -> int:
+    """Return the number of triangles in the graph of given unique edges.
+
+    Each edge is oriented toward its node of highest degree, so that each
+    triangle is found once, with small intersections of neighbors.
+
+    >>> nb_triangle(5, numpy.array([[0, 1], [1, 2], [2, 0], [2, 3], [3, 0], [4, 4]]))
+    2
+
+    """
+    edges = numpy.asarray(edges, dtype=numpy.int64).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    degrees = numpy.bincount(edges.ravel(), minlength=nb_node)
+    rank = numpy.empty(nb_node, dtype=numpy.int64)
+    rank[numpy.lexsort((numpy.arange(nb_node), degrees))] = numpy.arange(nb_node)
+    forward = rank[edges[:, 0]] < rank[edges[:, 1]]
+    lows = numpy.where(forward, edges[:, 0], edges[:, 1]).tolist()
+    highs = numpy.where(forward, edges[:, 1], edges[:, 0]).tolist()
+    successors = [set() for _ in range(nb_node)]
+    for low, high in zip(lows, highs):
+        successors[low].add(high)
+    return sum(len(successors[low] & successors[high]) for low, high in zip(lows, highs))
+
+
+def density(nb_node:int, nb_edge:int) -> float:
+    """
+    >>> density(4, 3)
+    0.5
+    """
+    try:
+        return 2 * nb_edge / (nb_node * (nb_node - 1))
+    except ZeroDivisionError:
+        import math
+        return math.nan
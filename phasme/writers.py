@@ -0,0 +1,182 @@
+"""Streaming writers of graph files, receiving nodes and edges one by one.
+
+Each writer keeps only its node table (to declare each node once, and
+to give it an id in formats that need one), and writes the edges as soon
+as they are received, so that a conversion never builds a graph.
+Edges are written as received: duplicated edges are not removed.
+Formats able to tell it declare the graph as directed or multigraph
+if asked to.
+
+"""
+
+import abc
+import html
+from xml.sax.saxutils import quoteattr
+from phasme import commons
+from phasme.asp import RenderedNames
+from phasme.commons import edge_predicate
+
+
+class GraphWriter(abc.ABC):
+    """Base of the writers, buffering the lines written in given file,
+    compressed according to its extension.
+
+    Use it as a context manager, calling node() for nodes to declare
+    even if isolated, and edge() for each edge.
+
+    directed, multigraph -- kind of the written graph
+
+    """
+    HEADER, FOOTER = (), ()
+
+    def __init__(self, fname:str, buffer_size:int=2**14, directed:bool=False,
+                 multigraph:bool=False):
+        self.fname = fname
+        self.buffer, self.buffer_size = [], buffer_size
+        self.ids = {}  # node name -> node id, by order of declaration
+        self.directed, self.multigraph = directed, multigraph
+
+    def __enter__(self):
+        self.fd = commons.open_file(self.fname, 'w').__enter__()
+        self.write_lines(self.header())
+        return self
+
+    def header(self) -> [str]:
+        return self.HEADER
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.write_lines(self.FOOTER)
+            self.flush()
+        return self.fd.__exit__(*exc_info)
+
+    def write_lines(self, lines:iter):
+        self.buffer.extend(lines)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.fd.write('\n'.join(self.buffer) + '\n')
+            self.buffer = []
+
+    def node(self, name:object) -> int:
+        """Declare given node if not already done, and return its id"""
+        node_id = self.ids.get(name)
+        if node_id is None:
+            node_id = self.ids[name] = len(self.ids)
+            self.write_lines(self.node_lines(name, node_id))
+        return node_id
+
+    def node_lines(self, name:object, node_id:int) -> [str]:
+        return ()
+
+    @abc.abstractmethod
+    def edge(self, source:object, target:object):
+        """Write given edge, declaring its nodes if needed"""
+
+
+class AspWriter(GraphWriter):
+    """Writer of clean ASP edges. Isolated nodes are not written."""
+
+    def __init__(self, fname:str, edge_predicate:str=edge_predicate, **kwargs):
+        super().__init__(fname, **kwargs)
+        self.prefix, self.rendered = edge_predicate + '(', RenderedNames()
+
+    def node(self, name:object) -> int:
+        return 0  # nodes are not declared, and are rendered once by self.rendered
+
+    def edge(self, source:object, target:object):
+        self.write_lines((self.prefix + self.rendered[source] + ',' + self.rendered[target] + ').',))
+
+
+class EdgeListWriter(GraphWriter):
+    """Writer of edges as lines of two fields. Isolated nodes are not written."""
+    DELIMITER = ' '
+
+    def node(self, name:object) -> int:
+        return 0
+
+    def edge(self, source:object, target:object):
+        self.write_lines((str(source) + self.DELIMITER + str(target),))
+
+class TsvWriter(EdgeListWriter):
+    DELIMITER = '\t'
+
+class CsvWriter(EdgeListWriter):
+    DELIMITER = ','
+
+    def edge(self, source:object, target:object):
+        self.write_lines((','.join(map(csv_field, (source, target))),))
+
+
+def csv_field(value:object) -> str:
+    """
+    >>> csv_field('a'), csv_field('a,b'), csv_field('"a"')
+    ('a', '"a,b"', '\"""a\"""')
+    """
+    value = str(value)
+    if any(char in value for char in ',"\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+class GmlWriter(GraphWriter):
+    """Writer of GML, nodes being declared right before their first edge"""
+    HEADER, FOOTER = ('graph [',), (']',)
+
+    def header(self) -> [str]:
+        return self.HEADER + (('  directed 1',) if self.directed else ()) \
+            + (('  multigraph 1',) if self.multigraph else ())
+
+    def node_lines(self, name:object, node_id:int) -> [str]:
+        return ('  node [', '    id {}'.format(node_id),
+                '    label "{}"'.format(html.escape(str(name))), '  ]')
+
+    def edge(self, source:object, target:object):
+        self.write_lines(('  edge [', '    source {}'.format(self.node(source)),
+                          '    target {}'.format(self.node(target)), '  ]'))
+
+
+class GraphmlWriter(GraphWriter):
+    """Writer of GraphML, nodes being declared right before their first edge"""
+    HEADER = ("<?xml version='1.0' encoding='utf-8'?>",
+              '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" '
+              'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+              'xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns '
+              'http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">',
+              '  <graph edgedefault="undirected">')
+    FOOTER = ('  </graph>', '</graphml>')
+
+    def header(self) -> [str]:
+        if self.directed:
+            return self.HEADER[:-1] + (self.HEADER[-1].replace('undirected', 'directed'),)
+        return self.HEADER
+
+    def node_lines(self, name:object, node_id:int) -> [str]:
+        return ('    <node id={} />'.format(quoteattr(str(name))),)
+
+    def edge(self, source:object, target:object):
+        self.node(source), self.node(target)
+        self.write_lines(('    <edge source={} target={} />'.format(quoteattr(str(source)), quoteattr(str(target))),))
+
+
+# format -> writer
+WRITERS = {
+    'lp': AspWriter,
+    '': AspWriter,
+    'gml': GmlWriter,
+    'graphml': GraphmlWriter,
+    'edgelist': EdgeListWriter,
+    'tsv': TsvWriter,
+    'csv': CsvWriter,
+}
+
+
+def writer_for(fname:str, edge_predicate:str=edge_predicate, directed:bool=False,
+               multigraph:bool=False) -> GraphWriter:
+    """Return the writer for given file, according to its format"""
+    writer = WRITERS[commons.format_of_file(fname)]
+    if writer is AspWriter:
+        return writer(fname, edge_predicate=edge_predicate, directed=directed, multigraph=multigraph)
+    return writer(fname, directed=directed, multigraph=multigraph)
@@ -0,0 +1,45 @@
+
+import pytest
+from phasme import adjacency
+from phasme.routines import extract_by_node, build_index
+from phasme.build_graph import graph_from_file
+from .test_build_graph import comparable_graph
+
+
+@pytest.fixture
+def graph_file(tmpdir):
+    fname = str(tmpdir.join('graph.lp'))
+    with open(fname, 'w') as fd:
+        fd.write('edge(a,b).\nedge(b,c).\nedge(c,"d e").\nedge("d e",f).\nedge(f,f).\nedge(g,h).\n')
+    return fname
+
+
+def test_index_queries(graph_file):
+    assert adjacency.load(graph_file) is None
+    assert build_index(graph_file) == graph_file + adjacency.INDEX_EXT
+    index = adjacency.load(graph_file)
+    assert index.number_of_nodes() == 7
+    assert index.name(index.node_id('"d e"')) == '"d e"'
+    assert index.node_id('unknown') is None
+    names, edges = index.subgraph(index.ball(['"d e"', 'unknown'], 1))
+    assert sorted(names) == ['"d e"', 'c', 'f']
+    assert sorted(tuple(sorted((names[s], names[t]))) for s, t in edges.tolist()) == [
+        ('"d e"', 'c'), ('"d e"', 'f'), ('f', 'f')]
+    assert adjacency.load(graph_file, edge_predicate='other') is None
+
+
+@pytest.mark.parametrize('order', [0, 1, 2, 3])
+def test_extract_with_index(graph_file, tmpdir, order):
+    without, with_index = str(tmpdir.join('without.lp')), str(tmpdir.join('with.lp'))
+    extract_by_node(graph_file, without, nodes=['a', 'g'], order=order)
+    build_index(graph_file)
+    extract_by_node(graph_file, with_index, nodes=['a', 'g'], order=order)
+    assert (comparable_graph(graph_from_file(with_index, use_cache=False))
+            == comparable_graph(graph_from_file(without, use_cache=False)))
+
+
+def test_obsolete_index(graph_file):
+    build_index(graph_file)
+    with open(graph_file, 'a') as fd:
+        fd.write('edge(h,i).\n')
+    assert adjacency.load(graph_file) is None
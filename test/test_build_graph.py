@@ -1,10 +1,14 @@
 
 
 import pytest
+import networkx
 from .test_read_data import data_bad_complex
 from phasme.build_graph import (graph_from_dirty_lines, graph_from_lines,
                                 graph_from_file, graph_from_standard_file,
-                                graph_from_networkx_method)
+                                graph_from_networkx_method, anonymized, normalized,
+                                graphs_from_file, graph_from_interned,
+                                interned_from_file, interned_graphs_from_file)
+from phasme.compact import CompactGraph
 
 
 def comparable_graph(graph) -> frozenset:
@@ -19,6 +23,12 @@ def test_equality_of_methods(data_bad_complex):
     assert one == two
 
 
+def test_numbers_of_clean_and_dirty_lines():
+    graph = graph_from_lines(['edge(1,2).', 'edge(2,(3;4)).'])
+    assert sorted(graph.nodes) == ['1', '2', '3', '4']
+    assert graph.number_of_edges() == 3
+
+
 def test_gml():
     file = 'data/test.gml'
     one = comparable_graph(graph_from_file(file))
@@ -55,3 +65,96 @@ def test_many_atoms():
         frozenset({'d', 'e'}), frozenset({'d', 'f'}),
         frozenset({'e', 'f'}),
     })
+
+
+@pytest.mark.parametrize('ext', ['lp', 'lp.gz', 'lp.bz2', 'lp.xz', 'lp.zst'])
+def test_write_compressed(tmpdir, ext):
+    if ext.endswith('zst'):
+        pytest.importorskip('zstandard')
+    from phasme import commons
+    from phasme.build_graph import graph_to_file, edges_to_file
+    from phasme.compact import CompactGraph
+    graph = CompactGraph(['a', 'B', 3], [[0, 1], [1, 2], [2, 2]])
+    fname = str(tmpdir.join('out.' + ext))
+    assert graph_to_file(graph, fname, edge_predicate='e') == fname
+    with commons.open_file(fname) as fd:
+        assert fd.read() == 'e(a,"B").\ne("B",3).\ne(3,3).\n'
+    assert edges_to_file(graph.names, graph.edges_array, fname) == fname
+    with commons.open_file(fname) as fd:
+        assert fd.read().splitlines()[0] == 'edge(a,"B").'
+
+
+@pytest.mark.parametrize('backend', [networkx.Graph, CompactGraph.from_networkx])
+def test_renaming_keeps_isolated_nodes(backend):
+    graph = networkx.Graph([('a!', 'b')])
+    graph.add_node('c')
+    graph = backend(graph)
+    assert sorted(anonymized(graph).nodes) == [1, 2, 3]
+    assert comparable_graph(anonymized(graph)) == frozenset({frozenset((1, 2))})
+    assert set(normalized(graph).nodes) == {'a_c33_', 'b', 'c'}
+
+
+def test_normalization_collision():
+    graph = networkx.Graph([('a!', 'a_c33_')])
+    with pytest.raises(ValueError, match='would both be renamed'):
+        normalized(graph)
+
+
+def named_edges(names:list, edges) -> list:
+    return sorted((names[source], names[target]) for source, target in edges.tolist())
+
+
+@pytest.mark.parametrize('file', ['data/directed.gml', 'data/directed.graphml',
+                                  'data/test.gml', 'data/test.graphml'])
+def test_kind_of_standard_file(file):
+    reader = getattr(networkx, 'read_' + file.rpartition('.')[2])
+    expected, graph = reader(file), graph_from_standard_file(file)
+    assert type(graph) is type(expected)
+    assert sorted(graph.edges) == sorted(expected.edges)
+
+
+@pytest.mark.parametrize('backend', ['networkx', 'compact'])
+def test_graphs_of_predicates(tmpdir, monkeypatch, backend):
+    infile = tmpdir.join('multi.lp')
+    infile.write('edge(a,b).\nppi(c,d).\nreg(X,Y) :- ppi(Y,X).\nedge(1..2,e).\nother(a,b).\nppi(d,e).\n')
+    predicates = ('edge', 'ppi', 'reg', 'none')
+    expected = {predicate: interned_from_file(str(infile), predicate, use_cache=False)
+                for predicate in predicates}
+    from phasme import cache, extract_links
+    monkeypatch.setitem(cache.CONFIG, 'directory', str(tmpdir.join('cache')))
+    solver_calls = []
+    dirty_lines = extract_links.links_from_dirty_lines
+    monkeypatch.setattr(extract_links, 'links_from_dirty_lines',
+                        lambda *args, **kwargs: solver_calls.append(args) or dirty_lines(*args, **kwargs))
+    for use_cache in (False, True, True):
+        found = interned_graphs_from_file(str(infile), predicates, use_cache=use_cache)
+        assert list(found) == list(predicates)
+        for predicate, (names, edges) in found.items():
+            assert named_edges(names, edges) == named_edges(*expected[predicate])
+        graphs = graphs_from_file(str(infile), predicates, use_cache=use_cache, backend=backend)
+        assert {predicate: comparable_graph(graph) for predicate, graph in graphs.items()} == \
+            {predicate: comparable_graph(graph_from_interned(*interned)) for predicate, interned in expected.items()}
+    assert len(solver_calls) == 6  # solved predicates are not cached
+    # predicates not solved are cached exactly as if read alone
+    for predicate in ('ppi', 'none'):
+        names, edges = interned_from_file(str(infile), predicate, use_cache=True)
+        assert names == expected[predicate][0]
+        assert edges.tolist() == expected[predicate][1].tolist()
+    assert len(solver_calls) == 6
+
+
+def test_graphs_of_predicates_read_alone(tmpdir, monkeypatch):
+    infile = tmpdir.join('multi.lp')
+    infile.write('edge(a,b).\nedge(b,c).\nppi(X,Y) :- edge(X,Y).\nreg(1,2).\n')
+    from phasme import cache
+    monkeypatch.setitem(cache.CONFIG, 'directory', str(tmpdir.join('cache')))
+    alone = {predicate: interned_from_file(str(infile), predicate, use_cache=False)
+             for predicate in ('edge', 'reg', 'ppi')}
+    together = interned_graphs_from_file(str(infile), ['edge', 'reg', 'ppi'], use_cache=True)
+    for predicate, (names, edges) in together.items():
+        assert named_edges(names, edges) == named_edges(*alone[predicate])
+        cached = interned_from_file(str(infile), predicate, use_cache=True)
+        assert cached[0] == alone[predicate][0]
+        assert cached[1].tolist() == alone[predicate][1].tolist()
+    assert alone['reg'][0] == ['1', '2'] and len(alone['reg'][1]) == 1
+    assert len(alone['edge'][1]) == 2
@@ -0,0 +1,65 @@
+import os
+import pytest
+from phasme import cache
+from phasme.build_graph import graph_from_file
+from .test_build_graph import comparable_graph
+
+
+@pytest.fixture
+def cache_dir(tmpdir, monkeypatch):
+    monkeypatch.setitem(cache.CONFIG, 'directory', str(tmpdir.join('cache')))
+    return str(tmpdir.join('cache'))
+
+
+def test_graph_from_cache(cache_dir):
+    file = 'data/realgraph.lp'
+    expected = comparable_graph(graph_from_file(file, use_cache=False))
+    assert not cache.entries()
+    assert comparable_graph(graph_from_file(file, use_cache=True)) == expected
+    assert len(cache.entries()) == 1
+    assert cache.load(cache.key_of(file, 'edge'), file) is not None
+    assert comparable_graph(graph_from_file(file, use_cache=True)) == expected
+    assert cache.load(cache.key_of(file, 'other')) is None
+    cache.clear()
+    assert not cache.entries()
+
+
+def test_key_depends_on_content(cache_dir, tmpdir):
+    file = str(tmpdir.join('graph.lp'))
+    with open(file, 'w') as fd:
+        fd.write('edge(a,b).\n')
+    assert len(graph_from_file(file, use_cache=True).edges) == 1
+    with open(file, 'a') as fd:
+        fd.write('edge(b,c).\n')
+    assert len(graph_from_file(file, use_cache=True).edges) == 2
+    assert len(cache.entries()) == 1  # the entry of the file is replaced
+    with open(file, 'w') as fd:  # same size, other content
+        fd.write('edge(a,b).\nedge(b,d).\n')
+    os.utime(file, ns=(0, 0))
+    assert sorted(graph_from_file(file, use_cache=True).nodes) == ['a', 'b', 'd']
+
+
+def test_content_hashed_only_if_needed(cache_dir, tmpdir, monkeypatch):
+    file = str(tmpdir.join('graph.lp'))
+    with open(file, 'w') as fd:
+        fd.write('edge(a,b).\n')
+    graph_from_file(file, use_cache=True)
+    hashed = []
+    file_hash = cache.file_hash
+    monkeypatch.setattr(cache, 'file_hash', lambda fname: hashed.append(fname) or file_hash(fname))
+    assert cache.load(cache.key_of(file, 'edge'), file) is not None
+    assert not hashed
+    os.utime(file, ns=(0, 0))  # touched, same content
+    assert cache.load(cache.key_of(file, 'edge'), file) is not None
+    assert cache.load(cache.key_of(file, 'edge'), file) is not None
+    assert len(hashed) == 1  # the new modification time is recorded
+
+
+def test_lru_eviction(cache_dir):
+    for idx in range(3):
+        cache.store(str(idx), ['a', 'b'], [[0, 1]])
+        os.utime(os.path.join(cache_dir, str(idx) + cache.EDGES_EXT), (idx, idx))
+    cache.load('0')  # now the most recently used
+    size = cache.entries()[0][1]
+    cache.evict(max_size=2 * size)
+    assert sorted(os.path.basename(base) for base, _, _ in cache.entries()) == ['0', '2']
@@ -0,0 +1,46 @@
+import pytest
+import networkx
+from phasme.compact import CompactGraph
+from phasme.build_graph import graph_from_file, connected_components, neighborhood
+from .test_build_graph import comparable_graph
+
+
+@pytest.mark.parametrize('file', ['data/realgraph.lp', 'data/three_cc.lp', 'data/test.gml'])
+def test_same_graph_as_networkx(file):
+    nxgraph = graph_from_file(file, use_cache=False)
+    graph = graph_from_file(file, use_cache=False, backend='compact')
+    assert isinstance(graph, CompactGraph)
+    assert comparable_graph(graph) == comparable_graph(nxgraph)
+    assert set(graph.nodes) == set(nxgraph.nodes)
+    assert comparable_graph(graph.to_networkx()) == comparable_graph(nxgraph)
+    assert (sorted(map(sorted, connected_components(graph)))
+            == sorted(map(sorted, connected_components(nxgraph))))
+    for node in nxgraph.nodes:
+        assert set(graph.neighbors(node)) == set(nxgraph.neighbors(node))
+    assert dict(zip(graph.nodes, graph.degrees().tolist())) == dict(nxgraph.degree)
+
+
+def test_subgraph():
+    graph = CompactGraph('abcde', [[0, 1], [1, 2], [2, 3], [3, 3], [3, 4]])
+    sub = graph.subgraph('bcde')
+    assert sub.nodes == list('bcde')
+    assert comparable_graph(sub) == frozenset(map(frozenset, ('bc', 'cd', 'dd', 'de')))
+    sub = graph.subgraph('ae')
+    assert sub.nodes == ['a', 'e'] and sub.number_of_edges() == 0
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        graph_from_file('data/realgraph.lp', backend='igraph')
+
+
+@pytest.mark.parametrize('order', [0, 1, 2, 5])
+def test_ball_as_networkx_ego_graphs(order):
+    nxgraph = graph_from_file('data/realgraph.lp', use_cache=False)
+    graph = CompactGraph.from_networkx(nxgraph)
+    seeds = list(nxgraph.nodes)[:3] + ['unknown node']
+    expected = set()
+    for seed in seeds[:-1]:
+        expected |= set(networkx.ego_graph(nxgraph, seed, radius=order))
+    assert set(graph.ball(seeds, order)) == expected
+    assert set(neighborhood(nxgraph, seeds, order)) == expected
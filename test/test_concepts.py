@@ -0,0 +1,54 @@
+import pytest
+import networkx
+import itertools
+import time
+pytest.importorskip('clingo')
+from phasme.concepts import ConceptSolver, concept_counts
+
+
+def brute_force_concepts(graph) -> set:
+    """Concepts of given graph with no empty side"""
+    concepts = set()
+    for size in range(1, graph.number_of_nodes() + 1):
+        for objects in itertools.combinations(graph.nodes, size):
+            attributes = set.intersection(*(set(graph[node]) - {node} for node in objects))
+            if attributes:
+                closed = frozenset(node for node in graph.nodes
+                                   if attributes <= set(graph[node]) - {node})
+                concepts.add((closed, frozenset(attributes)))
+    return concepts
+
+
+@pytest.mark.parametrize('threads', [1, 2])
+def test_concepts(threads):
+    graph = networkx.gnm_random_graph(12, 25, seed=2)
+    solver = ConceptSolver(graph, threads=threads)
+    concepts = brute_force_concepts(graph)
+    assert solver.nb_concepts() == (len(concepts), True)
+    aoc = {concept for concept in concepts  # introducing a node
+           if any(set(graph[node]) - {node} == concept[1] for node in concept[0])
+           or any(set(graph[node]) - {node} == concept[0] for node in concept[1])}
+    assert solver.nb_concepts(aoc=True) == (len(aoc), True)
+    # the grounded program can be queried again
+    assert solver.nb_concepts() == (len(concepts), True)
+
+
+def test_biggest_motif():
+    graph = networkx.Graph([(1, 3), (1, 4), (2, 3), (2, 4), (2, 5), (5, 6)])
+    (objects, attributes), complete = ConceptSolver(graph).biggest_motif()
+    assert complete and {objects, attributes} == {frozenset((1, 2)), frozenset((3, 4))}
+
+
+def test_timeout():
+    graph = networkx.gnm_random_graph(300, 2000, seed=2)
+    nb_concept, complete = ConceptSolver(graph).nb_concepts(timeout=0.1)
+    assert not complete
+
+
+def test_budget():
+    graph = networkx.gnm_random_graph(300, 2000, seed=2)
+    start = time.monotonic()
+    nb_concept, nb_aoc = concept_counts(graph, budget=1.5)
+    assert time.monotonic() - start < 2.
+    assert not nb_concept.complete and not nb_aoc.complete
+    assert concept_counts(graph, budget=0.5) is None  # grounding would exceed it
@@ -0,0 +1,50 @@
+
+import pytest
+import networkx
+from phasme import estimators
+
+
+@pytest.fixture(scope='module')
+def graph():
+    return networkx.connected_watts_strogatz_graph(300, 6, 0.2, seed=42)
+
+
+@pytest.mark.parametrize('name', ['transitivity', 'average_clustering',
+                                  'average_shortest_path_length'])
+def test_exact_value_in_interval(graph, name):
+    exact = getattr(networkx, name)(graph)
+    estimate = getattr(estimators, name)(graph, epsilon=0.05, seed=1)
+    assert estimate.low <= exact <= estimate.high
+    assert estimate.high - estimate.low < 0.2 * max(1, exact)
+
+
+def test_node_connectivity(graph):
+    graph = graph.subgraph(range(60))
+    exact = networkx.average_node_connectivity(graph)
+    estimate = estimators.average_node_connectivity(graph, epsilon=0.1, seed=1)
+    assert estimate.low <= exact <= estimate.high
+
+
+def test_sample_size_does_not_depend_on_graph():
+    small, big = networkx.path_graph(10), networkx.path_graph(10**4)
+    assert estimators.nb_samples(0.1) == 185
+    for graph in (small, big):
+        estimate = estimators.average_clustering(graph, epsilon=0.1, seed=1)
+        assert estimate.low <= networkx.average_clustering(graph) <= estimate.high
+
+
+def test_unbounded_interval_holds():
+    graph = networkx.connected_watts_strogatz_graph(1000, 4, 0.1, seed=3)
+    exact = networkx.average_shortest_path_length(graph)
+    estimate = estimators.average_shortest_path_length(graph, epsilon=0.1, seed=1)
+    assert estimate.low <= exact <= estimate.high
+    assert estimate.high - estimate.low < 0.5 * exact
+
+
+def test_node_connectivity_cost(graph, monkeypatch):
+    calls = []
+    connectivity = estimators.local_node_connectivity
+    monkeypatch.setattr(estimators, 'local_node_connectivity',
+                        lambda *args: calls.append(args) or connectivity(*args))
+    estimators.average_node_connectivity(graph, seed=1)
+    assert len(calls) == estimators.nb_samples(estimators.CONNECTIVITY_EPSILON) < 50
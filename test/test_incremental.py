@@ -0,0 +1,66 @@
+
+import os
+from phasme import incremental
+from phasme.routines import info
+from phasme.incremental import incremental_stats, State, META_EXT, ARRAYS_EXT
+
+
+def write(fname, text, mode='a'):
+    with open(fname, mode) as fd:
+        fd.write(text)
+
+
+def test_appended_edges(tmpdir):
+    fname = str(tmpdir.join('graph.lp'))
+    write(fname, 'edge(a,b).\nedge(c,d).\n', 'w')
+    stats = incremental_stats(fname)
+    assert (stats.nb_node, stats.nb_edge, stats.nb_cc) == (4, 2, 2)
+    assert os.path.exists(fname + META_EXT) and os.path.exists(fname + ARRAYS_EXT)
+    write(fname, 'edge(b,c).\nedge(a,b).\nedge(e,e).\nedge(f,')  # last line not finished
+    stats = incremental_stats(fname)
+    assert (stats.nb_node, stats.nb_edge, stats.nb_loop, stats.nb_cc) == (5, 4, 1, 2)
+    assert stats.node_per_cc.tolist() == [4, 1]
+    assert State.load(fname).offset == os.path.getsize(fname) - len('edge(f,')
+    write(fname, 'a).\n')
+    stats = incremental_stats(fname)
+    assert (stats.nb_node, stats.nb_edge, stats.nb_cc) == (6, 5, 2)
+
+
+def test_only_tail_is_parsed(tmpdir, monkeypatch):
+    fname = str(tmpdir.join('graph.lp'))
+    write(fname, 'edge(a,b).\n', 'w')
+    incremental_stats(fname)
+    write(fname, 'edge(b,c).\n')
+    parsed = []
+    lines_between = incremental.lines_between
+    monkeypatch.setattr(incremental, 'lines_between',
+                        lambda *args: (parsed.append(line) or line for line in lines_between(*args)))
+    assert incremental_stats(fname).nb_edge == 2
+    assert parsed == ['edge(b,c).\n']
+
+
+def test_modified_file(tmpdir):
+    fname = str(tmpdir.join('graph.lp'))
+    write(fname, 'edge(a,b).\nedge(c,d).\n', 'w')
+    incremental_stats(fname)
+    write(fname, 'edge(a,b).\n', 'w')
+    assert State.load(fname) is None
+    assert incremental_stats(fname).nb_edge == 1
+
+
+def test_dirty_file(tmpdir):
+    fname = str(tmpdir.join('graph.lp'))
+    write(fname, 'edge(a,b).\n', 'w')
+    incremental_stats(fname)
+    write(fname, 'edge(X,Y):- edge(Y,X).\n')
+    stats = incremental_stats(fname)
+    assert (stats.nb_node, stats.nb_edge) == (2, 1)
+    assert not os.path.exists(fname + META_EXT)
+
+
+def test_infos(tmpdir):
+    fname = str(tmpdir.join('graph.lp'))
+    write(fname, 'edge(a,b).\nedge(b,c).\n', 'w')
+    assert tuple(info(fname, incremental=True)) == tuple(info(fname))
+    write(fname, 'edge(d,e).\n')
+    assert tuple(info(fname, incremental=True)) == tuple(info(fname))
@@ -0,0 +1,57 @@
+
+import time
+import pytest
+import networkx
+from phasme import metrics
+from phasme.routines import info
+from phasme.metrics import (computed_metrics, Metric, EXACT, APPROXIMATE,
+                            TIMEOUT, TOO_COSTLY)
+
+
+def slow(graph):
+    while True:
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = metrics.METRICS.copy()
+    monkeypatch.setattr(metrics, 'METRICS', registry)
+    return registry
+
+
+def test_budget(registry):
+    registry['slow'] = Metric('slow', slow, 'linear', ('graph',), None)
+    registry['approximated'] = Metric('approximated', slow, 'linear', ('graph',), lambda graph, epsilon: 42)
+    registry['dependent'] = Metric('dependent', lambda value: value, 'linear', ('slow',), None)
+    start = time.perf_counter()
+    results = tuple(computed_metrics(['slow', 'approximated', 'dependent', 'tree'],
+                                     {'graph': networkx.path_graph(3)}, budget=0.1))
+    assert time.perf_counter() - start < 1
+    assert results == (('slow', None, TIMEOUT), ('approximated', 42, APPROXIMATE),
+                       ('dependent', None, TIMEOUT), ('tree', True, EXACT))
+
+
+def test_dependencies_are_computed_once(registry):
+    calls = []
+    registry['base'] = Metric('base', lambda graph: calls.append(1) or 2, 'linear', ('graph',), None)
+    registry['double'] = Metric('double', lambda base: 2 * base, 'linear', ('base',), None)
+    results = tuple(computed_metrics(['double', 'base'], {'graph': None}))
+    assert results == (('double', 4, EXACT), ('base', 2, EXACT))
+    assert len(calls) == 1
+
+
+def test_lazy_resources_and_costs():
+    built = []
+    resources = {'graph': lambda: built.append(1) or networkx.Graph([(1, 2), (3, 4)]),
+                 'stats': None}
+    results = tuple(computed_metrics(['average_node_connectivity'], resources, max_cost='cubic'))
+    assert results == (('average_node_connectivity', None, TOO_COSTLY),)
+    assert not built
+    with pytest.raises(ValueError):
+        tuple(computed_metrics(['unknown'], resources))
+
+
+def test_selected_metrics_in_infos():
+    lines = tuple(info('data/test.gml', metrics=['tree', 'transitivity'], round_float=2))
+    assert lines[-3:] == ('  transitivity | 0.59', '   ¬properties | tree', '    properties | no loop')
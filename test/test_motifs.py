@@ -0,0 +1,51 @@
+import pytest
+import networkx
+import itertools
+from collections import Counter
+from phasme.motifs import motif_census
+from phasme.compact import CompactGraph
+
+
+@pytest.fixture(scope='module')
+def graph():
+    graph = networkx.gnm_random_graph(20, 45, seed=1)
+    graph.add_edge(3, 3)
+    return graph
+
+
+def brute_force_census(graph, size) -> Counter:
+    """Number of connected induced subgraphs, by sorted degrees"""
+    graph = networkx.Graph(graph)
+    graph.remove_edges_from(networkx.selfloop_edges(graph))
+    census = Counter()
+    for nodes in itertools.combinations(graph.nodes, size):
+        subgraph = graph.subgraph(nodes)
+        if networkx.is_connected(subgraph):
+            census[tuple(sorted(degree for _, degree in subgraph.degree))] += 1
+    return census
+
+
+@pytest.mark.parametrize('size', [2, 3, 4, 5])
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_exact_census(graph, size, jobs):
+    census = motif_census(CompactGraph.from_networkx(graph), size, jobs=jobs)
+    expected = brute_force_census(graph, size)
+    assert sum(census.values()) == sum(expected.values())
+    if size <= 4:  # degrees identify the motifs
+        assert sorted(count for count in census.values() if count) == sorted(expected.values())
+
+
+def test_named_motifs():
+    graph = networkx.Graph([(1, 2), (2, 3), (3, 1), (3, 4), (4, 5)])
+    assert motif_census(graph, 3) == {'wedge': 3, 'triangle': 1}
+    assert motif_census(graph, 4) == {'4-path': 2, '4-star': 0, '4-cycle': 0,
+                                      'paw': 1, 'diamond': 0, '4-clique': 0}
+
+
+def test_sampled_census():
+    graph = networkx.connected_watts_strogatz_graph(300, 6, 0.2, seed=42)
+    exact = motif_census(graph, 3)
+    assert motif_census(graph, 3, fraction=0.3, seed=1) == motif_census(graph, 3, fraction=0.3, seed=1)
+    samples = [motif_census(graph, 3, fraction=0.3, seed=seed) for seed in range(10)]
+    for name, count in exact.items():  # estimates are unbiased
+        assert abs(sum(sample[name] for sample in samples) / len(samples) - count) < 0.05 * count
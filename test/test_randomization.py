@@ -0,0 +1,22 @@
+import networkx
+from phasme.stats import edge_array
+from phasme.randomization import double_edge_swap
+
+
+def test_degrees_are_preserved():
+    graph = networkx.gnm_random_graph(50, 200, seed=1)
+    _, edges = edge_array(graph)
+    swapped, report = double_edge_swap(edges, 1000, seed=2)
+    assert report.nb_swap == 1000 and 0 < report.acceptance_rate <= 1
+    randomized = networkx.Graph(swapped.tolist())
+    assert randomized.number_of_edges() == len(edges)  # no duplicated edge
+    assert networkx.number_of_selfloops(randomized) == 0
+    assert dict(randomized.degree) == {node: degree for node, degree in graph.degree if degree}
+    assert set(map(frozenset, swapped.tolist())) != set(map(frozenset, edges.tolist()))
+
+
+def test_unswappable_graph():
+    star = [[0, 1], [0, 2], [0, 3], [0, 4]]
+    swapped, report = double_edge_swap(star, 10, max_tries=50, seed=0)
+    assert report.nb_swap == 0 and report.nb_try == 50
+    assert swapped.tolist() == star
@@ -1,7 +1,7 @@
 
 
 import pytest
-from phasme.extract_links import links_from_clean_lines, links_from_lines
+from phasme.extract_links import links_from_clean_lines, links_from_lines, links_from_dirty_lines, FileLines
 
 
 @pytest.fixture
@@ -46,3 +46,83 @@ def test_read_badly_formed_asp_data():
         tuple(links_from_clean_lines(data.splitlines()))
     assert str(err.value) == "Non compliant ASP data: '{}'".format(data)
 
+
+
+def test_read_lines_is_streamed():
+    lines = iter(('edge(a,b).', 'edge(c,d).'))
+    links = links_from_lines(lines)
+    assert next(links) == ('a', 'b')
+    assert next(lines) == 'edge(c,d).'  # second line not consumed yet
+
+
+def test_read_lines_with_other_predicate():
+    data = "link(a,b).\n  link(c,\"d e\"). % comment\nedge(e,f).\n\nlink((g;h),i)."
+    found = set(links_from_lines(data.splitlines(), edge_predicate='link'))
+    assert found == {('a', 'b'), ('c', '"d e"'), ('g', 'i'), ('h', 'i')}
+
+
+def test_read_lines_hybrid_with_dependencies():
+    data = """
+#const n=3.
+#show node/1.
+edge(a,b).
+node(1..n).
+edge(c,X):- node(X).
+unrelated(1..100000000).
+edge(d,
+(e;f)).
+"""
+    stats = {}
+    found = set(links_from_lines(data.splitlines(), stats=stats))
+    assert found == {('a', 'b'), ('c', '1'), ('c', '2'), ('c', '3'), ('d', 'e'), ('d', 'f')}
+    assert stats == {'clean lines': 1, 'dirty lines': 7, 'solved statements': 4,
+                     'ignored statements': 2, 'clean lines given to solver': 0,
+                     'solved predicates': {'edge'}}
+
+
+def test_read_lines_hybrid_with_rules_on_edges():
+    data = "edge(a,b).\nedge(b,(c;d)).\nedge(X,Y):- edge(Y,X).\nedge(e,f):-\nedge(g,h).".splitlines()
+    stats = {}
+    found = sorted(links_from_lines(data, stats=stats))
+    assert found == [('a', 'b'), ('b', 'a'), ('b', 'c'), ('b', 'd'), ('c', 'b'), ('d', 'b')]
+    assert stats['clean lines given to solver'] == 1
+    with pytest.raises(ValueError):
+        tuple(links_from_lines(iter(data)))
+
+
+def test_read_lines_hybrid_with_numbers():
+    found = list(links_from_lines(['edge(1,2).', 'edge(2,(3;4)).', 'edge(f(1),-2).']))
+    assert sorted(found) == [('1', '2'), ('2', '3'), ('2', '4'), ('f(1)', '-2')]
+    assert set(links_from_dirty_lines(['edge(1,2).'], in_process=False)) == {('1', '2')}
+
+
+def test_read_dirty_lines_in_process():
+    pytest.importorskip('clingo')
+    lines = ['#const n=2.', 'edge(1..n,a;"b c").', 'link(f(x,-1),(1,c)).',
+             'edge(X,Y):- link(X,Y).', 'other(a,b).']
+    expected = set(links_from_dirty_lines(lines, in_process=False))
+    assert len(expected) == 3  # pool gives also the unary edge("b c")
+    assert set(links_from_dirty_lines(lines, in_process=True)) == expected
+    # statements spanning chunks of lines
+    assert set(links_from_dirty_lines(['edge(a,', 'b).'], in_process=True)) == {('a', 'b')}
+    with pytest.raises(ValueError):
+        tuple(links_from_dirty_lines(['edge(a,b) :- c('], in_process=True))
+
+
+def test_read_lines_hybrid_with_constants(tmpdir):
+    data = ['edge(x,a).', '#const x=3.', 'edge(x,b).', 'edge(b,c).']
+    assert sorted(links_from_lines(data)) == [('3', 'a'), ('3', 'b'), ('b', 'c')]
+    fname = str(tmpdir.join('constants.lp'))
+    with open(fname, 'w') as fd:
+        fd.write('\n'.join(data) + '\n')
+    assert sorted(links_from_lines(FileLines(fname))) == [('3', 'a'), ('3', 'b'), ('b', 'c')]
+    # without a second reading, only the constants defined before the lines apply
+    assert sorted(links_from_lines(iter(data[1:]))) == [('3', 'b'), ('b', 'c')]
+
+
+def test_read_lines_hybrid_with_constraints():
+    assert list(links_from_lines(['edge(a,b).', 'edge(b,c).', ':- edge(a,b).'])) == []
+    data = ['edge(a,b).', 'link(b,c).', ':- link(a,b).']
+    assert sorted(links_from_lines(data)) == [('a', 'b')]
+    assert sorted(links_from_lines(data, edge_predicate=('edge', 'link'))) == [
+        ('edge', 'a', 'b'), ('link', 'b', 'c')]
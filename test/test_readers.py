@@ -0,0 +1,46 @@
+
+import pytest
+import networkx
+from phasme import readers
+from phasme.build_graph import graph_from_standard_file, interned_from_file, graph_to_file
+from .test_build_graph import comparable_graph
+
+
+@pytest.fixture
+def weighted_graph():
+    graph = networkx.Graph()
+    graph.add_edge('a', 'b', weight=2.5, color='red')
+    graph.add_edge('b', 'c d', weight=1.0, color='blue')
+    graph.add_node('isolated')
+    return graph
+
+
+@pytest.mark.parametrize('ext', ['gml', 'graphml', 'gml.gz', 'graphml.xz'])
+def test_same_as_networkx(tmpdir, weighted_graph, ext):
+    fname = str(tmpdir.join('graph.' + ext))
+    graph_to_file(weighted_graph, fname)
+    graph = graph_from_standard_file(fname)
+    assert comparable_graph(graph) == comparable_graph(weighted_graph)
+    assert list(graph.nodes) == list(weighted_graph.nodes)
+    assert all(not data for _, _, data in graph.edges(data=True))
+    graph = graph_from_standard_file(fname, attributes=['weight'])
+    assert graph.edges['b', 'c d'] == {'weight': 1.0}
+    names, edges = interned_from_file(fname)
+    assert names == list(weighted_graph.nodes) and edges.tolist() == [[0, 1], [1, 2]]
+
+
+@pytest.mark.parametrize('ext, line', [('tsv', 'a\tb\tignored\n'), ('csv', '"a",b\n'),
+                                       ('edgelist', 'a b {}\n')])
+def test_edge_lists(tmpdir, ext, line):
+    fname = tmpdir.join('graph.' + ext)
+    fname.write('# comment\n' + line + '\n' + line.replace('a', 'c'))
+    assert list(readers.READERS[ext](str(fname))) == [('a', 'b'), ('c', 'b')]
+
+
+def test_gml_tokens(tmpdir):
+    fname = tmpdir.join('graph.gml')
+    fname.write('graph [ # comment\n directed 0 node [ id 1 label "multi\nline &amp; co" '
+                'graphics [ x 1.0 ] ] edge [ source 1 target 2 ] node [ id 2 ] ]\n')
+    nodes = []
+    assert list(readers.links_from_gml(str(fname), on_node=nodes.append)) == [('multi\nline & co', '2')]
+    assert nodes == ['multi\nline & co', '2']
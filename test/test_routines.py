@@ -0,0 +1,182 @@
+import sys
+import csv
+import pytest
+import networkx
+import subprocess
+from phasme.routines import split_by_cc, randomize, convert, convert_predicates, extract_by_node, extract_batch
+from phasme.routines import motif_significance
+from phasme.build_graph import graph_from_file, graph_to_file
+from .test_build_graph import comparable_graph
+
+
+def test_split_by_cc(tmpdir):
+    targets = str(tmpdir.join('cc_{}.lp'))
+    written = split_by_cc('data/three_cc.lp', targets, order='biggest last')
+    assert written == tuple(targets.format(idx) for idx in (1, 2, 3))
+    ccs = [comparable_graph(graph_from_file(fname, use_cache=False)) for fname in written]
+    assert ccs == [frozenset({frozenset('gh')}),
+                   frozenset({frozenset('ab'), frozenset('bc')}),
+                   frozenset({frozenset('de'), frozenset('df')})]
+
+
+def test_split_by_cc_sliced_to_standard_format(tmpdir):
+    graph = networkx.Graph([(1, 2), (3, 4), (4, 5), (5, 3)])
+    graph.add_node(6)
+    infile = str(tmpdir.join('graph.gml'))
+    networkx.write_gml(graph, infile)
+    targets = str(tmpdir.join('cc_{}.gml'))
+    written = split_by_cc(infile, targets, order='biggest first', slice=(1, 3))
+    assert len(written) == 2
+    first, second = map(networkx.read_gml, written)
+    assert comparable_graph(first) == frozenset({frozenset(('1', '2'))})
+    assert set(second.nodes) == {'6'} and not second.edges
+
+
+def test_split_by_cc_in_parallel(tmpdir):
+    one = split_by_cc('data/realgraph.lp', str(tmpdir.join('one_{}.lp')))
+    two = split_by_cc('data/three_cc.lp', str(tmpdir.join('two_{}.lp')), jobs=2)
+    ref = split_by_cc('data/three_cc.lp', str(tmpdir.join('ref_{}.lp')))
+    compact = split_by_cc('data/three_cc.lp', str(tmpdir.join('compact_{}.lp')), backend='compact')
+    assert len(one) == 1 and len(two) == 3 and len(compact) == 3
+    for fname, ref_fname in zip(two + compact, ref + ref):
+        with open(fname) as fd, open(ref_fname) as ref_fd:
+            assert fd.read() == ref_fd.read()
+
+
+def test_randomize_per_cc_is_reproducible(tmpdir):
+    infile = str(tmpdir.join('graph.lp'))
+    with open(infile, 'w') as fd:
+        for offset in (0, 100):
+            for source, target in networkx.gnm_random_graph(20, 40, seed=offset).edges:
+                fd.write('edge({},{}).\n'.format(source + offset, target + offset))
+    outputs = []
+    for jobs in (1, 2, 1):
+        target = str(tmpdir.join('random_{}.lp'.format(len(outputs))))
+        randomize(infile, target, iterations=10, per_cc=True, seed=42, jobs=jobs)
+        outputs.append(comparable_graph(graph_from_file(target, use_cache=False)))
+    assert outputs[0] == outputs[1] == outputs[2]
+    assert outputs[0] != comparable_graph(graph_from_file(infile, use_cache=False))
+
+
+def test_randomize_ensemble(tmpdir):
+    targets = str(tmpdir.join('random_{}.lp'))
+    written = randomize('data/realgraph.lp', targets, iterations=5, seed=1, ensemble=3, jobs=2)
+    assert written == tuple(targets.format(idx) for idx in (1, 2, 3))
+    graphs = [comparable_graph(graph_from_file(fname, use_cache=False)) for fname in written]
+    assert len(set(graphs)) == 3
+    stats_one = randomize('data/realgraph.lp', None, iterations=5, seed=1, ensemble=3, statistics=True)
+    stats_two = randomize('data/realgraph.lp', None, iterations=5, seed=1, ensemble=3, statistics=True, jobs=3)
+    assert stats_one == stats_two
+    assert tuple(stats_one) == ('#cc', '#node/biggest cc', '#triangle')
+    with pytest.raises(ValueError):
+        randomize('data/realgraph.lp', 'no_template.lp', iterations=5, ensemble=3)
+
+
+@pytest.mark.parametrize('ext', ['lp.gz', 'lp.xz', 'gml.gz', 'graphml.bz2'])
+def test_convert_compressed(tmpdir, ext):
+    compressed = str(tmpdir.join('graph.' + ext))
+    convert('data/three_cc.lp', compressed)
+    converted = str(tmpdir.join('graph.lp'))
+    convert(compressed, converted)
+    assert (comparable_graph(graph_from_file(converted, use_cache=False))
+            == comparable_graph(graph_from_file('data/three_cc.lp', use_cache=False)))
+    assert split_by_cc(compressed)[0] == str(tmpdir.join('graph_1.' + ext))
+
+
+def test_convert_in_pipeline():
+    with open('data/three_cc.lp') as fd:
+        expected = comparable_graph(graph_from_file('data/three_cc.lp', use_cache=False))
+        out = subprocess.run([sys.executable, '-m', 'phasme', 'convert', '-', '-'],
+                             stdin=fd, stdout=subprocess.PIPE, check=True).stdout
+    lines = out.decode().splitlines()
+    assert len(lines) == len(expected)
+    assert all(line.startswith('edge(') for line in lines)
+
+
+@pytest.mark.parametrize('backend', ['networkx', 'compact'])
+def test_extract_by_node(tmpdir, backend):
+    target = str(tmpdir.join('extracted.lp'))
+    extract_by_node('data/three_cc.lp', target, nodes=['a', 'd', 'unknown'], order=1, backend=backend)
+    assert comparable_graph(graph_from_file(target, use_cache=False)) == frozenset(
+        map(frozenset, ('ab', 'de', 'df')))
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_extract_batch(tmpdir, jobs):
+    tmpdir.join('seeds_1.txt').write('a\n')
+    tmpdir.join('seeds_2.txt').write('d\ng\n')
+    manifest = tmpdir.join('manifest.tsv')
+    manifest.write('# seeds order target\nseeds_1.txt 2 out_1.lp\n\nseeds_2.txt\t0\tout_2.lp\n')
+    report = str(tmpdir.join('report.tsv'))
+    reports = extract_batch('data/three_cc.lp', str(manifest), report=report, jobs=jobs)
+    assert [(r.target, r.nb_node, r.nb_edge) for r in reports] == [
+        (str(tmpdir.join('out_1.lp')), 3, 2), (str(tmpdir.join('out_2.lp')), 2, 0)]
+    assert comparable_graph(graph_from_file(reports[0].target, use_cache=False)) == frozenset(
+        map(frozenset, ('ab', 'bc')))
+    with open(report) as fd:
+        assert fd.readline() == 'target\tnb_node\tnb_edge\tseconds\n'
+        assert len(fd.readlines()) == 2
+
+
+@pytest.mark.parametrize('infile', ['data/good.lp', 'data/three_cc.lp', 'data/test.gml', 'data/test.graphml'])
+@pytest.mark.parametrize('ext', ['lp', 'gml', 'graphml', 'edgelist', 'tsv', 'csv.gz'])
+def test_convert_streamed(tmpdir, infile, ext):
+    expected_ext = 'edgelist' if ext.startswith(('tsv', 'csv')) else ext  # not written by networkx
+    expected = graph_to_file(graph_from_file(infile, use_cache=False), str(tmpdir.join('expected.' + expected_ext)))
+    expected = comparable_graph(graph_from_file(expected, use_cache=False))
+    streamed = convert(infile, str(tmpdir.join('graph.' + ext)))
+    assert comparable_graph(graph_from_file(streamed, use_cache=False)) == expected
+    anonymous = convert(infile, str(tmpdir.join('anonymous.' + ext)), anonymize=True)
+    anonymous = graph_from_file(anonymous, use_cache=False)
+    assert set(map(str, anonymous.nodes)) == set(map(str, range(1, anonymous.number_of_nodes() + 1)))
+    assert len(comparable_graph(anonymous)) == len(expected)
+
+
+@pytest.mark.parametrize('infile', ['data/directed.gml', 'data/directed.graphml', 'duplicated.lp'])
+@pytest.mark.parametrize('ext', ['gml', 'graphml'])
+def test_convert_streamed_round_trip(tmpdir, infile, ext):
+    if infile == 'duplicated.lp':
+        infile = str(tmpdir.join(infile))
+        with open(infile, 'w') as fd:
+            fd.write('edge(a,b).\nedge(b,a).\nedge(a,b).\nedge(b,c).\n')
+    expected = graph_from_file(infile, use_cache=False)
+    streamed = getattr(networkx, 'read_' + ext)(convert(infile, str(tmpdir.join('graph.' + ext))))
+    assert type(streamed) is type(expected)
+    assert sorted(streamed.edges) == sorted(expected.edges)
+
+
+@pytest.mark.parametrize('ext', ['lp', 'gml'])
+def test_convert_with_name_map(tmpdir, ext):
+    target, name_map = str(tmpdir.join('anonymous.' + ext)), str(tmpdir.join('names.tsv'))
+    convert('data/good.lp', target, anonymize=True, name_map=name_map)
+    with open(name_map) as fd:
+        names = {new: old for old, new in csv.reader(fd, delimiter='\t')}
+    original = comparable_graph(graph_from_file('data/good.lp', use_cache=False))
+    anonymous = graph_from_file(target, use_cache=False)
+    assert frozenset(frozenset(names[str(node)] for node in edge) for edge in anonymous.edges) == original
+
+
+def test_convert_predicates_with_name_map(tmpdir):
+    infile, name_map = str(tmpdir.join('two.lp')), str(tmpdir.join('names.tsv'))
+    with open(infile, 'w') as fd:
+        fd.write('edge(a,b).\nlink(b,c).\nedge(b,"d e").\n')
+    written = convert_predicates(infile, str(tmpdir.join('{}.lp')), ('edge', 'link'),
+                                 anonymize=True, name_map=name_map)
+    with open(name_map) as fd:
+        names = {new: old for old, new in csv.reader(fd, delimiter='\t')}
+    assert sorted(names.values()) == ['"d e"', 'a', 'b', 'c']
+    edges = [frozenset(frozenset(names[str(node)] for node in edge)
+                       for edge in graph_from_file(fname, use_cache=False).edges)
+             for fname in written]
+    assert edges == [frozenset({frozenset('ab'), frozenset({'b', '"d e"'})}),
+                     frozenset({frozenset('bc')})]
+
+
+def test_motif_significance():
+    counts = motif_significance('data/realgraph.lp', size=3)
+    assert counts == {'wedge': 25, 'triangle': 1}
+    scores = motif_significance('data/realgraph.lp', size=4, null=4, iterations=5, seed=1)
+    assert scores == motif_significance('data/realgraph.lp', size=4, null=4, iterations=5, seed=1, jobs=2)
+    assert len(scores) == 8 and scores['wedge'].count == 25
+    # degrees are kept by the randomization, and so is the number of stars
+    assert scores['wedge'].mean + 3 * scores['triangle'].mean == 25 + 3
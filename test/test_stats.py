@@ -0,0 +1,22 @@
+import pytest
+import networkx
+from phasme.stats import graph_stats, edge_array
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_stats_as_networkx(seed):
+    graph = networkx.gnm_random_graph(60, 45, seed=seed)
+    graph.add_edges_from(((0, 0), (7, 7)))
+    stats = graph_stats(*edge_array(graph))
+    assert stats.nb_node == graph.number_of_nodes()
+    assert stats.nb_edge == graph.number_of_edges()
+    assert stats.nb_loop == networkx.number_of_selfloops(graph)
+    ccs = tuple(networkx.connected_components(graph))
+    assert stats.nb_cc == len(ccs)
+    assert stats.node_per_cc.tolist() == [len(cc) for cc in ccs]
+    assert stats.edge_per_cc.tolist() == [graph.subgraph(cc).number_of_edges() for cc in ccs]
+
+
+def test_stats_of_empty_graph():
+    stats = graph_stats(0, [])
+    assert (stats.nb_node, stats.nb_edge, stats.nb_loop, stats.nb_cc) == (0, 0, 0, 0)